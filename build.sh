@@ -4,6 +4,8 @@ pip install -r requirements.txt
 
 python manage.py collectstatic --no-input
 
+python manage.py generate_schema
+
 python manage.py migrate
 
 
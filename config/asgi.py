@@ -19,3 +19,8 @@ settings_module = (
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
 
 application = get_asgi_application()
+
+# Pay the first-request costs now, before the worker accepts traffic.
+from core.common.startup import warm_up  # noqa: E402
+
+warm_up()
@@ -13,17 +13,26 @@ SECRET_KEY = os.getenv(
 )
 
 MIDDLEWARE = [
+    "core.common.metrics.MetricsMiddleware",
+    "core.common.capture.CaptureMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "core.common.middleware.CompressionMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.common.profiling.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+AUDIT_BACKGROUND_FLUSH = True
+
+# /metrics answers 404 until METRICS_TOKEN is set
+METRICS_REQUIRE_TOKEN = True
+
 CORS_ALLOWED_ORIGINS = ["https://client-copy-mplg.onrender.com"]
 
 STORAGES = {
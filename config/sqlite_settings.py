@@ -0,0 +1,11 @@
+from core.common.sqlite import TUNED_ENGINE, tuned_sqlite_options
+from .settings import *  # noqa F403 F401
+from .settings import DATABASES
+
+# Single-node deployments on SQLite, e.g. facilities running an offline node:
+# DJANGO_SETTINGS_MODULE=config.sqlite_settings
+DATABASES["default"]["ENGINE"] = TUNED_ENGINE
+DATABASES["default"]["OPTIONS"] = tuned_sqlite_options()
+
+# gunicorn workers keep their connection, so the pragmas run once per worker
+DATABASES["default"]["CONN_MAX_AGE"] = None
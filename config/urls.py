@@ -4,25 +4,20 @@ URL configuration for tibanode project.
 
 from django.contrib import admin
 from django.urls import path, include
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="TibaNode API",
-        default_version="v1",
-        description="API documentation for TibaNode project",
-        contact=openapi.Contact(email="info@cema.africa"),
-        license=openapi.License(name="MIT License"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
+from core.common.batch import BatchView
+from core.common.metrics import metrics_view
+from core.common.profiling import ProfileDownloadView, ProfileListView
+from core.common.schema import openapi_schema, redoc
 
 urlpatterns = [
-    path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    path("redoc/", redoc, name="schema-redoc"),
+    path("openapi.json", openapi_schema, name="schema-json"),
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
+    path("api/batch/", BatchView.as_view(), name="batch"),
+    path("api/profiles/", ProfileListView.as_view(), name="profile-list"),
+    path("api/profiles/<str:profile_id>/", ProfileDownloadView.as_view(), name="profile-download"),
+    path("api/sync/", include("core.sync.urls")),
     path("api/", include("core.health.urls")),
     path("api/user/", include("core.user.urls")),
 ]
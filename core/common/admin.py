@@ -0,0 +1,76 @@
+from django.contrib import admin, messages
+from django.http import HttpResponseRedirect
+
+from .models import StaleObjectError
+from .pagination import EstimatedCountPaginator
+
+
+def chunked_pks(queryset, size):
+    """
+    Yield the primary keys of ``queryset`` in ascending lists of at most
+    ``size``, each read with an index range scan starting after the last
+    """
+    queryset = queryset.order_by("pk")
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        pks = list(page.values_list("pk", flat=True)[:size])
+        if not pks:
+            return
+        yield pks
+        last = pks[-1]
+
+
+class LargeTableAdminMixin:
+    """
+    ModelAdmin defaults for tables with millions of rows.
+
+    The changelist counts rows with :class:`EstimatedCountPaginator` and never
+    counts the whole table on filtered views or for facets. Bulk actions
+    should walk the selection with ``in_chunks`` so each chunk is its own
+    short transaction. Django's "delete selected" is withdrawn: it loads
+    every selected row, and lists them all on its confirmation page.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    list_per_page = 50
+    action_chunk_size = 1000
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    def in_chunks(self, queryset):
+        return chunked_pks(queryset, self.action_chunk_size)
+
+
+class VersionedAdminMixin:
+    """
+    ModelAdmin for ``VersionedModel`` rows.
+
+    A save or delete that loses to a concurrent write raises
+    ``StaleObjectError``; the admin's transaction is then rolled back,
+    inlines included, and the page is shown again with an error message
+    instead of a server error.
+    """
+
+    stale_message = "This %(name)s was changed by someone else in the meantime. Review it and try again."
+
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except StaleObjectError:
+            return self.stale_response(request)
+
+    def delete_view(self, request, object_id, extra_context=None):
+        try:
+            return super().delete_view(request, object_id, extra_context)
+        except StaleObjectError:
+            return self.stale_response(request)
+
+    def stale_response(self, request):
+        self.message_user(request, self.stale_message % {"name": self.opts.verbose_name}, messages.ERROR)
+        return HttpResponseRedirect(request.get_full_path())
@@ -0,0 +1,157 @@
+import base64
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Per-request headers a sub-request may set; everything else comes from the
+# batch request itself.
+FORWARDED_HEADERS = ("If-Match", "If-None-Match", "Accept-Language")
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(
+        choices=["GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"], default="GET"
+    )
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(), required=False)
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith("/api/") or path.startswith("/api/batch/"):
+            raise serializers.ValidationError("Only /api/ endpoints other than the batch endpoint can be batched")
+        return value
+
+    def validate_headers(self, value):
+        allowed = {header.lower() for header in FORWARDED_HEADERS}
+        unknown = [header for header in value if header.lower() not in allowed]
+        if unknown:
+            raise serializers.ValidationError(f"Headers not allowed in sub-requests: {', '.join(unknown)}")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True, allow_empty=False, max_length=20)
+    parallel = serializers.BooleanField(default=False)
+
+
+class BatchView(APIView):
+    """
+    Execute several API calls in one round trip.
+
+    POST ``{"requests": [{"method": "GET", "path": "/api/clients/1/profile/"},
+    ...], "parallel": false}`` and get back ``{"responses": [{"status": 200,
+    "headers": {...}, "body": ...}, ...]}`` in the same order. The batch
+    request is authenticated once and its user is reused by every
+    sub-request; throttles and permissions still apply per sub-request.
+    Sub-requests are not atomic: each write commits on its own. With
+    ``parallel`` set and only read methods in the batch, sub-requests run
+    concurrently on ``BATCH_MAX_WORKERS`` threads. Bodies that are not text
+    are sent base64 encoded, with ``"body_encoding": "base64"``; streamed
+    responses such as file downloads are refused with a 406 for that item.
+    """
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        subrequests = serializer.validated_data["requests"]
+
+        if serializer.validated_data["parallel"] and all(sub["method"] in SAFE_METHODS for sub in subrequests):
+            workers = min(len(subrequests), getattr(settings, "BATCH_MAX_WORKERS", 4))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                responses = list(executor.map(lambda sub: self.run_in_thread(request, sub), subrequests))
+        else:
+            responses = [self.run(request, sub) for sub in subrequests]
+        return Response({"responses": responses})
+
+    def run_in_thread(self, request, sub):
+        try:
+            return self.run(request, sub)
+        finally:
+            # Worker threads open their own connections; do not leak them.
+            connections.close_all()
+
+    def run(self, request, sub):
+        subrequest = build_subrequest(request, sub)
+        try:
+            match = resolve(subrequest.path_info)
+        except Resolver404:
+            return {"status": 404, "headers": {}, "body": {"detail": "Not found."}}
+
+        try:
+            response = match.func(subrequest, *match.args, **match.kwargs)
+        except Exception:
+            logger.exception("Batched %s %s failed", sub["method"], sub["path"])
+            return {"status": 500, "headers": {}, "body": {"detail": "Internal server error."}}
+
+        if response.streaming:
+            # Streamed bodies (file downloads) could be of any size; fetch
+            # them on their own.
+            response.close()
+            return {"status": 406, "headers": {}, "body": {"detail": "Streaming responses cannot be batched."}}
+
+        headers = {
+            name: value for name, value in response.items() if name not in ("Content-Type", "Content-Length")
+        }
+        result = {"status": response.status_code, "headers": headers}
+        if isinstance(response, Response):
+            # The data is rendered once, as part of the batch response.
+            result["body"] = response.data
+        elif response.get("Content-Type", "").startswith("application/json"):
+            result["body"] = json.loads(response.content)
+        else:
+            try:
+                result["body"] = response.content.decode(response.charset)
+            except UnicodeDecodeError:
+                result.update(body=base64.b64encode(response.content).decode("ascii"), body_encoding="base64")
+        return result
+
+
+def build_subrequest(request, sub):
+    """
+    Build the WSGI request for ``sub``, inheriting the batch request's
+    client address, scheme and authenticated user
+    """
+    url = urlsplit(sub["path"])
+    body = b"" if sub.get("body") is None else json.dumps(sub["body"]).encode()
+    environ = {
+        key: value
+        for key, value in request.META.items()
+        if not key.startswith("HTTP_") or key in ("HTTP_HOST", "HTTP_USER_AGENT", "HTTP_X_FORWARDED_FOR")
+    }
+    environ.update(
+        {
+            "REQUEST_METHOD": sub["method"],
+            "PATH_INFO": url.path,
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": url.query,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "HTTP_ACCEPT": "application/json",
+            "wsgi.input": BytesIO(body),
+            "wsgi.url_scheme": request.scheme,
+        }
+    )
+    for name, value in sub.get("headers", {}).items():
+        environ["HTTP_" + name.upper().replace("-", "_")] = value
+
+    subrequest = WSGIRequest(environ)
+    if request.user and request.user.is_authenticated:
+        # Picked up by rest_framework.request.Request in place of the
+        # configured authenticators, so the token is not verified again.
+        subrequest._force_auth_user = request.user
+        subrequest._force_auth_token = request.auth
+    return subrequest
@@ -0,0 +1,179 @@
+"""
+Capture of real API traffic for replay as load tests.
+
+With ``CAPTURE_FILE`` set, ``CaptureMiddleware`` appends a sample of API
+requests (``CAPTURE_SAMPLE_RATE`` of them) to that file, one JSON object per
+line: time, method, path, query, JSON body, URL name, status and duration.
+``manage.py replay_traffic`` sends them again to a running instance.
+
+Nothing identifying leaves in a capture: headers are not recorded,
+credentials and free text in ``CAPTURE_REDACTED_FIELDS`` are replaced
+outright, and the personal details in ``CAPTURE_MASKED_FIELDS`` (in bodies
+and query strings) have each letter and digit swapped for one derived from a
+keyed hash of the value. Masked values keep their length and shape, so phone
+numbers and emails still validate, and equal values mask alike, so repeated
+searches still hit the same caches. Dates in ``CAPTURE_SHIFTED_FIELDS``
+(dates of birth) are moved by up to half a year, by an amount derived the
+same way, so they stay valid dates. Bodies that are not JSON, or are larger
+than ``CAPTURE_MAX_BODY`` bytes, are left out.
+
+Each record is written with a single ``write`` on a file opened for
+appending, so gunicorn workers can share the file without interleaving.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import random
+import string
+import time
+from datetime import date, timedelta
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.serializers.json import DjangoJSONEncoder
+
+REDACTED = "[redacted]"
+# Authentication, profiles and sync carry credentials or node state that a
+# replay cannot reuse
+EXCLUDED_PREFIXES = ("/api/user/", "/api/profiles/", "/api/sync/")
+
+
+def mask(value):
+    """
+    Replace each letter and digit of ``value`` deterministically, keeping
+    case, punctuation and length
+    """
+    text = str(value)
+    digest = hmac.new(settings.SECRET_KEY.encode(), text.encode(), hashlib.sha256).digest()
+    masked = []
+    for position, char in enumerate(text):
+        byte = digest[position % len(digest)] ^ position
+        if char.isdigit():
+            masked.append(string.digits[byte % 10])
+        elif char.isalpha():
+            letter = string.ascii_lowercase[byte % 26]
+            masked.append(letter.upper() if char.isupper() else letter)
+        else:
+            masked.append(char)
+    return "".join(masked)
+
+
+def shift_date(value):
+    """
+    Move an ISO date by a number of days, up to half a year either way,
+    derived from a keyed hash of it; mask anything that is not a date
+    """
+    try:
+        day = date.fromisoformat(str(value))
+    except ValueError:
+        return mask(value)
+    digest = hmac.new(settings.SECRET_KEY.encode(), day.isoformat().encode(), hashlib.sha256).digest()
+    days = int.from_bytes(digest[:4], "big") % 365 - 182
+    # Never the real date
+    return (day + timedelta(days=days or 183)).isoformat()
+
+
+def sanitize(data):
+    """
+    A copy of decoded JSON ``data`` with credentials redacted and personal
+    details masked, at any depth, including in the query strings of
+    ``path`` values
+    """
+    if isinstance(data, list):
+        return [sanitize(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+    clean = {}
+    for key, value in data.items():
+        if key in settings.CAPTURE_REDACTED_FIELDS:
+            clean[key] = REDACTED
+        elif key in settings.CAPTURE_MASKED_FIELDS and isinstance(value, (str, int)) and value != "":
+            clean[key] = mask(value)
+        elif key in settings.CAPTURE_SHIFTED_FIELDS and isinstance(value, str) and value != "":
+            clean[key] = shift_date(value)
+        elif key == "path" and isinstance(value, str) and "?" in value:
+            # The URL of a batched sub-request
+            path, query = value.split("?", 1)
+            clean[key] = f"{path}?{sanitize_query(query)}"
+        else:
+            clean[key] = sanitize(value)
+    return clean
+
+
+def sanitize_query(query_string):
+    pairs = parse_qsl(query_string, keep_blank_values=True)
+    return urlencode([(key, value) for pair in pairs for key, value in sanitize(dict([pair])).items()])
+
+
+def request_body(request):
+    """
+    The sanitized JSON body of ``request``, or None when there is none to
+    keep. Read before the view so the stream is still available.
+    """
+    if request.content_type != "application/json":
+        return None
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return None
+    if not length or length > settings.CAPTURE_MAX_BODY:
+        return None
+    try:
+        return sanitize(json.loads(request.body))
+    except ValueError:
+        return None
+
+
+def append(path, record):
+    line = (json.dumps(record, cls=DjangoJSONEncoder) + "\n").encode()
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+class CaptureMiddleware:
+    """
+    Append a sample of API requests to ``CAPTURE_FILE`` (see module docs).
+    Not loaded at all unless the file is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.CAPTURE_FILE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        path = request.path_info
+        if (
+            not path.startswith("/api/")
+            or path.startswith(EXCLUDED_PREFIXES)
+            or random.random() >= settings.CAPTURE_SAMPLE_RATE
+        ):
+            return self.get_response(request)
+
+        body = request_body(request)
+        captured_at = time.time()
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        append(
+            settings.CAPTURE_FILE,
+            {
+                "time": captured_at,
+                "method": request.method,
+                "path": path,
+                "query": sanitize_query(request.META.get("QUERY_STRING", "")),
+                "body": body,
+                "route": match.view_name if match else None,
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 1),
+            },
+        )
+        return response
@@ -0,0 +1,72 @@
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+
+from .models import StaleObjectError
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource was modified by another request."
+    default_code = "precondition_failed"
+
+
+def version_etag(version):
+    return f'"{version}"'
+
+
+def parse_if_match(request):
+    """
+    Return the set of versions named by the ``If-Match`` header, ``"*"`` for
+    a wildcard, or ``None`` when the header is absent
+    """
+    header = request.headers.get("If-Match")
+    if not header:
+        return None
+    tags = parse_etags(header)
+    if tags == ["*"]:
+        return "*"
+    try:
+        # Compressed responses carry a weak copy of the tag, accept both forms.
+        versions = {int(tag.removeprefix("W/").strip('"')) for tag in tags}
+    except ValueError:
+        versions = set()
+    if not versions:
+        raise ParseError("If-Match must list ETags returned by this API")
+    return versions
+
+
+class ConditionalUpdateMixin:
+    """
+    ViewSet mixin for ``VersionedModel`` resources.
+
+    Detail responses carry the row version as their ``ETag``. Updates and
+    deletes sent with ``If-Match`` are rejected with 412 when none of its
+    tags is the current version, and every update is applied as a single
+    version-guarded ``UPDATE`` (deletes are guarded the same way, see
+    ``VersionedModel.delete``) so a concurrent write between the read and the
+    write is also answered with 412 instead of being overwritten.
+    """
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.request.method in ("PUT", "PATCH", "DELETE"):
+            expected = parse_if_match(self.request)
+            if expected not in (None, "*") and instance.version not in expected:
+                raise PreconditionFailed()
+        return instance
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        response["ETag"] = version_etag(response.data["version"])
+        return response
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response["ETag"] = version_etag(response.data["version"])
+        return response
+
+    def handle_exception(self, exc):
+        if isinstance(exc, StaleObjectError):
+            exc = PreconditionFailed()
+        return super().handle_exception(exc)
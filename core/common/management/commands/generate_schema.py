@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.common.schema import write_schema
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema served at /openapi.json"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.OPENAPI_SCHEMA_FILE,
+            help="Path of the JSON file to write; a .gz copy is written next to it",
+        )
+
+    def handle(self, *args, output, **options):
+        content = write_schema(output)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {len(content)} bytes of OpenAPI schema to {output}")
+        )
@@ -0,0 +1,148 @@
+import json
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentiles(latencies):
+    if len(latencies) < 2:
+        return {name: (latencies[0] if latencies else 0) * 1000 for name in ("p50", "p90", "p95", "p99")}
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {name: quantiles[rank - 1] * 1000 for name, rank in (("p50", 50), ("p90", 90), ("p95", 95), ("p99", 99))}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay traffic captured by CaptureMiddleware against a running instance, keeping the "
+        "captured pacing (sped up by --speedup), and report latency percentiles per route. "
+        "Writes are replayed too, so point it at a disposable instance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("capture", help="Capture file written by CaptureMiddleware")
+        parser.add_argument("--base-url", default="http://localhost:8000", help="Instance to replay against")
+        parser.add_argument(
+            "--speedup", type=float, default=1.0, help="Replay this many times faster; 0 sends without pauses"
+        )
+        parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at most")
+        parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+        parser.add_argument("--token", help="Access token to send with every request")
+        parser.add_argument("--email", help="Log in as this user instead of passing --token")
+        parser.add_argument("--password")
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--report", help="Also write the report as JSON to this file, to compare releases")
+
+    def handle(self, *args, capture, base_url, speedup, concurrency, limit, token, email, password, **options):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = options["timeout"]
+        records = self.load(capture, limit)
+        if not records:
+            raise CommandError(f"No requests in {capture}")
+        if email:
+            token = self.login(email, password)
+        self.token = token
+
+        self.results = defaultdict(list)
+        self.lock = threading.Lock()
+        start = time.perf_counter()
+        first = records[0]["time"]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for record in records:
+                if speedup > 0:
+                    delay = (record["time"] - first) / speedup - (time.perf_counter() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+                pool.submit(self.send, record)
+        elapsed = time.perf_counter() - start
+
+        report = self.summarize(elapsed)
+        self.write_report(report)
+        if options["report"]:
+            with open(options["report"], "w") as output:
+                json.dump(report, output, indent=2)
+
+    def load(self, capture, limit):
+        try:
+            with open(capture) as lines:
+                records = [json.loads(line) for line in lines if line.strip()]
+        except OSError as error:
+            raise CommandError(error)
+        records.sort(key=lambda record: record["time"])
+        return records[:limit] if limit else records
+
+    def request(self, method, path, body=None):
+        headers = {"Accept": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        request = Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except HTTPError as error:
+            return error.code, error.read()
+
+    def login(self, email, password):
+        self.token = None
+        status, content = self.request("POST", "/api/user/login/", {"email": email, "password": password})
+        if status != 200:
+            raise CommandError(f"Could not log in as {email}: {status} {content[:200]!r}")
+        return json.loads(content)["access"]
+
+    def send(self, record):
+        path = record["path"] + (f"?{record['query']}" if record["query"] else "")
+        start = time.perf_counter()
+        try:
+            status, _ = self.request(record["method"], path, record["body"])
+        except (URLError, OSError):
+            status = 0
+        latency = time.perf_counter() - start
+        route = f"{record['method']} {record['route'] or record['path']}"
+        with self.lock:
+            self.results[route].append((latency, status, record["status"]))
+
+    def summarize(self, elapsed):
+        routes = {}
+        everything = []
+        for route, results in sorted(self.results.items()):
+            everything.extend(results)
+            routes[route] = self.describe(results)
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "throughput": round(len(everything) / elapsed, 1) if elapsed else 0,
+            "routes": routes,
+            "all": self.describe(everything),
+        }
+
+    def describe(self, results):
+        latencies = [latency for latency, _, _ in results]
+        return {
+            "requests": len(results),
+            "errors": sum(1 for _, status, _ in results if status == 0 or status >= 500),
+            # Responses whose status class differs from the captured one
+            # usually mean the target holds different data
+            "status_changed": sum(1 for _, status, captured in results if status // 100 != captured // 100),
+            **{name: round(value, 1) for name, value in percentiles(latencies).items()},
+            "max": round(max(latencies) * 1000, 1),
+        }
+
+    def write_report(self, report):
+        self.stdout.write(
+            f"{report['all']['requests']} requests in {report['elapsed_s']}s ({report['throughput']}/s)\n"
+        )
+        header = f"{'route':<50}{'count':>7}{'errors':>8}{'changed':>9}"
+        header += "".join(f"{name + ' ms':>10}" for name in ("p50", "p90", "p95", "p99", "max"))
+        self.stdout.write(header)
+        for route, row in [*report["routes"].items(), ("all", report["all"])]:
+            line = f"{route[:49]:<50}{row['requests']:>7}{row['errors']:>8}{row['status_changed']:>9}"
+            line += "".join(f"{row[name]:>10.1f}" for name in ("p50", "p90", "p95", "p99", "max"))
+            self.stdout.write(line)
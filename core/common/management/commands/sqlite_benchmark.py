@@ -0,0 +1,126 @@
+import copy
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from core.common.sqlite import TUNED_ENGINE, tuned_sqlite_options
+from core.health.models import Client, Enrollment, HealthProgram
+
+# Name: (ENGINE, OPTIONS)
+PROFILES = {
+    "default": ("django.db.backends.sqlite3", {}),
+    "tuned": (TUNED_ENGINE, tuned_sqlite_options()),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent client registration on SQLite with Django's default "
+        "settings and with the tuned profile (config.sqlite_settings). Each "
+        "profile gets a fresh database file in a temporary directory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent writers")
+        parser.add_argument("--writes", type=int, default=200, help="Registrations per writer")
+        parser.add_argument("--readers", type=int, default=2, help="Threads listing clients meanwhile")
+
+    def handle(self, *args, threads, writes, readers, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            results = [self.run_profile(name, Path(directory), threads, writes, readers) for name in PROFILES]
+
+        self.stdout.write(
+            f"{threads} writers x {writes} registrations (duplicate check, client and enrollment in one "
+            f"transaction) with {readers} concurrent readers\n"
+        )
+        self.stdout.write(f"{'profile':<10}{'writes/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for result in results:
+            self.stdout.write(
+                f"{result['profile']:<10}{result['throughput']:>10.0f}{result['p50']:>10.1f}"
+                f"{result['p95']:>10.1f}{result['p99']:>10.1f}{result['errors']:>8}"
+            )
+
+    def run_profile(self, name, directory, threads, writes, readers):
+        alias = f"sqlite_benchmark_{name}"
+        engine, options = PROFILES[name]
+        connections.settings[alias] = {
+            **copy.deepcopy(connections.settings["default"]),
+            "ENGINE": engine,
+            "NAME": str(directory / f"{name}.sqlite3"),
+            "OPTIONS": options,
+            "CONN_MAX_AGE": None,
+        }
+        try:
+            call_command("migrate", database=alias, verbosity=0)
+            program = HealthProgram.objects.using(alias).create(name="Benchmark")
+            latencies, errors = [], []
+            done = threading.Event()
+            reader_threads = [
+                threading.Thread(target=self.read, args=(alias, done, errors)) for _ in range(readers)
+            ]
+            workers = [
+                threading.Thread(target=self.register, args=(alias, program, worker, writes, latencies, errors))
+                for worker in range(threads)
+            ]
+            start = time.perf_counter()
+            for thread in reader_threads + workers:
+                thread.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            done.set()
+            for thread in reader_threads:
+                thread.join()
+        finally:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+        return {
+            "profile": name,
+            "throughput": len(latencies) / elapsed,
+            "p50": quantiles[49] * 1000,
+            "p95": quantiles[94] * 1000,
+            "p99": quantiles[98] * 1000,
+            "errors": len(errors),
+        }
+
+    def register(self, alias, program, worker, writes, latencies, errors):
+        try:
+            for i in range(writes):
+                start = time.perf_counter()
+                try:
+                    with transaction.atomic(using=alias):
+                        Client.objects.using(alias).filter(last_name=f"Client{i}").exists()
+                        client = Client(
+                            first_name=f"Worker{worker}",
+                            last_name=f"Client{i}",
+                            date_of_birth=date(1990, 1, 1),
+                            gender="F",
+                        )
+                        client.save(using=alias)
+                        Enrollment.objects.using(alias).create(client=client, program=program)
+                except OperationalError as error:
+                    errors.append(error)
+                    continue
+                latencies.append(time.perf_counter() - start)
+        finally:
+            connections[alias].close()
+
+    def read(self, alias, done, errors):
+        try:
+            while not done.is_set():
+                try:
+                    list(Client.objects.using(alias).order_by("-id").values_list("id", "first_name")[:50])
+                except OperationalError as error:
+                    errors.append(error)
+        finally:
+            connections[alias].close()
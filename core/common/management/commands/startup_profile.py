@@ -0,0 +1,85 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so that nothing is imported yet.
+PROFILE_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import django
+django.setup()
+phases = [("django.setup", time.perf_counter() - start)]
+from core.common.startup import warm_connections, warm_up
+phases.extend(warm_up(force=True))
+start = time.perf_counter()
+import {wsgi_module}
+phases.append(("wsgi_import", time.perf_counter() - start))
+start = time.perf_counter()
+warm_connections()
+phases.append(("database", time.perf_counter() - start))
+print(json.dumps(phases))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Parse ``python -X importtime`` output into
+    ``[(module, self_us, cumulative_us, depth)]``
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+class Command(BaseCommand):
+    help = "Report per-module import time and startup phase durations of a fresh worker"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top", type=int, default=25, help="Number of slowest imports to show"
+        )
+        parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON")
+
+    def handle(self, *args, top, **options):
+        wsgi_module = settings.WSGI_APPLICATION.rsplit(".", 1)[0]
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROFILE_SCRIPT.format(wsgi_module=wsgi_module)],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Startup profiling failed:\n{result.stderr[-2000:]}")
+
+        phases = json.loads(result.stdout.strip().splitlines()[-1])
+        # Only imports made directly by startup code, so that nested imports
+        # are not counted twice.
+        modules = [m[:3] for m in parse_importtime(result.stderr) if m[3] == 0]
+        modules.sort(key=lambda module: module[2], reverse=True)
+
+        if options["json"]:
+            report = {
+                "phases": [{"phase": name, "ms": seconds * 1000} for name, seconds in phases],
+                "imports": [
+                    {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+                    for name, self_us, cumulative_us in modules[:top]
+                ],
+            }
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write("Startup phases")
+        for name, seconds in phases:
+            self.stdout.write(f"  {name:<20} {seconds * 1000:9.1f} ms")
+        self.stdout.write(f"  {'total':<20} {sum(s for _, s in phases) * 1000:9.1f} ms")
+        self.stdout.write("\nSlowest top-level imports (cumulative)")
+        for name, self_us, cumulative_us in modules[:top]:
+            self.stdout.write(f"  {name:<40} {cumulative_us / 1000:9.1f} ms")
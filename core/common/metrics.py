@@ -0,0 +1,164 @@
+"""
+Prometheus metrics, served in the text exposition format at ``/metrics``.
+
+``MetricsMiddleware`` records, per URL name (``client-list``,
+``client-profile``, ...) and method, the latency and size of every response,
+the number of database queries it ran and, on 401 responses, an auth
+failure. Every query on every connection is also counted and timed by
+database alias, and the caches report hits and misses through
+``record_cache_lookup``. Requests that match no URL share one "unmatched"
+label so scanners cannot grow the number of series.
+
+Metrics are kept with ``prometheus_client``. Under gunicorn, set
+``PROMETHEUS_MULTIPROC_DIR`` to an empty directory before the server starts:
+each worker then writes its values to its own memory-mapped files, so
+recording takes no lock shared with other processes, and a scrape of any
+worker adds up all of them. ``gunicorn.conf.py`` clears the directory on
+start and drops the files of workers that exit.
+"""
+
+import hmac
+import os
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+UNMATCHED = "unmatched"
+
+REQUEST_LATENCY = Histogram(
+    "tibanode_http_request_duration_seconds",
+    "Time spent serving a request, by URL name",
+    ["route", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESPONSES = Counter(
+    "tibanode_http_responses_total",
+    "Responses sent, by URL name and status code",
+    ["route", "method", "status"],
+)
+RESPONSE_SIZE = Histogram(
+    "tibanode_http_response_size_bytes",
+    "Size of response bodies as sent, after compression",
+    ["route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+REQUEST_QUERIES = Histogram(
+    "tibanode_http_request_db_queries",
+    "Database queries run by a request",
+    ["route"],
+    buckets=(1, 2, 3, 5, 8, 13, 20, 50, 100),
+)
+AUTH_FAILURES = Counter(
+    "tibanode_auth_failures_total",
+    "Requests refused for missing or invalid credentials",
+    ["route"],
+)
+DB_QUERIES = Counter("tibanode_db_queries_total", "Queries run, by database", ["database"])
+DB_QUERY_SECONDS = Counter("tibanode_db_query_seconds_total", "Time spent running queries, by database", ["database"])
+CACHE_LOOKUPS = Counter("tibanode_cache_lookups_total", "Cache lookups, by cache and result", ["cache", "result"])
+
+# Query count of the request being served by this thread, if any
+_request_queries = ContextVar("metrics_request_queries", default=None)
+# Children of the per-database counters, looked up once per alias
+_db_children = {}
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_query(execute, sql, params, many, context):
+    """
+    ``execute_wrapper`` counting and timing every query
+    """
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        alias = context["connection"].alias
+        children = _db_children.get(alias)
+        if children is None:
+            children = _db_children[alias] = (DB_QUERIES.labels(alias), DB_QUERY_SECONDS.labels(alias))
+        children[0].inc()
+        children[1].inc(time.perf_counter() - start)
+        count = _request_queries.get()
+        if count is not None:
+            count[0] += 1
+
+
+def instrument_connection(connection, **kwargs):
+    if observe_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(observe_query)
+
+
+def route_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNMATCHED
+    return match.view_name or UNMATCHED
+
+
+class MetricsMiddleware:
+    """
+    Record the request metrics (see module docs). Place it first so that
+    latency covers the other middleware and sizes are the compressed ones.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        connection_created.connect(instrument_connection, dispatch_uid="core.common.metrics")
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection)
+
+    def __call__(self, request):
+        count = [0]
+        token = _request_queries.set(count)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        duration = time.perf_counter() - start
+
+        route = route_name(request)
+        REQUEST_LATENCY.labels(route, request.method).observe(duration)
+        RESPONSES.labels(route, request.method, str(response.status_code)).inc()
+        REQUEST_QUERIES.labels(route).observe(count[0])
+        if not response.streaming:
+            RESPONSE_SIZE.labels(route).observe(len(response.content))
+        if response.status_code == 401:
+            AUTH_FAILURES.labels(route).inc()
+        return response
+
+
+def registry():
+    """
+    The registry to expose: this process's metrics, or those of every
+    worker in multiprocess mode
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    collector_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collector_registry)
+    return collector_registry
+
+
+def metrics_view(request):
+    """
+    Serve the metrics to Prometheus, behind ``METRICS_TOKEN`` if one is set.
+    Without a token the endpoint is open, unless ``METRICS_REQUIRE_TOKEN``
+    is set (as in deployment), which hides it.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if getattr(settings, "METRICS_REQUIRE_TOKEN", False):
+            return HttpResponse(status=404)
+    elif not hmac.compare_digest(request.META.get("HTTP_AUTHORIZATION", "").encode(), f"Bearer {token}".encode()):
+        return HttpResponse(status=401)
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,95 @@
+from django.db import models, router, transaction
+
+
+class StaleObjectError(Exception):
+    """
+    Raised when a versioned row changed since it was read
+    """
+
+
+class VersionedModel(models.Model):
+    """
+    Abstract model with optimistic concurrency control.
+
+    Saving an existing instance issues ``UPDATE ... SET version = n + 1 WHERE
+    id = ? AND version = n`` where ``n`` is the version the instance was read
+    at. If another writer got there first no row matches and
+    ``StaleObjectError`` is raised, so lost updates are detected without row
+    locks or an extra query. Deleting an instance is guarded the same way.
+    """
+
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        self._expected_version = self.version
+        self.version += 1
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "version"}
+        try:
+            super().save(*args, **kwargs)
+        except BaseException:
+            self.version = self._expected_version
+            raise
+        finally:
+            del self._expected_version
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(self.__class__, instance=self)
+        with transaction.atomic(using=using):
+            # Lock the row at the version that was read, so that an update
+            # committed since is not silently deleted and none can slip in
+            # before the delete below.
+            guard = type(self)._base_manager.using(using).filter(pk=self.pk, version=self.version)
+            if guard.update(version=self.version) == 0:
+                raise StaleObjectError(f"{self._meta.label} {self.pk} is no longer at version {self.version}")
+            return super().delete(using=using, keep_parents=keep_parents)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected_version = getattr(self, "_expected_version", None)
+        if expected_version is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if base_qs.filter(pk=pk_val, version=expected_version)._update(values) == 0:
+            raise StaleObjectError(
+                f"{self._meta.label} {pk_val} is no longer at version {expected_version}"
+            )
+        return True
+
+
+class TrackedFieldsModel(models.Model):
+    """
+    Abstract model remembering the values of ``tracked_fields`` as last
+    loaded or saved, so that save signals can tell what changed without
+    reading the row again
+    """
+
+    tracked_fields = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_tracked_fields()
+        return instance
+
+    def remember_tracked_fields(self):
+        self._tracked_values = {name: self.__dict__[name] for name in self.tracked_fields if name in self.__dict__}
+
+    def tracked_value(self, name, default=None):
+        """
+        Value of ``name`` when the instance was last loaded or saved
+        """
+        return getattr(self, "_tracked_values", {}).get(name, default)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.remember_tracked_fields()
@@ -0,0 +1,125 @@
+import json
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids a full COUNT(*) on large tables.
+
+    Unfiltered querysets are counted from PostgreSQL catalog statistics
+    (``pg_class.reltuples``) or, on other backends, from a short-lived cached
+    count. Filtered querysets are counted exactly as long as they match no more
+    than ``exact_count_threshold`` rows; beyond that the planner estimate is used.
+    """
+
+    exact_count_threshold = 10000
+    count_cache_timeout = 60
+    count_estimated = False
+
+    @cached_property
+    def count(self):
+        self.count_estimated = False
+        queryset = self.object_list
+        if hasattr(queryset, "map_shards"):
+            # A queryset over several databases (core.health.sharding) is
+            # the sum of its shards, each counted as cheaply as it can be
+            counts = queryset.map_shards(self._count)
+            self.count_estimated = any(estimated for _, estimated in counts)
+            return sum(count for count, _ in counts)
+        if not hasattr(queryset, "query"):
+            return super().count
+        count, self.count_estimated = self._count(queryset)
+        return count
+
+    def _count(self, queryset):
+        """
+        ``(count, estimated)`` of ``queryset``
+        """
+        connection = connections[queryset.db]
+        if not queryset.query.where:
+            estimate = self._table_estimate(queryset, connection)
+            if estimate is not None:
+                return estimate, True
+            return self._cached_count(queryset)
+
+        bounded = queryset.order_by()[: self.exact_count_threshold + 1].count()
+        if bounded <= self.exact_count_threshold:
+            return bounded, False
+
+        estimate = self._planner_estimate(queryset, connection)
+        if estimate is None:
+            return queryset.count(), False
+        return max(estimate, bounded), True
+
+    def _table_estimate(self, queryset, connection):
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 for tables that have never been analyzed
+        if row is None or row[0] < 0:
+            return None
+        return row[0]
+
+    def _planner_estimate(self, queryset, connection):
+        if connection.vendor != "postgresql":
+            return None
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def _cached_count(self, queryset):
+        key = f"pagination:count:{queryset.db}:{queryset.model._meta.db_table}"
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+            return count, False
+        return count, True
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    Opt-in page number pagination backed by :class:`EstimatedCountPaginator`.
+
+    Lists stay unpaginated unless ``?page_size=`` is given, so existing clients
+    keep receiving plain arrays.
+    """
+
+    django_paginator_class = EstimatedCountPaginator
+    page_size = None
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "count_estimated": self.page.paginator.count_estimated,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_estimated"] = {
+            "type": "boolean",
+            "example": False,
+        }
+        return response_schema
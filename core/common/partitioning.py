@@ -0,0 +1,108 @@
+"""
+Declarative partitioning of existing PostgreSQL tables.
+
+``partition_table`` turns a regular table into a partitioned one with the same
+name, columns, defaults, identity sequence, constraints and indexes, so Django
+keeps working with it unchanged. PostgreSQL requires every primary key and
+unique constraint of a partitioned table to include the partition key, so
+those get the key appended: a unique column such as ``global_id`` is then
+only unique together with the key. Foreign keys pointing *to* the table need
+a primary key of its own columns, so tables that other tables reference can
+only be partitioned by a key their primary key already includes.
+
+The conversion copies every row, so run it in a maintenance window on large
+tables.
+"""
+
+from django.db import connection as default_connection
+
+
+def hash_partition_sql(table, modulus, remainder):
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{table}_p{remainder}" PARTITION OF "{table}" '
+        f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+    )
+
+
+def with_partition_key(definition, key):
+    """
+    Append ``key`` to a ``PRIMARY KEY (...)`` or ``UNIQUE (...)`` constraint
+    definition that does not already include it
+    """
+    head, columns = definition.split("(", 1)
+    columns = columns.rsplit(")", 1)[0]
+    names = [name.strip().strip('"') for name in columns.split(",")]
+    if key in names:
+        return definition
+    return f'{head}({columns}, "{key}")'
+
+
+def is_partitioned(table, connection=default_connection):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_table(cursor, table, method, key, partition_statements):
+    """
+    Convert ``table`` to a table partitioned ``BY {method} ({key})`` holding
+    its current rows, creating the partitions with ``partition_statements``
+    (as built by ``hash_partition_sql``)
+    """
+    old = f"{table}_unpartitioned"
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass",
+        [table],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s",
+        [table],
+    )
+    constraint_names = {name for name, _, _ in constraints}
+    indexes = [(name, definition) for name, definition in cursor.fetchall() if name not in constraint_names]
+    cursor.execute(
+        "SELECT conname, conrelid::regclass::text, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE confrelid = %s::regclass AND contype = 'f' AND conrelid <> confrelid",
+        [table],
+    )
+    inbound = cursor.fetchall()
+    key_in_primary_key = any(
+        kind == "p" and with_partition_key(definition, key) == definition for _, kind, definition in constraints
+    )
+    if inbound and not key_in_primary_key:
+        referencing = ", ".join(sorted({referencing_table for _, referencing_table, _ in inbound}))
+        raise ValueError(f"Partitioning {table} by {key} would drop the foreign keys from {referencing}")
+
+    for name, referencing_table, _ in inbound:
+        cursor.execute(f'ALTER TABLE "{referencing_table}" DROP CONSTRAINT "{name}"')
+    cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+
+    cursor.execute(
+        f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING GENERATED) '
+        f'PARTITION BY {method} ("{key}")'
+    )
+    for statement in partition_statements:
+        cursor.execute(statement)
+    # Copy before indexing: building indexes once is cheaper than maintaining
+    # them per row. Dropping the old table frees the constraint and index names.
+    cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+    cursor.execute(f'DROP TABLE "{old}"')
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE((SELECT MAX(id) FROM \"{table}\"), 0) + 1, false)",
+        [table],
+    )
+
+    for name, kind, definition in constraints:
+        if kind in ("p", "u"):
+            definition = with_partition_key(definition, key)
+        cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+    for _, definition in indexes:
+        cursor.execute(definition)
+    for name, referencing_table, definition in inbound:
+        cursor.execute(f'ALTER TABLE "{referencing_table}" ADD CONSTRAINT "{name}" {definition}')
@@ -0,0 +1,206 @@
+"""
+On-demand profiling of single requests.
+
+A staff user sends any request with ``X-Profile: cprofile`` (or ``sample``),
+or with ``?_profile=cprofile``, and ``ProfilingMiddleware`` runs just that
+request under the chosen profiler:
+
+- ``cprofile`` records every call with cProfile and saves a ``.pstats`` file
+  (``python -m pstats``, snakeviz).
+- ``sample`` records the request thread's stack every
+  ``PROFILING_SAMPLE_INTERVAL`` seconds from a background thread and saves the
+  stacks in the collapsed ``.folded`` format of flamegraph.pl and speedscope.
+  It adds far less overhead, so timings stay close to reality.
+
+Artifacts go to ``PROFILING_DIR``, keeping the newest ``PROFILING_MAX_FILES``,
+and admins list and download them at ``/api/profiles/``. The response names
+its profile in ``X-Profile-Id``. Requests without the flag, and flags from
+anyone but staff, cost one header lookup and nothing else.
+"""
+
+import cProfile
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.utils import timezone
+from rest_framework import permissions
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+# One profiled request per process at a time; cProfile cannot run twice
+_profiling = threading.Lock()
+
+
+class CProfiler:
+    extension = "pstats"
+
+    def __enter__(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+
+    def save(self, path):
+        self.profile.dump_stats(path)
+
+
+class SamplingProfiler:
+    extension = "folded"
+
+    def __init__(self, interval=None):
+        self.interval = interval or settings.PROFILING_SAMPLE_INTERVAL
+        self.samples = Counter()
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._sampler.join()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def save(self, path):
+        Path(path).write_text("".join(f"{stack} {count}\n" for stack, count in self.samples.items()))
+
+
+PROFILERS = {"cprofile": CProfiler, "sample": SamplingProfiler}
+
+
+def is_staff(request):
+    """
+    Whether the request comes from a staff user, by session or bearer token.
+    The token is only checked here because the request asked for a profile.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+
+def profile_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+def store(profiler, request, response, duration):
+    """
+    Save the artifact of ``profiler`` with a JSON description next to it,
+    drop the oldest beyond ``PROFILING_MAX_FILES`` and return the profile id
+    """
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    now = timezone.now()
+    profile_id = f"{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    artifact = directory / f"{profile_id}.{profiler.extension}"
+    profiler.save(artifact)
+    description = {
+        "id": profile_id,
+        "mode": next(mode for mode, cls in PROFILERS.items() if isinstance(profiler, cls)),
+        "file": artifact.name,
+        "method": request.method,
+        "path": request.get_full_path(),
+        "status": response.status_code,
+        "duration_ms": round(duration * 1000, 1),
+        "created_at": now.isoformat(),
+    }
+    (directory / f"{profile_id}.json").write_text(json.dumps(description))
+
+    for stale in list_profiles()[settings.PROFILING_MAX_FILES:]:
+        (directory / stale["file"]).unlink(missing_ok=True)
+        (directory / f"{stale['id']}.json").unlink(missing_ok=True)
+    return profile_id
+
+
+def list_profiles():
+    """
+    Descriptions of the stored profiles, newest first
+    """
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = [json.loads(path.read_text()) for path in directory.glob("*.json")]
+    return sorted(profiles, key=lambda profile: profile["created_at"], reverse=True)
+
+
+class ProfilingMiddleware:
+    """
+    Profile the requests of staff users that ask for it (see module docs).
+    Place it after ``AuthenticationMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.META.get("HTTP_X_PROFILE")
+        if mode is None and "_profile=" in request.META.get("QUERY_STRING", ""):
+            mode = request.GET.get("_profile")
+        if mode not in PROFILERS or not is_staff(request) or not _profiling.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            start = time.perf_counter()
+            with PROFILERS[mode]() as profiler:
+                response = self.get_response(request)
+            profile_id = store(profiler, request, response, time.perf_counter() - start)
+        finally:
+            _profiling.release()
+        response["X-Profile-Id"] = profile_id
+        return response
+
+
+class ProfileListView(APIView):
+    """
+    List the stored request profiles, newest first
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(list_profiles())
+
+
+class ProfileDownloadView(APIView):
+    """
+    Download the artifact of one stored profile
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        if not PROFILE_ID.match(profile_id):
+            raise Http404
+        matches = [path for path in profile_dir().glob(f"{profile_id}.*") if path.suffix != ".json"]
+        if not matches:
+            raise Http404
+        return FileResponse(matches[0].open("rb"), as_attachment=True, filename=matches[0].name)
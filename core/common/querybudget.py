@@ -0,0 +1,149 @@
+"""
+Per-action query budgets.
+
+A view declares ``query_budgets = {"list": 5, ...}``: the most queries one
+request to that action may run, authentication included. With
+``QUERY_BUDGET_MODE`` set, ``QueryBudgetMixin`` counts the queries each
+budgeted request runs on every database connection, from the thread serving
+it only. Past the budget it reports the statements that were repeated and
+the application code that ran them, which is where an N+1 introduced by a
+new nested serializer field shows up:
+
+* "log" (e.g. on staging) logs a warning
+* "raise" raises ``QueryBudgetExceeded`` for reads; writes have committed by
+  then, so failing them would hide a change that was made, and their
+  overruns are logged as errors instead
+* "strict", set by ``QueryBudgetTestRunner``, raises for every request
+"""
+
+import logging
+import os
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Recorder of the request being served in this thread; a connection shared
+# with other threads (e.g. by a live test server) runs their queries too
+_recorder = ContextVar("query_budget_recorder", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised when a request runs more queries than its action's budget
+    """
+
+
+def query_stack(limit=12):
+    """
+    The ``limit`` innermost frames that led to a query, innermost last,
+    skipping the ORM's own. Source lines are only read if it is formatted.
+    """
+    frames = traceback.StackSummary.extract(traceback.walk_stack(None), lookup_lines=False)
+    frames = [
+        frame
+        for frame in frames
+        if f"{os.sep}django{os.sep}db{os.sep}" not in frame.filename and frame.filename != __file__
+    ]
+    return list(reversed(frames[:limit]))
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    ``execute_wrapper`` recording each statement, with the stack that ran
+    it, in the current request's ``QueryRecorder``
+    """
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.queries.append((sql, query_stack()))
+    return execute(sql, params, many, context)
+
+
+class QueryRecorder:
+    """
+    The statements run by one request
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def report(self, limit=3):
+        """
+        Describe the ``limit`` most repeated statements and where the first
+        execution of each came from
+        """
+        repeated = Counter(sql for sql, _ in self.queries)
+        lines = []
+        for sql, count in repeated.most_common(limit):
+            if count < 2:
+                break
+            stack = next(stack for statement, stack in self.queries if statement == sql)
+            lines.append(f"{count}x {sql}")
+            lines.extend("  " + line.rstrip("\n") for line in traceback.format_list(stack))
+        return "\n".join(lines) or "No statement ran more than once."
+
+
+class QueryBudgetMixin:
+    """
+    Enforce ``query_budgets``, keyed by viewset action (or lowercase HTTP
+    method on plain views), according to ``QUERY_BUDGET_MODE``
+    """
+
+    query_budgets = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        action = getattr(self, "action_map", {}).get(method, method)
+        budget = self.query_budgets.get(action)
+        mode = getattr(settings, "QUERY_BUDGET_MODE", "off")
+        if budget is None or mode == "off":
+            return super().dispatch(request, *args, **kwargs)
+
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    # Already there while serving a batched sub-request
+                    if record_query not in connection.execute_wrappers:
+                        stack.enter_context(connection.execute_wrapper(record_query))
+                response = super().dispatch(request, *args, **kwargs)
+        finally:
+            _recorder.reset(token)
+
+        if len(recorder.queries) > budget:
+            message = (
+                f"{type(self).__name__}.{action} ran {len(recorder.queries)} queries, over its budget "
+                f"of {budget}, for {request.method} {request.get_full_path()}\n{recorder.report()}"
+            )
+            if mode == "strict" or (mode == "raise" and request.method in SAFE_METHODS):
+                raise QueryBudgetExceeded(message)
+            if mode == "raise":
+                logger.error(message)
+            else:
+                logger.warning(message)
+        return response
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """
+    Test runner failing every request that goes over its query budget
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.strict_budgets = override_settings(QUERY_BUDGET_MODE="strict")
+        self.strict_budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.strict_budgets.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,55 @@
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def to_columnar(data):
+    """
+    Convert a list of serialized objects into ``{"columns": [...], "rows": [...]}``.
+
+    Field names are emitted once and each object becomes a row of values in
+    column order. Paginated payloads have their ``results`` converted in place;
+    anything that is not a list of dicts is returned unchanged.
+    """
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        return {**data, "results": to_columnar(data["results"])}
+    if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+        return data
+    columns = list(data[0].keys()) if data else []
+    return {
+        "columns": columns,
+        "rows": [[item.get(column) for column in columns] for item in data],
+    }
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    JSON renderer that lists field names once instead of once per object
+    """
+
+    media_type = "application/vnd.tibanode.columnar+json"
+    format = "columnar"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columnar(data), accepted_media_type, renderer_context)
+
+
+class ColumnarMessagePackRenderer(BaseRenderer):
+    """
+    MessagePack encoding of the columnar representation
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(
+            to_columnar(data), default=JSONEncoder().default, use_bin_type=True
+        )
+
+
+COLUMNAR_RENDERER_CLASSES = [ColumnarJSONRenderer, ColumnarMessagePackRenderer]
@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.middleware.gzip import re_accepts_gzip
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition, require_safe
+
+
+def generate_schema():
+    """
+    Introspect the API and return the OpenAPI document as JSON bytes.
+
+    drf_yasg is imported here rather than at module level so that workers which
+    never generate a schema do not pay for loading it.
+    """
+    from drf_yasg import openapi
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    info = openapi.Info(
+        title="TibaNode API",
+        default_version="v1",
+        description="API documentation for TibaNode project",
+        contact=openapi.Contact(email="info@cema.africa"),
+        license=openapi.License(name="MIT License"),
+    )
+    schema = OpenAPISchemaGenerator(info).get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+def write_schema(path):
+    """
+    Generate the schema and write it, plus a gzip copy, next to ``path``
+    """
+    path = Path(path)
+    content = generate_schema()
+    path.write_bytes(content)
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(content, mtime=0))
+    return content
+
+
+class SchemaDocument:
+    """
+    A schema held in memory in plain and gzip form, with one ETag per encoding
+    """
+
+    def __init__(self, content, compressed=None):
+        self.content = content
+        self.compressed = compressed or gzip.compress(content, mtime=0)
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+
+@lru_cache(maxsize=None)
+def load_schema(path):
+    """
+    Load the precomputed schema from ``path``, generating it in memory when the
+    file is missing (e.g. in development before ``generate_schema`` has run).
+    """
+    path = Path(path)
+    if not path.is_file():
+        return SchemaDocument(generate_schema())
+    gz_path = path.with_name(path.name + ".gz")
+    compressed = gz_path.read_bytes() if gz_path.is_file() else None
+    return SchemaDocument(path.read_bytes(), compressed)
+
+
+def _accepts_gzip(request):
+    return bool(re_accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+
+
+def _schema_etag(request):
+    document = load_schema(settings.OPENAPI_SCHEMA_FILE)
+    return document.gzip_etag if _accepts_gzip(request) else document.etag
+
+
+@require_safe
+@condition(etag_func=_schema_etag)
+def openapi_schema(request):
+    """
+    Serve the precomputed OpenAPI document, gzip-encoded when accepted
+    """
+    document = load_schema(settings.OPENAPI_SCHEMA_FILE)
+    if _accepts_gzip(request):
+        response = HttpResponse(document.compressed, content_type="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(document.content, content_type="application/json")
+    patch_vary_headers(response, ("Accept-Encoding",))
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@require_safe
+def redoc(request):
+    """
+    ReDoc UI pointed at the precomputed schema
+    """
+    redoc_settings = {"url": reverse("schema-json"), "lazyRendering": False}
+    return render(
+        request,
+        "drf-yasg/redoc.html",
+        {"title": "TibaNode API", "redoc_settings": json.dumps(redoc_settings)},
+    )
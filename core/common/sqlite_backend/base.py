@@ -0,0 +1,69 @@
+"""
+SQLite backend whose transactions queue for the write lock in arrival order.
+
+SQLite has no queue for its lock: a connection that finds the database busy
+sleeps and retries, with sleeps growing up to 100 ms, and the lock goes to
+whichever retry comes first once it is released. Under sustained writes a
+few transactions keep losing and wait for seconds while the rest go through
+in milliseconds. Here each transaction first takes an exclusive ``flock`` on
+a lock file next to the database, where the kernel puts waiters to sleep
+and wakes them as the lock frees, so they no longer poll against each other
+and none is starved.
+
+Only ``transaction.atomic()`` blocks queue; statements run in autocommit
+mode still rely on the busy timeout. In-memory databases, and platforms
+without ``fcntl``, are left to SQLite alone.
+"""
+
+import os
+
+from django.db.backends.sqlite3 import base
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _writer_lock = None
+
+    def writer_lock(self):
+        if self._writer_lock is None and fcntl is not None and not self.is_in_memory_db():
+            self._writer_lock = os.open(f"{self.settings_dict['NAME']}-writer.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        return self._writer_lock
+
+    def _start_transaction_under_autocommit(self):
+        lock = self.writer_lock()
+        if lock is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self._release_writer_lock()
+            raise
+
+    def _release_writer_lock(self):
+        if self._writer_lock is not None:
+            fcntl.flock(self._writer_lock, fcntl.LOCK_UN)
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_writer_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_writer_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            if self._writer_lock is not None:
+                # Closing the descriptor releases the lock
+                os.close(self._writer_lock)
+                self._writer_lock = None
@@ -0,0 +1,126 @@
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+
+def iter_view_classes(patterns=None):
+    """
+    Yield the DRF view classes reachable from the root URLconf
+    """
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_view_classes(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            view_class = getattr(pattern.callback, "cls", None)
+            if view_class is not None:
+                yield view_class
+
+
+def _warm_api_settings():
+    for name in (
+        "DEFAULT_AUTHENTICATION_CLASSES",
+        "DEFAULT_THROTTLE_CLASSES",
+        "DEFAULT_RENDERER_CLASSES",
+        "DEFAULT_PARSER_CLASSES",
+    ):
+        for cls in getattr(api_settings, name):
+            cls()
+
+
+def _warm_urlconf():
+    resolver = get_resolver()
+    # Accessing reverse_dict compiles every pattern of the URLconf.
+    resolver.reverse_dict
+    for view_class in iter_view_classes():
+        for name in ("authentication_classes", "throttle_classes", "renderer_classes"):
+            for cls in getattr(view_class, name, ()):
+                cls()
+
+
+def _warm_serializers():
+    seen = set()
+    for view_class in iter_view_classes():
+        serializer_class = getattr(view_class, "serializer_class", None)
+        if serializer_class is None or serializer_class in seen:
+            continue
+        seen.add(serializer_class)
+        serializer_class().fields
+
+
+def _warm_schema():
+    from .schema import load_schema
+
+    if Path(settings.OPENAPI_SCHEMA_FILE).is_file():
+        load_schema(settings.OPENAPI_SCHEMA_FILE)
+
+
+PHASES = [
+    ("api_settings", _warm_api_settings),
+    ("urlconf", _warm_urlconf),
+    ("serializers", _warm_serializers),
+    ("schema", _warm_schema),
+]
+
+
+_warmed = False
+
+
+def warm_up(force=False):
+    """
+    Do the one-off work a fresh worker would otherwise do on its first request.
+
+    Imports and instantiates DRF/simplejwt classes, compiles the URLconf,
+    builds serializer fields and loads the precomputed schema. Returns
+    ``[(phase, seconds), ...]``, or ``[]`` when this process has already
+    warmed up or ``STARTUP_WARM_UP = False``, unless ``force`` is set. A
+    failing phase is logged and skipped so that warm-up can never keep a
+    worker from starting.
+
+    Nothing here touches the database: this runs on import of config.wsgi,
+    which gunicorn's ``--preload`` does in the master before forking. See
+    ``warm_connections`` for that.
+    """
+    global _warmed
+    if not (force or (getattr(settings, "STARTUP_WARM_UP", True) and not _warmed)):
+        return []
+    _warmed = True
+
+    timings = []
+    for name, func in PHASES:
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            logger.warning("Startup warm-up phase %r failed", name, exc_info=True)
+        elapsed = time.perf_counter() - start
+        timings.append((name, elapsed))
+        logger.info("Startup warm-up phase %r took %.1f ms", name, elapsed * 1000)
+    return timings
+
+
+def warm_connections():
+    """
+    Open this process's database connections ahead of its first request.
+
+    Called by each gunicorn worker once it has loaded the application (see
+    gunicorn.conf.py), never before a fork: a connection opened in the master
+    would be shared by every worker. Not used under ASGI, where requests do
+    not run on the thread that would open them. Failures are logged; the
+    first request connects as usual.
+    """
+    if not getattr(settings, "STARTUP_WARM_UP", True):
+        return
+    for connection in connections.all():
+        try:
+            connection.ensure_connection()
+        except Exception:
+            logger.warning("Could not open database connection %r", connection.alias, exc_info=True)
@@ -0,0 +1,145 @@
+import threading
+
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import SimpleRateThrottle
+
+# Refill and take a token in one step on the Redis server, so that requests
+# served by different workers at once cannot spend the same token. Numbers
+# are passed back as strings since Redis truncates Lua numbers to integers.
+TAKE_TOKEN_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "last")
+local tokens = tonumber(bucket[1]) or capacity
+local last = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * refill_rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "last", tostring(now))
+redis.call("EXPIRE", KEYS[1], ARGV[4])
+return {allowed, tostring(tokens)}
+"""
+
+# Per-process caches are only shared between the threads of one process.
+_bucket_lock = threading.Lock()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket throttle keyed per user, or per IP for anonymous requests.
+
+    A rate of ``"60/min"`` gives a bucket of 60 tokens refilled at one token
+    per second, so short bursts are allowed while the sustained rate is capped.
+    Each request costs one cache round trip regardless of how many requests
+    were made before it.
+
+    Buckets live in the default cache, so limits only hold across gunicorn
+    workers when that cache is shared (``REDIS_URL``); with the per-process
+    default each worker keeps its own buckets. Taking a token is atomic: a
+    Lua script on Redis, a lock around the read and write otherwise.
+    """
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f"user_{request.user.pk}"
+        else:
+            ident = f"ip_{self.get_ident(request)}"
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        refill_rate = self.num_requests / self.duration
+        if isinstance(self.cache, RedisCache):
+            allowed, tokens = self.take_token_on_redis(refill_rate)
+        else:
+            with _bucket_lock:
+                allowed, tokens = self.take_token(refill_rate)
+        if not allowed:
+            self.wait_seconds = (1 - tokens) / refill_rate
+        return allowed
+
+    def take_token(self, refill_rate):
+        """
+        Refill the bucket for the time since it was last used and take a
+        token if there is one. Returns ``(allowed, tokens left)``.
+        """
+        now = self.timer()
+        tokens, last = self.cache.get(self.key, (self.num_requests, now))
+        tokens = min(self.num_requests, tokens + max(0, now - last) * refill_rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+
+        # An untouched bucket is full again after `duration`, so the entry
+        # can expire then without changing behaviour.
+        self.cache.set(self.key, (tokens, now), self.duration)
+        return allowed, tokens
+
+    def take_token_on_redis(self, refill_rate):
+        """
+        ``take_token`` as a single script run on the Redis server
+        """
+        key = self.cache.make_and_validate_key(self.key)
+        client = self.cache._cache.get_client(key, write=True)
+        # Sent by hash (EVALSHA); the script itself only when Redis lacks it.
+        take = client.register_script(TAKE_TOKEN_SCRIPT)
+        allowed, tokens = take(keys=[key], args=[self.num_requests, refill_rate, self.timer(), self.duration])
+        return bool(allowed), float(tokens)
+
+    def wait(self):
+        return getattr(self, "wait_seconds", None)
+
+
+class RequestRateThrottle(TokenBucketThrottle):
+    """
+    General per-user/per-IP budget applied to every endpoint
+    """
+
+    scope = "request"
+
+
+class SearchRateThrottle(TokenBucketThrottle):
+    """
+    Budget for search queries, which are far more expensive than lookups
+    """
+
+    scope = "search"
+    search_params = ("search", "phonetic")
+
+    def get_cache_key(self, request, view):
+        if not any(request.query_params.get(param) for param in self.search_params):
+            return None
+        return super().get_cache_key(request, view)
+
+
+class BulkRateThrottle(TokenBucketThrottle):
+    """
+    Budget for bulk endpoints that touch many rows per request
+    """
+
+    scope = "bulk"
+
+
+class AuthRateThrottle(TokenBucketThrottle):
+    """
+    Budget for authentication endpoints, always keyed by IP since the
+    caller is not yet authenticated
+    """
+
+    scope = "auth"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": f"ip_{self.get_ident(request)}",
+        }
@@ -1,3 +1,119 @@
-from django.contrib import admin  # noqa  F401
+from django.contrib import admin
+from django.db.models import Sum
 
-# Register your models here.
+from core.common.admin import LargeTableAdminMixin, VersionedAdminMixin
+
+from .autocomplete import client_search_q
+from .cache import profile_cache
+from .documents import profiles_enabled, rebuild_profiles
+from .enrollments import update_enrollments
+from .models import Client, ClientProfileDocument, Enrollment, HealthProgram
+
+# The admin works on the default database; with FACILITY_SHARDS set, clients
+# of sharded facilities are only reachable through the API. The client and
+# enrollment changelists have no filters: gender and active are not indexed,
+# and a page filtered on program is still read in id order across the table.
+
+
+@admin.register(HealthProgram)
+class HealthProgramAdmin(admin.ModelAdmin):
+    list_display = ("name", "created_at", "enrollment_total", "active_total")
+    search_fields = ("name",)
+    readonly_fields = ("global_id", "created_at")
+
+    def get_queryset(self, request):
+        # Counted from the analytics rollups rather than the enrollments table
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(enrollment_count=Sum("rollups__enrollments"), active_count=Sum("rollups__active"))
+        )
+
+    @admin.display(description="Enrollments", ordering="enrollment_count")
+    def enrollment_total(self, program):
+        return program.enrollment_count or 0
+
+    @admin.display(description="Active", ordering="active_count")
+    def active_total(self, program):
+        return program.active_count or 0
+
+
+class EnrollmentInline(admin.TabularInline):
+    model = Enrollment
+    fields = ("program", "enrollment_date", "active", "notes")
+    readonly_fields = ("enrollment_date",)
+    extra = 0
+
+    def get_queryset(self, request):
+        # Each row is titled with Enrollment.__str__, which names both
+        return super().get_queryset(request).select_related("client", "program")
+
+
+@admin.register(Client)
+class ClientAdmin(LargeTableAdminMixin, VersionedAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "first_name", "last_name", "gender", "date_of_birth", "phone_number", "facility")
+    # Shows the search box; get_search_results does the searching
+    search_fields = ("first_name", "last_name", "phone_number")
+    search_help_text = "Start of a first or last name, or of a phone number"
+    sortable_by = ("id",)
+    readonly_fields = ("global_id", "registration_date")
+    inlines = [EnrollmentInline]
+    actions = ["refresh_profiles"]
+
+    def get_search_results(self, request, queryset, search_term):
+        condition = client_search_q(search_term)
+        if condition is None:
+            return queryset, False
+        return queryset.filter(condition), False
+
+    @admin.action(description="Refresh the cached profiles of selected clients")
+    def refresh_profiles(self, request, queryset):
+        refreshed = 0
+        for pks in self.in_chunks(queryset):
+            profile_cache.invalidate_many(pks)
+            if profiles_enabled():
+                rebuild_profiles(pks)
+            refreshed += len(pks)
+        self.message_user(request, f"Refreshed the profiles of {refreshed} clients.")
+
+
+@admin.register(Enrollment)
+class EnrollmentAdmin(LargeTableAdminMixin, VersionedAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "client", "program", "enrollment_date", "active")
+    list_select_related = ("client", "program")
+    search_fields = ("client__first_name", "client__last_name", "client__phone_number")
+    search_help_text = "Start of the client's first or last name, or of their phone number"
+    sortable_by = ("id",)
+    raw_id_fields = ("client",)
+    readonly_fields = ("enrollment_date", "global_id")
+    actions = ["deactivate", "reactivate"]
+
+    def get_search_results(self, request, queryset, search_term):
+        condition = client_search_q(search_term, related="client__")
+        if condition is None:
+            return queryset, False
+        return queryset.filter(condition), False
+
+    def set_active(self, request, queryset, active):
+        """
+        Update the selection a chunk at a time, each in its own transaction,
+        keeping sync, rollups and profiles consistent as the API does
+        """
+        updated = 0
+        for pks in self.in_chunks(queryset.filter(active=not active)):
+            count, client_ids = update_enrollments(
+                Enrollment.objects.filter(pk__in=pks, active=not active), active=active
+            )
+            updated += count
+            profile_cache.invalidate_many(client_ids.iterator())
+            if profiles_enabled():
+                ClientProfileDocument.objects.filter(client_id__in=client_ids).delete()
+        self.message_user(request, f"{'Reactivated' if active else 'Deactivated'} {updated} enrollments.")
+
+    @admin.action(description="Deactivate selected enrollments")
+    def deactivate(self, request, queryset):
+        self.set_active(request, queryset, False)
+
+    @admin.action(description="Reactivate selected enrollments")
+    def reactivate(self, request, queryset):
+        self.set_active(request, queryset, True)
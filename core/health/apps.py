@@ -5,3 +5,6 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core.health"
     verbose_name = "Health Management System"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,112 @@
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import ClientAccessLog
+
+logger = logging.getLogger(__name__)
+
+
+class AccessAuditLog:
+    """
+    Write-behind buffer for client access events.
+
+    Reads only append to an in-process buffer. With ``AUDIT_BACKGROUND_FLUSH``
+    on, a background thread writes the buffer with one ``bulk_create`` every
+    ``flush_interval`` seconds or as soon as ``batch_size`` events are waiting;
+    otherwise the buffer is written once the response has been sent
+    (``request_finished``). The buffer holds at most ``max_buffer`` events and
+    is flushed at interpreter exit, so a hard crash loses at most one flush
+    interval of events and a clean shutdown loses none. If the database is
+    unavailable, the oldest events are dropped first and counted in
+    ``dropped``.
+    """
+
+    batch_size = 500
+    flush_interval = 2.0
+    max_buffer = 50000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffer = deque()
+        self._thread = None
+        self._pid = None
+        self._wakeup = threading.Event()
+        self.dropped = 0
+
+    def record(self, request, client_id, action):
+        user = getattr(request, "user", None)
+        event = ClientAccessLog(
+            client_id=client_id,
+            user_id=user.pk if user is not None and user.is_authenticated else None,
+            action=action,
+            ip_address=request.META.get("REMOTE_ADDR"),
+            accessed_at=timezone.now(),
+        )
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self._buffer.popleft()
+                self.dropped += 1
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.batch_size
+        if getattr(settings, "AUDIT_BACKGROUND_FLUSH", False):
+            self._ensure_thread()
+            if full:
+                self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """
+        Write all buffered events; returns the number written
+        """
+        with self._lock:
+            events = list(self._buffer)
+            self._buffer.clear()
+        if not events:
+            return 0
+        try:
+            ClientAccessLog.objects.bulk_create(events, batch_size=self.batch_size)
+        except Exception:
+            logger.exception("Failed to write %d audit events", len(events))
+            with self._lock:
+                # Put them back in front of newer events, within the bound.
+                room = max(0, self.max_buffer - len(self._buffer))
+                kept = events[len(events) - room:] if room else []
+                self.dropped += len(events) - len(kept)
+                self._buffer.extendleft(reversed(kept))
+            return 0
+        return len(events)
+
+    def _ensure_thread(self):
+        # A forked worker does not inherit the parent's thread.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="audit-log-flusher", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+audit_log = AccessAuditLog()
+
+atexit.register(audit_log.flush)
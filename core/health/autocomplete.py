@@ -0,0 +1,153 @@
+import re
+from itertools import product
+
+from django.core.cache import caches
+from django.db.models import Q
+
+from core.common.metrics import record_cache_lookup
+
+from . import sharding
+from .matching import normalize_name, normalize_phone_prefix
+from .models import Client
+
+NAME_COLUMNS = ("first_name_normalized", "last_name_normalized")
+PHONE_QUERY = re.compile(r"[\d\s()+-]{3,}")
+
+
+def prefix_q(column, prefix):
+    """
+    ``column`` starts with ``prefix``, written as a range so that a plain
+    b-tree index serves it on every backend
+    """
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f"{column}__gte": prefix, f"{column}__lt": upper})
+
+
+def client_search_q(query, related=""):
+    """
+    Clients matching ``query`` as autocomplete matches it: a phone number
+    prefix, or name terms that each start the first or last name. Only index
+    range lookups, on the client reached through ``related`` (e.g.
+    "client__") if given. None when there is nothing to search for.
+    """
+    query = query.strip()
+    if PHONE_QUERY.fullmatch(query):
+        digits = normalize_phone_prefix(query)
+        return prefix_q(f"{related}phone_key", digits) if digits else None
+    terms = [term for term in map(normalize_name, query.split()) if term]
+    if not terms:
+        return None
+    condition = Q()
+    for term in terms:
+        condition &= prefix_q(f"{related}{NAME_COLUMNS[0]}", term) | prefix_q(f"{related}{NAME_COLUMNS[1]}", term)
+    return condition
+
+
+class ClientAutocomplete:
+    """
+    Top-N clients whose first name, last name or phone number starts with a
+    prefix.
+
+    Each column of each facility shard is searched with its own index-ordered
+    ``LIMIT`` query and the small results are merged, so the cost does not
+    grow with the number of matching clients. Results for prefixes up to ``cached_prefix_length``
+    characters, the ones that match the most rows, are kept in the
+    ``autocomplete`` cache and refreshed when a client with that prefix is
+    saved or deleted.
+    """
+
+    alias = "autocomplete"
+    max_limit = 50
+    cached_prefix_length = 3
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def search(self, query, limit=10):
+        limit = max(1, min(limit, self.max_limit))
+        query = query.strip()
+        if PHONE_QUERY.fullmatch(query):
+            return self._cached("phone", normalize_phone_prefix(query), limit)
+
+        terms = [term for term in map(normalize_name, query.split()) if term]
+        if not terms:
+            return []
+        if len(terms) == 1:
+            return self._cached("name", terms[0], limit)
+        return self._search_names(terms, limit)
+
+    def _cached(self, kind, prefix, limit):
+        if not prefix:
+            return []
+        search = self._search_phone if kind == "phone" else self._search_name
+        if len(prefix) > self.cached_prefix_length:
+            return search(prefix, limit)
+
+        cache_key = self.make_key(kind, prefix)
+        results = self.cache.get(cache_key)
+        record_cache_lookup("autocomplete", results is not None)
+        if results is None:
+            results = search(prefix, self.max_limit)
+            self.cache.set(cache_key, results)
+        return results[:limit]
+
+    def _search_phone(self, prefix, limit):
+        rows = []
+        # The top N of every facility shard hold the overall top N
+        for alias in sharding.shard_aliases():
+            rows += (
+                Client.objects.using(alias)
+                .filter(prefix_q("phone_key", prefix))
+                .order_by("phone_key", "id")
+                .values_list("id", "first_name", "last_name", "phone_number", "phone_key")[:limit]
+            )
+        rows.sort(key=lambda row: (row[4], row[0]))
+        return [self._result(row) for row in rows[:limit]]
+
+    def _search_name(self, prefix, limit):
+        return self._search_names([prefix], limit)
+
+    def _search_names(self, terms, limit):
+        first, rest = terms[0], terms[1:]
+        rows = {}
+        for alias, column in product(sharding.shard_aliases(), NAME_COLUMNS):
+            queryset = Client.objects.using(alias).filter(prefix_q(column, first))
+            for term in rest:
+                queryset = queryset.filter(
+                    prefix_q("first_name_normalized", term) | prefix_q("last_name_normalized", term)
+                )
+            for row in queryset.order_by(column, "id").values_list(
+                "id", "first_name", "last_name", "phone_number", column
+            )[:limit]:
+                rows.setdefault(row[0], row)
+        ordered = sorted(rows.values(), key=lambda row: (row[4], row[0]))
+        return [self._result(row) for row in ordered[:limit]]
+
+    @staticmethod
+    def _result(row):
+        return {"id": row[0], "full_name": f"{row[1]} {row[2]}", "phone_number": row[3]}
+
+    def make_key(self, kind, prefix):
+        return f"autocomplete:{kind}:{prefix}"
+
+    def invalidate_client(self, client):
+        """
+        Drop cached results for every short prefix of the client's names and
+        phone, both current and as last loaded, so that a renamed client also
+        leaves the results of its old name
+        """
+        keys = set()
+        for kind, field in (
+            ("name", "first_name_normalized"),
+            ("name", "last_name_normalized"),
+            ("phone", "phone_key"),
+        ):
+            value = getattr(client, field)
+            for current in {value, client.tracked_value(field, value)}:
+                for length in range(1, min(len(current), self.cached_prefix_length) + 1):
+                    keys.add(self.make_key(kind, current[:length]))
+        self.cache.delete_many(keys)
+
+
+client_autocomplete = ClientAutocomplete()
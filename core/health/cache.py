@@ -0,0 +1,87 @@
+import threading
+import time
+from itertools import islice
+
+from django.core.cache import caches
+
+from core.common.metrics import record_cache_lookup
+
+
+class ProfileCache:
+    """
+    Cache-aside store for serialized client profiles.
+
+    Entries live in the ``profiles`` cache alias, which bounds their number and
+    lifetime. Keys carry a generation number so that a change with a wide blast
+    radius (e.g. renaming a health program) can invalidate every profile with a
+    single write instead of deleting each key.
+    """
+
+    alias = "profiles"
+    generation_key = "profile:generation"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _generation(self):
+        # Seeding from the clock means an evicted generation restarts above
+        # every value handed out before, so stale entries are never reused.
+        return self.cache.get_or_set(
+            self.generation_key, lambda: int(time.time() * 1000), timeout=None
+        )
+
+    def make_key(self, client_id):
+        return f"profile:{self._generation()}:{client_id}"
+
+    def get(self, client_id):
+        data = self.cache.get(self.make_key(client_id))
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_cache_lookup(self.alias, data is not None)
+        return data
+
+    def set(self, client_id, data):
+        self.cache.set(self.make_key(client_id), data)
+
+    def invalidate(self, client_id):
+        self.cache.delete(self.make_key(client_id))
+
+    def invalidate_many(self, client_ids):
+        client_ids = iter(client_ids)
+        # In chunks, so that a queryset of ids is streamed rather than loaded
+        while chunk := list(islice(client_ids, 1000)):
+            self.cache.delete_many([self.make_key(client_id) for client_id in chunk])
+
+    def invalidate_all(self):
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            self._generation()
+
+    def clear(self):
+        self.cache.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+
+profile_cache = ProfileCache()
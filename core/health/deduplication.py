@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .matching import BLOCKING_KEY_FIELDS
+from .models import Client
+
+
+def find_duplicate_candidates(client, limit=10):
+    """
+    Return existing clients sharing at least one blocking key with ``client``.
+
+    Each candidate gets a ``matched_on`` list naming the shared keys, and the
+    result is ordered by how many keys matched, then newest first. Candidates
+    are ranked in the query, before the limit, so that a strong older match
+    is never cut off by newer ones that share a single key.
+    """
+    keys = {field: getattr(client, field) for field in BLOCKING_KEY_FIELDS if getattr(client, field)}
+    if not keys:
+        return []
+
+    condition = Q()
+    matches = Value(0)
+    for field, key in keys.items():
+        condition |= Q(**{field: key})
+        matches += Case(When(Q(**{field: key}), then=1), default=0, output_field=IntegerField())
+    candidates = list(
+        Client.objects.filter(condition)
+        .exclude(pk=client.pk)
+        .alias(matches=matches)
+        .order_by("-matches", "-id")[:limit]
+    )
+    for candidate in candidates:
+        candidate.matched_on = [field for field, key in keys.items() if getattr(candidate, field) == key]
+    return candidates
+
+
+def iter_blocks(field, max_block_size):
+    """
+    Yield lists of client ids sharing the same value of ``field``.
+
+    Rows are streamed in key order, so each block is found in a single pass over
+    the index. Blocks larger than ``max_block_size`` (e.g. a placeholder phone
+    number shared by thousands of records) are skipped, since they say little
+    about identity and would make pair generation quadratic.
+    """
+    rows = (
+        Client.objects.exclude(**{field: ""})
+        .order_by(field, "id")
+        .values_list(field, "id")
+        .iterator(chunk_size=5000)
+    )
+    current_key, block = None, []
+    for key, client_id in rows:
+        if key != current_key:
+            if 1 < len(block) <= max_block_size:
+                yield block
+            current_key, block = key, []
+        block.append(client_id)
+    if 1 < len(block) <= max_block_size:
+        yield block
+
+
+def candidate_pairs(max_block_size=50, fields=BLOCKING_KEY_FIELDS):
+    """
+    Return ``{(id_a, id_b): [matched fields]}`` for every pair of clients that
+    share a blocking key, with ``id_a < id_b``
+    """
+    pairs = defaultdict(list)
+    for field in fields:
+        for block in iter_blocks(field, max_block_size):
+            for i, id_a in enumerate(block):
+                for id_b in block[i + 1:]:
+                    pairs[(id_a, id_b)].append(field)
+    return pairs
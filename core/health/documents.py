@@ -0,0 +1,86 @@
+"""
+Materialized client profiles.
+
+When ``MATERIALIZED_PROFILES`` is enabled, each client's serialized profile is
+stored as rendered JSON in ``ClientProfileDocument`` so that the profile
+endpoint is a single primary-key lookup returning stored bytes. Documents are
+rebuilt when the client or one of its enrollments is saved. Changes that can
+touch many clients at once (renaming a program, bulk enrollment transitions)
+delete the affected documents with one statement instead, and they are
+rebuilt on the next read or by ``manage.py rebuild_profiles``.
+
+The client's ``age`` changes without any write, so it is left out of the
+stored documents and spliced in by ``with_age`` when one is served.
+"""
+
+from django.conf import settings
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from . import sharding
+from .models import Client, ClientProfileDocument, Enrollment
+
+
+def profiles_enabled():
+    return getattr(settings, "MATERIALIZED_PROFILES", False)
+
+
+def render_profile(client):
+    """
+    Return the profile of ``client`` as JSON text, exactly as the API
+    would render ``ClientSerializer`` output but without ``age``
+    """
+    from .serializers import ClientSerializer
+
+    data = ClientSerializer(client).data
+    del data["age"]
+    return JSONRenderer().render(data).decode()
+
+
+def with_age(document, client):
+    """
+    Return a stored ``document`` with the current age of ``client`` back in
+    its place after ``date_of_birth``
+    """
+    date_of_birth = f'"date_of_birth":"{client.date_of_birth.isoformat()}"'
+    return document.replace(date_of_birth, f'{date_of_birth},"age":{client.age}', 1)
+
+
+def rebuild_profiles(client_ids):
+    """
+    Render and upsert the profile documents of ``client_ids``.
+
+    Uses one query for the clients, one for their enrollments and one upsert,
+    whatever the number of clients. Return the number of documents written.
+    """
+    clients = Client.objects.filter(pk__in=client_ids).prefetch_related(
+        Prefetch("enrollments", queryset=Enrollment.objects.select_related("program"))
+    )
+    documents = [ClientProfileDocument(client=client, document=render_profile(client)) for client in clients]
+    ClientProfileDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["client"],
+        update_fields=["document", "updated_at"],
+    )
+    return len(documents)
+
+
+def get_profile_document(client_id):
+    """
+    Return the stored profile JSON of ``client_id``, or ``None``
+    """
+    return (
+        ClientProfileDocument.objects.filter(client_id=client_id)
+        .values_list("document", flat=True)
+        .first()
+    )
+
+
+def delete_program_profiles(program, using=None):
+    """
+    Delete the documents of every client enrolled in ``program``, on the
+    database ``using`` or, by default, on every facility shard
+    """
+    for alias in [using] if using else sharding.shard_aliases():
+        ClientProfileDocument.objects.using(alias).filter(client__enrollments__program_id=program.pk).delete()
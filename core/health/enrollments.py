@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models import F
+
+from core.sync import journal
+
+from . import rollups
+
+
+def update_enrollments(enrollments, **changes):
+    """
+    Apply ``changes`` to the ``enrollments`` queryset as one set-based UPDATE
+    that bumps their versions, journals them for sync and, when ``active``
+    changes, adjusts the analytics rollups. Callers filter out enrollments
+    that already have the new ``active`` value. Every step is a single
+    statement, or one per rollup row, however many enrollments match.
+    Return the number of rows changed and a queryset of the ids of their
+    clients, whose cached profiles are stale.
+    """
+    using = enrollments.db
+    with transaction.atomic(using=using, savepoint=False):
+        # The UPDATE skips model signals, so journal the rows for sync and
+        # adjust the analytics rollups here. Journaling locks the rows, and
+        # only those are counted and updated, so that concurrent changes can
+        # neither slip in between nor be counted twice.
+        changed = journal.record_selected(enrollments)
+        if "active" in changes:
+            rollups.enrollments_transitioned(changed, changes["active"], using)
+        # Bump versions so that in-flight conditional updates see the change
+        updated = changed.update(version=F("version") + 1, **changes)
+    return updated, changed.values_list("client_id", flat=True)
@@ -0,0 +1,37 @@
+from django.db.models import Q
+from rest_framework.filters import BaseFilterBackend
+
+from .matching import phonetic_key
+
+
+class PhoneticSearchFilter(BaseFilterBackend):
+    """
+    Filter clients whose names sound like every term of ``?phonetic=``.
+
+    Each term is reduced to its phonetic key and matched against the indexed
+    first/last name key columns, so the query is an index lookup rather than
+    fuzzy matching over the table.
+    """
+
+    search_param = "phonetic"
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, "").replace(",", " ").split()
+        for term in terms:
+            key = phonetic_key(term)
+            if key:
+                queryset = queryset.filter(
+                    Q(first_name_phonetic=key) | Q(last_name_phonetic=key)
+                )
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "Names to match by sound, e.g. 'Wanjilu Kamau'",
+                "schema": {"type": "string"},
+            }
+        ]
@@ -0,0 +1,161 @@
+import csv
+import json
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from core.sync import journal
+
+from . import sharding
+from .models import Client
+from .serializers import ClientSerializer
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    created: int = 0
+    errors: list = field(default_factory=list)
+
+
+@dataclass
+class UnreadableRow:
+    """
+    Stands in for a row that could not be parsed, so that it is reported
+    under its line number like any invalid row
+    """
+
+    error: str
+
+
+def read_rows(path):
+    """
+    Yield ``(line_number, row)`` pairs from a CSV (with header) or JSON Lines file
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        if str(path).endswith((".jsonl", ".ndjson")):
+            for line_number, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    row = UnreadableRow(f"Invalid JSON: {exc.msg} at column {exc.colno}.")
+                yield line_number, row
+        else:
+            reader = csv.DictReader(handle)
+            for row in reader:
+                # line_num is the physical line the row ended on
+                yield reader.line_num, row
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def validate_chunk(rows):
+    """
+    Validate ``[(line_number, row), ...]`` with ``ClientSerializer``.
+
+    Runs in worker processes, so it only does CPU work and never touches the
+    database. Returns ``(valid, errors)`` where ``valid`` holds
+    ``(line_number, validated_data)`` and ``errors`` holds
+    ``(line_number, serializer_errors)``, both in input order.
+    """
+    # One serializer for the whole chunk, as ListSerializer does, so that the
+    # fields are built once rather than once per row.
+    serializer = ClientSerializer()
+    valid, errors = [], []
+    for line_number, row in rows:
+        if isinstance(row, UnreadableRow):
+            errors.append((line_number, {api_settings.NON_FIELD_ERRORS_KEY: [row.error]}))
+            continue
+        try:
+            valid.append((line_number, serializer.run_validation(row)))
+        except serializers.ValidationError as exc:
+            errors.append((line_number, serializers.as_serializer_error(exc)))
+    return valid, errors
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+
+    # Forked workers inherit a configured Django; spawned ones do not.
+    if not apps.ready:
+        django.setup()
+
+
+class ClientImporter:
+    """
+    Validate client rows in a process pool and write them from a single writer.
+
+    At most ``max_pending`` chunks are in flight at once, so a slow database
+    stalls the reader instead of letting validated rows pile up in memory.
+    Chunks are consumed in submission order, which keeps both the writes and
+    the reported errors in input order whatever the number of workers.
+    """
+
+    def __init__(self, workers=1, chunk_size=1000, batch_size=1000, max_pending=None, dry_run=False):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.max_pending = max_pending or workers * 2
+        self.dry_run = dry_run
+
+    def run(self, rows):
+        result = ImportResult()
+        buffer = []
+
+        def consume(valid, errors):
+            result.errors.extend(errors)
+            buffer.extend(data for _, data in valid)
+            if len(buffer) >= self.batch_size:
+                result.created += self.write(buffer)
+                buffer.clear()
+
+        chunks = chunked(rows, self.chunk_size)
+        if self.workers <= 1:
+            for chunk in chunks:
+                result.read += len(chunk)
+                consume(*validate_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    result.read += len(chunk)
+                    pending.append(pool.submit(validate_chunk, chunk))
+                    if len(pending) >= self.max_pending:
+                        consume(*pending.popleft().result())
+                while pending:
+                    consume(*pending.popleft().result())
+
+        if buffer:
+            result.created += self.write(buffer)
+        return result
+
+    def write(self, records):
+        if self.dry_run:
+            return len(records)
+        # Each client goes to its facility's shard, the default database
+        # when sharding is off
+        by_shard = defaultdict(list)
+        for data in records:
+            client = Client(**data)
+            # bulk_create bypasses save(), which maintains the matching keys.
+            client.update_match_keys()
+            by_shard[sharding.shard_for_facility(client.facility)].append(client)
+        created = 0
+        for alias, clients in by_shard.items():
+            with transaction.atomic(using=alias):
+                clients = Client.objects.using(alias).bulk_create(clients, batch_size=self.batch_size)
+                journal.record_many(Client, [client.global_id for client in clients], using=alias)
+            created += len(clients)
+        return created
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.health.matching import MATCH_KEY_FIELDS
+from core.health.models import Client
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the indexed duplicate-detection and phonetic search keys of "
+        "every client, e.g. after adding a key or changing how keys are computed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, batch_size, **options):
+        last_id, updated = 0, 0
+        while True:
+            # Keyset pagination keeps every batch an index range scan.
+            batch = list(Client.objects.filter(id__gt=last_id).order_by("id")[:batch_size])
+            if not batch:
+                break
+            for client in batch:
+                client.update_match_keys()
+            with transaction.atomic():
+                Client.objects.bulk_update(batch, MATCH_KEY_FIELDS)
+            updated += len(batch)
+            last_id = batch[-1].id
+        self.stdout.write(self.style.SUCCESS(f"Updated keys of {updated} clients"))
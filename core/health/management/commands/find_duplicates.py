@@ -0,0 +1,49 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from core.health.deduplication import candidate_pairs
+from core.health.matching import BLOCKING_KEY_FIELDS
+
+
+class Command(BaseCommand):
+    help = (
+        "List candidate duplicate client pairs that share blocking keys, "
+        "as CSV (id_a, id_b, matched_on, score)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-score", type=int, default=1, help="Minimum number of shared keys"
+        )
+        parser.add_argument(
+            "--max-block-size",
+            type=int,
+            default=50,
+            help="Skip key values shared by more clients than this",
+        )
+        parser.add_argument(
+            "--key",
+            action="append",
+            choices=BLOCKING_KEY_FIELDS,
+            help="Blocking key to use (repeatable; default: all)",
+        )
+        parser.add_argument("--output", help="Write CSV here instead of stdout")
+
+    def handle(self, *args, min_score, max_block_size, **options):
+        pairs = candidate_pairs(max_block_size, options["key"] or BLOCKING_KEY_FIELDS)
+        rows = sorted(
+            ((len(fields), pair, fields) for pair, fields in pairs.items() if len(fields) >= min_score),
+            key=lambda row: (-row[0], row[1]),
+        )
+
+        handle = open(options["output"], "w", newline="") if options["output"] else None
+        try:
+            writer = csv.writer(handle or self.stdout, lineterminator="\n")
+            writer.writerow(["id_a", "id_b", "matched_on", "score"])
+            for score, (id_a, id_b), fields in rows:
+                writer.writerow([id_a, id_b, "|".join(fields), score])
+        finally:
+            if handle:
+                handle.close()
+        self.stderr.write(f"{len(rows)} candidate pairs")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.health.documents import rebuild_profiles
+from core.health.models import Client
+
+
+class Command(BaseCommand):
+    help = (
+        "Render and store the materialized profile document of every client, "
+        "e.g. after enabling MATERIALIZED_PROFILES or changing ClientSerializer"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        last_id, rebuilt = 0, 0
+        while True:
+            # Keyset pagination keeps every batch an index range scan.
+            ids = list(
+                Client.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            rebuilt += rebuild_profiles(ids)
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} profile documents"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.health import rollups, sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the enrollment rollups from the raw enrollments and fix any "
+        "that drifted, e.g. after raw SQL or fixture loads. Run it nightly."
+    )
+
+    def handle(self, *args, **options):
+        for alias in sharding.shard_aliases():
+            fixed = rollups.reconcile(alias)
+            self.stdout.write(self.style.SUCCESS(f"{alias}: fixed {fixed} rollup rows"))
@@ -0,0 +1,144 @@
+"""
+Blocking keys used to find possible duplicate clients.
+
+Each key is cheap to compute, stored in an indexed column on ``Client`` and
+chosen so that records of the same person are likely to share at least one of
+them. Comparing only records that share a key turns duplicate detection from
+an all-pairs comparison into index lookups.
+"""
+
+import re
+import unicodedata
+from datetime import date
+
+PHONETIC_CODES = {
+    **dict.fromkeys("BFPV", "1"),
+    **dict.fromkeys("CGJKQSXZ", "2"),
+    **dict.fromkeys("DT", "3"),
+    # R and L are interchangeable in many Bantu spellings (Wanjiru/Wanjilu).
+    **dict.fromkeys("LR", "4"),
+    **dict.fromkeys("MN", "5"),
+}
+
+# Spelling variants folded before coding, applied in order.
+PHONETIC_REWRITES = [
+    # Prenasalised initial stops are often written without the nasal
+    # (Mbugua/Bugua, Ndungu/Dungu, Ng'ang'a/Gang'a).
+    (re.compile(r"^M(?=B)"), ""),
+    (re.compile(r"^N(?=[DGJZ])"), ""),
+    # Luo DH/TH and other English digraphs (Odhiambo/Odiambo, Okoth/Okot).
+    (re.compile(r"DH"), "D"),
+    (re.compile(r"TH"), "T"),
+    (re.compile(r"PH"), "F"),
+    (re.compile(r"[CK]H|CK"), "K"),
+    (re.compile(r"TCH"), "CH"),
+    (re.compile(r"SH"), "S"),
+    # NG' and NY are single nasals (Achieng/Akinyi, Nyambura/Niambura).
+    (re.compile(r"N[GY]"), "N"),
+]
+
+PHONETIC_KEY_LENGTH = 8
+
+# Length of the national significant number in Kenya, Uganda and Tanzania.
+PHONE_DIGITS = 9
+EAST_AFRICAN_CALLING_CODES = ("211", "250", "254", "255", "256", "257")
+
+
+def normalize_name(name):
+    """
+    Upper-case ASCII letters only: "Wanjirũ-Kamau" -> "WANJIRUKAMAU"
+    """
+    name = unicodedata.normalize("NFKD", name or "")
+    return re.sub(r"[^A-Z]", "", name.encode("ascii", "ignore").decode().upper())
+
+
+def normalize_phone_prefix(prefix):
+    """
+    Normalize the start of a phone number the way ``normalize_phone`` would
+    normalize the whole number: "0712", "+254712" and "712" all become "712"
+    """
+    digits = re.sub(r"\D", "", prefix or "").lstrip("0")
+    if digits.startswith(EAST_AFRICAN_CALLING_CODES) and len(digits) > 3:
+        digits = digits[3:]
+    return digits[:PHONE_DIGITS]
+
+
+def normalize_phone(phone):
+    """
+    Reduce a phone number to its last nine digits so that "0712 345 678",
+    "+254712345678" and "254-712-345-678" compare equal
+    """
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-PHONE_DIGITS:] if len(digits) >= PHONE_DIGITS else digits
+
+
+def phonetic_key(name):
+    """
+    Phonetic key of a name tuned for East African spellings.
+
+    Soundex-style consonant classes with R/L merged, common digraphs and
+    prenasalised stops folded, every leading vowel coded alike and vowels
+    otherwise dropped, so that "Wanjiru"/"Wanjilu", "Odhiambo"/"Odiambo",
+    "Mbugua"/"Bugua" and "Achieng"/"Akinyi" share a key.
+    """
+    name = normalize_name(name)
+    for pattern, replacement in PHONETIC_REWRITES:
+        name = pattern.sub(replacement, name)
+    if not name:
+        return ""
+
+    code = "V" if name[0] in "AEIOU" else ""
+    previous = ""
+    for letter in name:
+        digit = PHONETIC_CODES.get(letter, "")
+        if digit and digit != previous:
+            code += digit
+        # H, W and Y do not separate letters with the same code; vowels do.
+        if letter not in "HWY":
+            previous = digit
+    return code[:PHONETIC_KEY_LENGTH]
+
+
+def name_sound_key(first_name, last_name):
+    """
+    Phonetic key of the full name, independent of name order
+    """
+    codes = sorted(code for code in (phonetic_key(first_name), phonetic_key(last_name)) if code)
+    return ":".join(codes)
+
+
+def dob_name_key(date_of_birth, last_name):
+    """
+    Date of birth plus the first three letters of the last name
+    """
+    prefix = normalize_name(last_name)[:3]
+    if not date_of_birth or not prefix:
+        return ""
+    if isinstance(date_of_birth, str):
+        date_of_birth = date.fromisoformat(date_of_birth)
+    return f"{date_of_birth:%Y%m%d}{prefix}"
+
+
+def match_keys(client):
+    """
+    Return ``{field_name: key}`` for every matching key column of ``client``
+    """
+    return {
+        "phone_key": normalize_phone(client.phone_number),
+        "dob_name_key": dob_name_key(client.date_of_birth, client.last_name),
+        "name_sound_key": name_sound_key(client.first_name, client.last_name),
+        "first_name_phonetic": phonetic_key(client.first_name),
+        "last_name_phonetic": phonetic_key(client.last_name),
+        "first_name_normalized": normalize_name(client.first_name),
+        "last_name_normalized": normalize_name(client.last_name),
+    }
+
+
+# Keys used to pair up possible duplicates
+BLOCKING_KEY_FIELDS = ("phone_key", "dob_name_key", "name_sound_key")
+MATCH_KEY_FIELDS = BLOCKING_KEY_FIELDS + (
+    "first_name_phonetic",
+    "last_name_phonetic",
+    "first_name_normalized",
+    "last_name_normalized",
+)
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-19 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientAccessLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_id', models.BigIntegerField()),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('action', models.CharField(choices=[('retrieve', 'Retrieve'), ('profile', 'Profile')], max_length=20)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('accessed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['client_id', 'accessed_at'], name='health_clie_client__4d6ddc_idx'), models.Index(fields=['user_id', 'accessed_at'], name='health_clie_user_id_2422de_idx')],
+            },
+        ),
+    ]
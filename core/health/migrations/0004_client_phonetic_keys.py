@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 00:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0003_client_blocking_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='first_name_phonetic',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=8),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='last_name_phonetic',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=8),
+        ),
+    ]
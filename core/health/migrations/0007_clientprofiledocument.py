@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-19 00:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0006_row_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientProfileDocument',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile_document', serialize=False, to='health.client')),
+                ('document', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,43 @@
+import uuid
+
+from django.db import migrations, models
+
+MODELS = ("healthprogram", "client", "enrollment")
+
+
+def assign_global_ids(apps, schema_editor):
+    # A column default would give every existing row the same value.
+    using = schema_editor.connection.alias
+    for model_name in MODELS:
+        model = apps.get_model("health", model_name)
+        rows = list(model.objects.using(using).only("pk"))
+        for row in rows:
+            row.global_id = uuid.uuid4()
+        model.objects.using(using).bulk_update(rows, ["global_id"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0007_clientprofiledocument'),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name=model_name,
+                name='global_id',
+                field=models.UUIDField(editable=False, null=True),
+            )
+            for model_name in MODELS
+        ],
+        migrations.RunPython(assign_global_ids, migrations.RunPython.noop),
+        *[
+            migrations.AlterField(
+                model_name=model_name,
+                name='global_id',
+                field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+            )
+            for model_name in MODELS
+        ],
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+from core.common.partitioning import hash_partition_sql, is_partitioned, partition_table
+
+# Fixed here so that every database migrated ends up with the same layout;
+# changing it takes a new migration that repartitions the table.
+ENROLLMENT_HASH_PARTITIONS = 16
+
+
+def partition_tables(apps, schema_editor):
+    # PostgreSQL only; other databases keep plain tables.
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    if not is_partitioned("health_enrollment", connection):
+        # Hashing on client_id keeps unique (client, program) enforceable and
+        # a client's enrollments in one partition. global_id becomes unique
+        # per client only; sync still finds rows by (client, program).
+        statements = [
+            hash_partition_sql("health_enrollment", ENROLLMENT_HASH_PARTITIONS, i)
+            for i in range(ENROLLMENT_HASH_PARTITIONS)
+        ]
+        with connection.cursor() as cursor:
+            partition_table(cursor, "health_enrollment", "HASH", "client_id", statements)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0008_global_ids'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0009_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='facility',
+            field=models.CharField(blank=True, db_index=True, max_length=50),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 00:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0010_client_facility'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gender', models.CharField(choices=[('M', 'Male'), ('F', 'Female'), ('O', 'Other')], max_length=1)),
+                ('age_band', models.CharField(max_length=10)),
+                ('month', models.DateField()),
+                ('enrollments', models.IntegerField(default=0)),
+                ('active', models.IntegerField(default=0)),
+                ('program', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='health.healthprogram')),
+            ],
+            options={
+                'unique_together': {('program', 'gender', 'age_band', 'month')},
+            },
+        ),
+    ]
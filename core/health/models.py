@@ -1,24 +1,40 @@
+import uuid
+
 from django.db import models
 
+from core.common.models import TrackedFieldsModel, VersionedModel
+
+from .matching import MATCH_KEY_FIELDS, match_keys
+
 
-class HealthProgram(models.Model):
+class HealthProgram(TrackedFieldsModel):
     """
     Model representing a health program (e.g., TB, Malaria, HIV)
     """
 
+    # Client profiles show the program name (see core.health.documents)
+    tracked_fields = ("name",)
+
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Identifies the program across synchronized deployments (see core.sync)
+    global_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
 
     def __str__(self):
         return self.name
 
 
-class Client(models.Model):
+class Client(TrackedFieldsModel, VersionedModel):
     """
     Model representing a client in the health system
     """
 
+    # Enrollment rollups are bucketed by gender and date of birth (see
+    # core.health.rollups); autocomplete results are cached by the prefixes of
+    # the matching keys (see core.health.autocomplete)
+    tracked_fields = ("gender", "date_of_birth", "first_name_normalized", "last_name_normalized", "phone_key")
+
     GENDER_CHOICES = [
         ("M", "Male"),
         ("F", "Female"),
@@ -33,10 +49,34 @@ class Client(models.Model):
     email = models.EmailField(blank=True)
     address = models.TextField(blank=True)
     registration_date = models.DateTimeField(auto_now_add=True)
+    # Code of the registering facility, which also decides the database shard
+    # holding the client (see core.health.sharding)
+    facility = models.CharField(max_length=50, blank=True, db_index=True)
+    global_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+
+    # Keys for duplicate detection, phonetic and prefix search, maintained on save
+    phone_key = models.CharField(max_length=20, blank=True, db_index=True, editable=False)
+    dob_name_key = models.CharField(max_length=20, blank=True, db_index=True, editable=False)
+    name_sound_key = models.CharField(max_length=20, blank=True, db_index=True, editable=False)
+    first_name_phonetic = models.CharField(max_length=8, blank=True, db_index=True, editable=False)
+    last_name_phonetic = models.CharField(max_length=8, blank=True, db_index=True, editable=False)
+    first_name_normalized = models.CharField(max_length=100, blank=True, db_index=True, editable=False)
+    last_name_normalized = models.CharField(max_length=100, blank=True, db_index=True, editable=False)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    def save(self, *args, **kwargs):
+        self.update_match_keys()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *MATCH_KEY_FIELDS}
+        super().save(*args, **kwargs)
+
+    def update_match_keys(self):
+        for field, key in match_keys(self).items():
+            setattr(self, field, key)
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
@@ -56,11 +96,14 @@ class Client(models.Model):
         )
 
 
-class Enrollment(models.Model):
+class Enrollment(TrackedFieldsModel, VersionedModel):
     """
     Model representing a client's enrollment in a health program
     """
 
+    # Rollup bucket of the enrollment (see core.health.rollups)
+    tracked_fields = ("program_id", "client_id", "enrollment_date", "active")
+
     client = models.ForeignKey(
         Client, on_delete=models.CASCADE, related_name="enrollments"
     )
@@ -70,9 +113,76 @@ class Enrollment(models.Model):
     enrollment_date = models.DateField(auto_now_add=True)
     active = models.BooleanField(default=True)
     notes = models.TextField(blank=True)
+    global_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
 
     class Meta:
         unique_together = ["client", "program"]
 
     def __str__(self):
         return f"{self.client} enrolled in {self.program}"
+
+
+class EnrollmentRollup(models.Model):
+    """
+    Count of enrollments per program, gender, age band and month, kept up to
+    date on every enrollment and client change (see core.health.rollups)
+    """
+
+    program = models.ForeignKey(HealthProgram, on_delete=models.CASCADE, related_name="rollups")
+    gender = models.CharField(max_length=1, choices=Client.GENDER_CHOICES)
+    # Age of the client on the enrollment date, e.g. "15-24"
+    age_band = models.CharField(max_length=10)
+    # First day of the enrollment month
+    month = models.DateField()
+    enrollments = models.IntegerField(default=0)
+    active = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ["program", "gender", "age_band", "month"]
+
+    def __str__(self):
+        return f"{self.program_id}/{self.gender}/{self.age_band}/{self.month:%Y-%m}: {self.enrollments}"
+
+
+class ClientProfileDocument(models.Model):
+    """
+    Pre-rendered JSON profile of a client (see core.health.documents)
+    """
+
+    client = models.OneToOneField(
+        Client, on_delete=models.CASCADE, primary_key=True, related_name="profile_document"
+    )
+    document = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Profile document of client {self.client_id}"
+
+
+class ClientAccessLog(models.Model):
+    """
+    Model recording that a user viewed a client's record
+
+    Client and user are stored as plain ids rather than foreign keys so that
+    audit history survives deletions and inserts need no constraint checks.
+    """
+
+    ACTION_CHOICES = [
+        ("retrieve", "Retrieve"),
+        ("profile", "Profile"),
+    ]
+
+    client_id = models.BigIntegerField()
+    user_id = models.BigIntegerField(null=True, blank=True)
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    accessed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["client_id", "accessed_at"]),
+            models.Index(fields=["user_id", "accessed_at"]),
+        ]
+
+    def __str__(self):
+        return f"User {self.user_id} viewed client {self.client_id} ({self.action})"
@@ -0,0 +1,208 @@
+"""
+Enrollment rollups for analytics.
+
+``EnrollmentRollup`` holds the number of enrollments, and of active ones, per
+program, gender, age band and month. Every enrollment or client change adds
+its delta to the affected rows in the same transaction, one UPDATE per row
+touched, so dashboards read a few small rows instead of aggregating raw
+enrollments. The age band is the client's age on the enrollment date, which
+does not change as time passes.
+
+Writes that bypass the models (raw SQL, fixtures, queryset updates of other
+fields) are repaired by ``manage.py reconcile_rollups``, which recomputes
+every row from the raw data; run it nightly.
+"""
+
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.db.models.functions import ExtractDay, ExtractMonth, ExtractYear, TruncMonth
+
+from .models import Client, Enrollment, EnrollmentRollup
+
+# (lowest age, label), in increasing order
+AGE_BANDS = [(0, "0-4"), (5, "5-14"), (15, "15-24"), (25, "25-49"), (50, "50+")]
+KEY_FIELDS = ("program_id", "gender", "age_band", "month")
+
+
+def age_band(date_of_birth, on):
+    return band_for_age(on.year - date_of_birth.year - ((on.month, on.day) < (date_of_birth.month, date_of_birth.day)))
+
+
+def band_for_age(age):
+    label = AGE_BANDS[0][1]
+    for lowest, name in AGE_BANDS:
+        if age >= lowest:
+            label = name
+    return label
+
+
+def bucket(program_id, gender, date_of_birth, enrollment_date):
+    """
+    Rollup key, in ``KEY_FIELDS`` order, of an enrollment
+    """
+    return (program_id, gender, age_band(date_of_birth, enrollment_date), enrollment_date.replace(day=1))
+
+
+def enrollment_bucket(enrollment):
+    client = enrollment.client
+    return bucket(enrollment.program_id, client.gender, client.date_of_birth, enrollment.enrollment_date)
+
+
+def apply_deltas(deltas, using=DEFAULT_DB_ALIAS):
+    """
+    Add ``deltas``, ``{key: [enrollments, active]}``, to the rollups
+    """
+    for key, (enrollments, active) in deltas.items():
+        if not enrollments and not active:
+            continue
+        fields = dict(zip(KEY_FIELDS, key))
+        rows = EnrollmentRollup.objects.using(using).filter(**fields)
+        changes = {"enrollments": F("enrollments") + enrollments, "active": F("active") + active}
+        if not rows.update(**changes):
+            # First enrollment in the bucket. Ignoring conflicts keeps two
+            # concurrent first enrollments from failing one another.
+            EnrollmentRollup.objects.using(using).bulk_create([EnrollmentRollup(**fields)], ignore_conflicts=True)
+            rows.update(**changes)
+
+
+def enrollment_saved(enrollment, created, using=DEFAULT_DB_ALIAS):
+    """
+    Count a new enrollment, or move a changed one from its bucket as last
+    loaded to its current one, e.g. when the admin moves it to another
+    program or client
+    """
+    if created:
+        apply_deltas({enrollment_bucket(enrollment): [1, int(enrollment.active)]}, using)
+        return
+    old = {name: enrollment.tracked_value(name, getattr(enrollment, name)) for name in Enrollment.tracked_fields}
+    if all(value == getattr(enrollment, name) for name, value in old.items()):
+        return
+    client = enrollment.client
+    if old["client_id"] != enrollment.client_id:
+        client = Client.objects.using(using).only("gender", "date_of_birth").get(pk=old["client_id"])
+    deltas = defaultdict(lambda: [0, 0])
+    old_key = bucket(old["program_id"], client.gender, client.date_of_birth, old["enrollment_date"])
+    deltas[old_key][0] -= 1
+    deltas[old_key][1] -= int(old["active"])
+    deltas[enrollment_bucket(enrollment)][0] += 1
+    deltas[enrollment_bucket(enrollment)][1] += int(enrollment.active)
+    apply_deltas(deltas, using)
+
+
+def enrollment_deleted(enrollment, using=DEFAULT_DB_ALIAS):
+    active = enrollment.tracked_value("active", enrollment.active)
+    apply_deltas({enrollment_bucket(enrollment): [-1, -int(active)]}, using)
+
+
+def client_saved(client, created, using=DEFAULT_DB_ALIAS):
+    """
+    Move the client's enrollments to new buckets if their gender or date of
+    birth changed
+    """
+    old_gender = client.tracked_value("gender", client.gender)
+    old_date_of_birth = client.tracked_value("date_of_birth", client.date_of_birth)
+    if created or (old_gender, old_date_of_birth) == (client.gender, client.date_of_birth):
+        return
+    deltas = defaultdict(lambda: [0, 0])
+    enrollments = Enrollment.objects.using(using).filter(client=client)
+    for program_id, enrollment_date, active in enrollments.values_list("program_id", "enrollment_date", "active"):
+        for gender, date_of_birth, sign in (
+            (old_gender, old_date_of_birth, -1),
+            (client.gender, client.date_of_birth, 1),
+        ):
+            key = bucket(program_id, gender, date_of_birth, enrollment_date)
+            deltas[key][0] += sign
+            deltas[key][1] += sign * active
+    apply_deltas(deltas, using)
+
+
+def bucket_counts(enrollments):
+    """
+    Number of ``enrollments`` per rollup key, from one query counting them
+    by program, gender, age on the enrollment date and month
+    """
+    birth = "client__date_of_birth"
+    enrolled_before_birthday = Q(enrolled_month__lt=F("birth_month")) | Q(
+        enrolled_month=F("birth_month"), enrolled_day__lt=F("birth_day")
+    )
+    rows = (
+        enrollments.annotate(
+            enrolled_month=ExtractMonth("enrollment_date"),
+            enrolled_day=ExtractDay("enrollment_date"),
+            birth_month=ExtractMonth(birth),
+            birth_day=ExtractDay(birth),
+        )
+        .annotate(
+            age=ExtractYear("enrollment_date")
+            - ExtractYear(birth)
+            - Case(When(enrolled_before_birthday, then=Value(1)), default=Value(0)),
+            month=TruncMonth("enrollment_date"),
+        )
+        .order_by()
+        .values_list("program_id", "client__gender", "age", "month")
+        .annotate(count=Count("pk"))
+    )
+    counts = defaultdict(int)
+    for program_id, gender, age, month, count in rows:
+        counts[(program_id, gender, band_for_age(age), month)] += count
+    return counts
+
+
+def enrollments_transitioned(enrollments, active, using=DEFAULT_DB_ALIAS):
+    """
+    Account for a set-based update setting ``active`` on ``enrollments``,
+    all of which had the opposite value, from one aggregate query
+    """
+    sign = 1 if active else -1
+    apply_deltas({key: [0, sign * count] for key, count in bucket_counts(enrollments).items()}, using)
+
+
+def compute_rollups(using=DEFAULT_DB_ALIAS):
+    """
+    Count the enrollments of every bucket from the raw rows, streamed in
+    chunks so memory stays flat however many there are
+    """
+    counts = defaultdict(lambda: [0, 0])
+    rows = Enrollment.objects.using(using).values_list(
+        "program_id", "client__gender", "client__date_of_birth", "enrollment_date", "active"
+    )
+    for program_id, gender, date_of_birth, enrollment_date, active in rows.iterator(chunk_size=5000):
+        count = counts[bucket(program_id, gender, date_of_birth, enrollment_date)]
+        count[0] += 1
+        count[1] += active
+    return counts
+
+
+def reconcile(using=DEFAULT_DB_ALIAS):
+    """
+    Recompute the rollups of database ``using`` from the raw rows, fix the
+    rows that drifted and drop empty ones. Return the number of rows fixed.
+    """
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        if connection.vendor == "postgresql":
+            # Writers wait for the rollups until the recomputed counts are
+            # committed and then add their deltas on top, so none is lost.
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE "{EnrollmentRollup._meta.db_table}" IN SHARE ROW EXCLUSIVE MODE')
+        expected = compute_rollups(using)
+        existing = {
+            tuple(getattr(row, field) for field in KEY_FIELDS): row
+            for row in EnrollmentRollup.objects.using(using)
+        }
+        created, changed = [], []
+        for key, (enrollments, active) in expected.items():
+            row = existing.pop(key, None)
+            if row is None:
+                created.append(
+                    EnrollmentRollup(**dict(zip(KEY_FIELDS, key)), enrollments=enrollments, active=active)
+                )
+            elif (row.enrollments, row.active) != (enrollments, active):
+                row.enrollments, row.active = enrollments, active
+                changed.append(row)
+        EnrollmentRollup.objects.using(using).bulk_create(created)
+        EnrollmentRollup.objects.using(using).bulk_update(changed, ["enrollments", "active"])
+        EnrollmentRollup.objects.using(using).filter(pk__in=[row.pk for row in existing.values()]).delete()
+    return len(created) + len(changed) + len(existing)
@@ -1,11 +1,13 @@
 from rest_framework import serializers
-from .models import HealthProgram, Client, Enrollment
+from .rollups import AGE_BANDS
+from .sharding import shard_for_facility
+from .models import HealthProgram, Client, Enrollment, ClientAccessLog
 
 
 class HealthProgramSerializer(serializers.ModelSerializer):
     class Meta:
         model = HealthProgram
-        fields = "__all__"
+        exclude = ["global_id"]
 
 
 class EnrollmentSerializer(serializers.ModelSerializer):
@@ -13,7 +15,7 @@ class EnrollmentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Enrollment
-        fields = ["id", "program", "program_name", "enrollment_date", "active", "notes"]
+        fields = ["id", "program", "program_name", "enrollment_date", "active", "notes", "version"]
 
 
 class ClientSerializer(serializers.ModelSerializer):
@@ -35,5 +37,92 @@ class ClientSerializer(serializers.ModelSerializer):
             "email",
             "address",
             "registration_date",
+            "facility",
             "enrollments",
+            "version",
         ]
+
+    def validate_facility(self, value):
+        if self.instance is not None and shard_for_facility(value) != shard_for_facility(self.instance.facility):
+            raise serializers.ValidationError("Clients cannot be moved to a facility on another database shard")
+        return value
+
+
+class EnrollmentBulkUpdateSerializer(serializers.Serializer):
+    """
+    Selects the enrollments of a program that a bulk transition applies to
+    """
+
+    client_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=10000
+    )
+    enrolled_from = serializers.DateField(required=False)
+    enrolled_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if "enrolled_from" in attrs and "enrolled_to" in attrs and attrs["enrolled_from"] > attrs["enrolled_to"]:
+            raise serializers.ValidationError("enrolled_from must not be after enrolled_to")
+        return attrs
+
+    def filter(self, queryset):
+        data = self.validated_data
+        if "client_ids" in data:
+            queryset = queryset.filter(client_id__in=data["client_ids"])
+        if "enrolled_from" in data:
+            queryset = queryset.filter(enrollment_date__gte=data["enrolled_from"])
+        if "enrolled_to" in data:
+            queryset = queryset.filter(enrollment_date__lte=data["enrolled_to"])
+        return queryset
+
+
+class EnrollmentBulkAnnotateSerializer(EnrollmentBulkUpdateSerializer):
+    notes = serializers.CharField(allow_blank=True)
+
+
+class PossibleDuplicateSerializer(serializers.ModelSerializer):
+    full_name = serializers.ReadOnlyField()
+    matched_on = serializers.ListField(child=serializers.CharField(), read_only=True)
+
+    class Meta:
+        model = Client
+        fields = ["id", "full_name", "date_of_birth", "phone_number", "matched_on"]
+
+
+class ClientAccessLogSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ClientAccessLog
+        fields = ["id", "client_id", "user_id", "action", "ip_address", "accessed_at"]
+
+
+class EnrollmentAnalyticsQuerySerializer(serializers.Serializer):
+    """
+    Slice of the enrollment rollups to report. List parameters are repeated,
+    e.g. ``?group_by=program&group_by=month&gender=F``.
+    """
+
+    DIMENSIONS = ["program", "gender", "age_band", "month"]
+
+    group_by = serializers.ListField(child=serializers.ChoiceField(choices=DIMENSIONS), required=False)
+    program = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    gender = serializers.ListField(child=serializers.ChoiceField(choices=Client.GENDER_CHOICES), required=False)
+    age_band = serializers.ListField(
+        child=serializers.ChoiceField(choices=[label for _, label in AGE_BANDS]), required=False
+    )
+    month_from = serializers.DateField(input_formats=["%Y-%m"], required=False)
+    month_to = serializers.DateField(input_formats=["%Y-%m"], required=False)
+
+    def validate(self, attrs):
+        if "month_from" in attrs and "month_to" in attrs and attrs["month_from"] > attrs["month_to"]:
+            raise serializers.ValidationError("month_from must not be after month_to")
+        return attrs
+
+    def filter(self, queryset):
+        data = self.validated_data
+        for name in ("program", "gender", "age_band"):
+            if data.get(name):
+                queryset = queryset.filter(**{f"{name}__in": data[name]})
+        if "month_from" in data:
+            queryset = queryset.filter(month__gte=data["month_from"])
+        if "month_to" in data:
+            queryset = queryset.filter(month__lte=data["month_to"])
+        return queryset
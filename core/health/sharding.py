@@ -0,0 +1,230 @@
+"""
+Facility-based sharding of clients and their enrollments.
+
+``settings.FACILITY_SHARDS`` maps database aliases to the facilities whose
+clients they hold; everything else, including clients without a facility,
+stays on ``default``. Each shard allocates client and enrollment ids from its
+own range of ``ID_BLOCK`` ids, so an id is unique across shards and names the
+shard it lives on. Health programs are reference data: they are written to
+``default`` and copied to every shard.
+
+``FacilityRouter`` sends queries on the sharded models to the shard selected
+with ``use_shard`` for the current request, or to the database of the
+instance they concern. ``ShardedQuerySet`` runs one queryset on every shard
+in parallel for cross-facility listing and search.
+"""
+
+import copy
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Ids of the shard at position n of shard_aliases() start after n * ID_BLOCK
+ID_BLOCK = 10**12
+SHARDED_MODELS = {"health.client", "health.enrollment", "health.clientprofiledocument"}
+
+_pinned = ContextVar("pinned_shard", default=None)
+
+
+def shard_aliases():
+    """
+    ``default`` followed by the configured shards, in id range order
+    """
+    return [DEFAULT_DB_ALIAS, *settings.FACILITY_SHARDS]
+
+
+def is_sharded():
+    return bool(settings.FACILITY_SHARDS)
+
+
+def shard_for_facility(facility):
+    for alias, facilities in settings.FACILITY_SHARDS.items():
+        if facility in facilities:
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+def shard_for_pk(pk):
+    aliases = shard_aliases()
+    index = int(pk) // ID_BLOCK
+    return aliases[index] if 0 <= index < len(aliases) else DEFAULT_DB_ALIAS
+
+
+def shard_for_request(request, pk=None):
+    """
+    Shard holding everything a request about client ``pk`` or about the
+    ``?facility=`` clients needs, or None if it may span shards
+    """
+    if not is_sharded():
+        return None
+    if pk is not None:
+        return shard_for_pk(pk)
+    facility = request.GET.get("facility")
+    if facility is not None:
+        return shard_for_facility(facility)
+    return None
+
+
+def pinned_shard():
+    return _pinned.get()
+
+
+def current_shard():
+    return _pinned.get() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_shard(alias):
+    """
+    Route queries on the sharded models to ``alias`` (None: no preference)
+    """
+    token = _pinned.set(alias)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class FacilityRouter:
+    """
+    Database router placing clients, enrollments and profile documents on
+    their facility's shard. Other models are left to the default routing.
+    """
+
+    def _db_for(self, model, **hints):
+        if model._meta.label_lower not in SHARDED_MODELS:
+            return None
+        instance = hints.get("instance")
+        if instance is not None:
+            if instance._state.db:
+                return instance._state.db
+            if instance._meta.label_lower == "health.client" and _pinned.get() is None:
+                return shard_for_facility(instance.facility)
+        return _pinned.get()
+
+    db_for_read = _db_for
+    db_for_write = _db_for
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Programs are copied to every shard, so any row may point to them
+        if "health.healthprogram" in (obj1._meta.label_lower, obj2._meta.label_lower):
+            return True
+        return None
+
+
+def reserve_id_range(using):
+    """
+    Make the client and enrollment ids of shard ``using`` start at its block.
+    Never moves a sequence backwards; a no-op for ``default`` and for
+    databases that are not shards.
+    """
+    aliases = shard_aliases()
+    if using not in aliases[1:]:
+        return
+    floor = aliases.index(using) * ID_BLOCK
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for table in ("health_client", "health_enrollment"):
+            if connection.vendor == "sqlite":
+                cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, floor])
+                elif row[0] < floor:
+                    cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", [floor, table])
+            elif connection.vendor == "postgresql":
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    f'GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM "{table}")))',
+                    [table, floor],
+                )
+            else:
+                raise ImproperlyConfigured(f"Facility shards are not supported on {connection.vendor}")
+
+
+def copy_programs(programs, aliases=None):
+    """
+    Insert or update ``programs``, read from ``default``, on every shard
+    """
+    programs = list(programs)
+    if not programs:
+        return
+    model = type(programs[0])
+    fields = [
+        field.name
+        for field in model._meta.concrete_fields
+        if not field.primary_key and not getattr(field, "auto_now_add", False)
+    ]
+    for alias in aliases or shard_aliases()[1:]:
+        # Copies, since bulk_create moves the instances to the shard
+        model.objects.using(alias).bulk_create(
+            [copy.copy(program) for program in programs],
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=fields,
+        )
+
+
+def prepare_shard(using):
+    """
+    Reserve the id range of shard ``using`` and copy the programs to it
+    """
+    if using not in shard_aliases()[1:]:
+        return
+    from .models import HealthProgram
+
+    reserve_id_range(using)
+    copy_programs(HealthProgram.objects.using(DEFAULT_DB_ALIAS), [using])
+
+
+class ShardedQuerySet:
+    """
+    A queryset evaluated on every shard at once, in primary key order.
+
+    Supports what pagination and serialization need: ``count()``, slicing,
+    iteration and ``map_shards()``, with which the paginator estimates
+    counts shard by shard. Each runs one query per shard on a thread of its own, so
+    latency is that of the slowest shard rather than the sum.
+    """
+
+    def __init__(self, queryset, aliases=None):
+        self.queryset = queryset.order_by("pk")
+        self.aliases = aliases or shard_aliases()
+
+    def map_shards(self, function):
+        """
+        ``function`` applied to this queryset on each shard, in parallel
+        """
+
+        def run(alias):
+            try:
+                return function(self.queryset.using(alias))
+            finally:
+                # Worker threads open their own connections; do not leak them.
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=len(self.aliases)) as executor:
+            return list(executor.map(run, self.aliases))
+
+    def count(self):
+        return sum(self.map_shards(lambda queryset: queryset.count()))
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[slice(key, key + 1)][0]
+        start, stop = key.start or 0, key.stop
+        # Every shard's first `stop` rows hold the merged first `stop` rows
+        rows = self.map_shards(lambda queryset: list(queryset if stop is None else queryset[:stop]))
+        return list(islice(heapq.merge(*rows, key=lambda row: row.pk), start, stop))
+
+    def __iter__(self):
+        return iter(self[:])
@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import rollups, sharding
+from .audit import audit_log
+from .autocomplete import client_autocomplete
+from .cache import profile_cache
+from .documents import delete_program_profiles, profiles_enabled, rebuild_profiles
+from .models import Client, ClientProfileDocument, Enrollment, HealthProgram
+
+
+@receiver([post_save, post_delete], sender=Client)
+def invalidate_client_profile(sender, instance, **kwargs):
+    profile_cache.invalidate(instance.pk)
+    client_autocomplete.invalidate_client(instance)
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def invalidate_enrollment_profile(sender, instance, **kwargs):
+    # An enrollment moved to another client changes both profiles
+    profile_cache.invalidate_many({instance.client_id, instance.tracked_value("client_id", instance.client_id)})
+
+
+def program_renamed(instance):
+    # Unknown for an instance that was not loaded from the database
+    return instance.tracked_value("name") != instance.name
+
+
+@receiver(post_save, sender=HealthProgram)
+def invalidate_program_profiles(sender, instance, created=False, **kwargs):
+    # A new program has no enrollments yet, so no profile can mention it;
+    # profiles only show the program's name.
+    if not created and program_renamed(instance):
+        profile_cache.invalidate_all()
+
+
+@receiver(post_delete, sender=HealthProgram)
+def invalidate_deleted_program_profiles(sender, instance, **kwargs):
+    profile_cache.invalidate_all()
+
+
+@receiver(post_save, sender=Client)
+def rebuild_client_profile_document(sender, instance, raw=False, **kwargs):
+    if profiles_enabled() and not raw:
+        rebuild_profiles([instance.pk])
+
+
+@receiver(post_save, sender=Enrollment)
+def rebuild_enrollment_profile_document(sender, instance, raw=False, **kwargs):
+    if profiles_enabled() and not raw:
+        rebuild_profiles(list({instance.client_id, instance.tracked_value("client_id", instance.client_id)}))
+
+
+@receiver(post_delete, sender=Enrollment)
+def delete_enrollment_profile_document(sender, instance, **kwargs):
+    # Also runs while the client itself is being deleted, so drop the
+    # document rather than rebuild it; the next read rebuilds it if needed.
+    if profiles_enabled():
+        ClientProfileDocument.objects.filter(client_id=instance.client_id).delete()
+
+
+@receiver(post_save, sender=HealthProgram)
+def delete_program_profile_documents(sender, instance, created=False, raw=False, **kwargs):
+    if profiles_enabled() and not created and not raw and program_renamed(instance):
+        delete_program_profiles(instance)
+
+
+@receiver(post_save, sender=Enrollment)
+def update_rollups_on_enrollment_save(sender, instance, created, using, raw=False, **kwargs):
+    if not raw:
+        rollups.enrollment_saved(instance, created, using)
+
+
+@receiver(post_delete, sender=Enrollment)
+def update_rollups_on_enrollment_delete(sender, instance, using, **kwargs):
+    rollups.enrollment_deleted(instance, using)
+
+
+@receiver(post_save, sender=Client)
+def update_rollups_on_client_save(sender, instance, created, using, raw=False, **kwargs):
+    if not raw:
+        rollups.client_saved(instance, created, using)
+
+
+@receiver(post_save, sender=HealthProgram)
+def copy_program_to_shards(sender, instance, using, raw=False, **kwargs):
+    if using == DEFAULT_DB_ALIAS and not raw:
+        sharding.copy_programs([instance])
+
+
+@receiver(post_delete, sender=HealthProgram)
+def delete_program_from_shards(sender, instance, using, **kwargs):
+    if using == DEFAULT_DB_ALIAS:
+        for alias in sharding.shard_aliases()[1:]:
+            HealthProgram.objects.using(alias).filter(pk=instance.pk).delete()
+
+
+@receiver(post_migrate)
+def prepare_shard(sender, using, **kwargs):
+    if sender.name == "core.health":
+        sharding.prepare_shard(using)
+
+
+@receiver(request_finished)
+def flush_audit_log(sender, **kwargs):
+    # Without the background flusher, write once the response has been sent.
+    if not getattr(settings, "AUDIT_BACKGROUND_FLUSH", False):
+        audit_log.flush()
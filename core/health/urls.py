@@ -3,6 +3,8 @@ from django.urls import path
 from .views import (
     HealthProgramViewSet,
     ClientViewSet,
+    ClientAccessLogView,
+    EnrollmentAnalyticsView,
 )
 
 urlpatterns = [
@@ -23,11 +25,44 @@ urlpatterns = [
         ),
         name="healthprogram-detail",
     ),
+    path(
+        "healthprograms/<int:pk>/enrollments/deactivate/",
+        HealthProgramViewSet.as_view(
+            {"post": "deactivate_enrollments"}, **HealthProgramViewSet.deactivate_enrollments.kwargs
+        ),
+        name="healthprogram-deactivate-enrollments",
+    ),
+    path(
+        "healthprograms/<int:pk>/enrollments/reactivate/",
+        HealthProgramViewSet.as_view(
+            {"post": "reactivate_enrollments"}, **HealthProgramViewSet.reactivate_enrollments.kwargs
+        ),
+        name="healthprogram-reactivate-enrollments",
+    ),
+    path(
+        "healthprograms/<int:pk>/enrollments/annotate/",
+        HealthProgramViewSet.as_view(
+            {"post": "annotate_enrollments"}, **HealthProgramViewSet.annotate_enrollments.kwargs
+        ),
+        name="healthprogram-annotate-enrollments",
+    ),
     path(
         "clients/",
         ClientViewSet.as_view({"get": "list", "post": "create"}),
         name="client-list",
     ),
+    path(
+        "clients/autocomplete/",
+        ClientViewSet.as_view({"get": "autocomplete"}),
+        name="client-autocomplete",
+    ),
+    path(
+        "clients/profile-cache/",
+        ClientViewSet.as_view(
+            {"get": "profile_cache_stats"}, **ClientViewSet.profile_cache_stats.kwargs
+        ),
+        name="client-profile-cache",
+    ),
     path(
         "clients/<int:pk>/",
         ClientViewSet.as_view(
@@ -50,4 +85,14 @@ urlpatterns = [
         ClientViewSet.as_view({"post": "enroll"}),
         name="client-enroll",
     ),
+    path(
+        "analytics/enrollments/",
+        EnrollmentAnalyticsView.as_view(),
+        name="enrollment-analytics",
+    ),
+    path(
+        "audit/access/",
+        ClientAccessLogView.as_view(),
+        name="access-log-list",
+    ),
 ]
@@ -1,9 +1,38 @@
-from rest_framework import viewsets, filters
+import json
+from collections import defaultdict
+
+from rest_framework import generics, viewsets, filters, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from django.db import transaction
+from django.db.models import F, Sum
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
-from .models import HealthProgram, Client, Enrollment
-from .serializers import HealthProgramSerializer, ClientSerializer
+from core.common.concurrency import ConditionalUpdateMixin
+from core.common.pagination import EstimatedCountPagination
+from core.common.querybudget import QueryBudgetMixin
+from core.common.renderers import COLUMNAR_RENDERER_CLASSES
+from core.common.throttling import BulkRateThrottle, SearchRateThrottle
+from .audit import audit_log
+from . import sharding
+from .autocomplete import client_autocomplete
+from .cache import profile_cache
+from .deduplication import find_duplicate_candidates
+from .documents import delete_program_profiles, get_profile_document, profiles_enabled, rebuild_profiles, with_age
+from .enrollments import update_enrollments
+from .filters import PhoneticSearchFilter
+from .models import HealthProgram, Client, ClientProfileDocument, Enrollment, EnrollmentRollup, ClientAccessLog
+from .serializers import (
+    HealthProgramSerializer,
+    ClientSerializer,
+    ClientAccessLogSerializer,
+    EnrollmentAnalyticsQuerySerializer,
+    EnrollmentBulkAnnotateSerializer,
+    EnrollmentBulkUpdateSerializer,
+    PossibleDuplicateSerializer,
+)
 
 
 class HealthProgramViewSet(viewsets.ModelViewSet):
@@ -13,32 +42,243 @@ class HealthProgramViewSet(viewsets.ModelViewSet):
 
     queryset = HealthProgram.objects.all()
     serializer_class = HealthProgramSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + COLUMNAR_RENDERER_CLASSES
+
+    def get_serializer_class(self):
+        if self.action == "annotate_enrollments":
+            return EnrollmentBulkAnnotateSerializer
+        if self.action in ("deactivate_enrollments", "reactivate_enrollments"):
+            return EnrollmentBulkUpdateSerializer
+        return super().get_serializer_class()
+
+    def bulk_update_enrollments(self, request, **changes):
+        """
+        Apply ``changes``, plus ``notes`` when the serializer takes them, to the
+        program's enrollments selected by the request body as one set-based
+        UPDATE and return the number of rows changed
+        """
+        program = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if "notes" in serializer.validated_data:
+            changes["notes"] = serializer.validated_data["notes"]
+
+        # The program's enrollments are spread over the facility shards, and
+        # each shard is updated in a transaction of its own
+        total_updated = active_enrollments = 0
+        for alias in sharding.shard_aliases():
+            program_enrollments = Enrollment.objects.using(alias).filter(program_id=program.pk)
+            enrollments = serializer.filter(program_enrollments)
+            if "active" in changes:
+                enrollments = enrollments.filter(active=not changes["active"])
+            updated, client_ids = update_enrollments(enrollments, **changes)
+
+            if updated:
+                # Only the clients whose enrollments changed have stale profiles
+                profile_cache.invalidate_many(client_ids.iterator())
+                if profiles_enabled():
+                    if serializer.validated_data.get("client_ids"):
+                        ClientProfileDocument.objects.using(alias).filter(client_id__in=client_ids).delete()
+                    else:
+                        delete_program_profiles(program, using=alias)
+            total_updated += updated
+            active_enrollments += program_enrollments.filter(active=True).count()
+        return Response({"updated": total_updated, "active_enrollments": active_enrollments})
+
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="enrollments/deactivate",
+        throttle_classes=api_settings.DEFAULT_THROTTLE_CLASSES + [BulkRateThrottle],
+    )
+    def deactivate_enrollments(self, request, pk=None):
+        """
+        Deactivate the program's active enrollments, optionally limited to
+        ``client_ids`` and an ``enrolled_from``/``enrolled_to`` date range
+        """
+        return self.bulk_update_enrollments(request, active=False)
+
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="enrollments/reactivate",
+        throttle_classes=api_settings.DEFAULT_THROTTLE_CLASSES + [BulkRateThrottle],
+    )
+    def reactivate_enrollments(self, request, pk=None):
+        """
+        Reactivate the program's inactive enrollments, with the same filters
+        as deactivation
+        """
+        return self.bulk_update_enrollments(request, active=True)
+
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="enrollments/annotate",
+        throttle_classes=api_settings.DEFAULT_THROTTLE_CLASSES + [BulkRateThrottle],
+    )
+    def annotate_enrollments(self, request, pk=None):
+        """
+        Set ``notes`` on the program's enrollments, with the same filters as
+        deactivation
+        """
+        return self.bulk_update_enrollments(request)
 
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(QueryBudgetMixin, ConditionalUpdateMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing clients
     """
 
-    queryset = Client.objects.all()
+    # Queries per request, the JWT user lookup included (core.common.querybudget).
+    # Profiles read in one query once cached; the first read of a materialized
+    # profile builds it. Enrolling may create the enrollment's rollup row.
+    query_budgets = {"list": 5, "retrieve": 4, "profile": 9, "enroll": 13}
+
+    queryset = Client.objects.prefetch_related("enrollments__program").order_by("id")
     serializer_class = ClientSerializer
-    filter_backends = [filters.SearchFilter]
+    pagination_class = EstimatedCountPagination
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + COLUMNAR_RENDERER_CLASSES
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES + [SearchRateThrottle]
+    filter_backends = [filters.SearchFilter, PhoneticSearchFilter]
     search_fields = ["first_name", "last_name", "phone_number", "email"]
+    audited_actions = ("retrieve", "profile")
+
+    def dispatch(self, request, *args, **kwargs):
+        # Requests about one client or one ?facility= only touch its shard
+        with sharding.use_shard(sharding.shard_for_request(request, kwargs.get("pk"))):
+            return super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, "swagger_fake_view", False):
+            # Schema generation has no request
+            return queryset
+        facility = self.request.query_params.get("facility")
+        if facility is not None:
+            queryset = queryset.filter(facility=facility)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == "list" and sharding.is_sharded() and sharding.pinned_shard() is None:
+            # Cross-facility listing and search query every shard in parallel
+            return sharding.ShardedQuerySet(queryset)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        """
+        Register a client, listing existing clients that may be the same person
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        facility = serializer.validated_data.get("facility", "")
+        # Duplicates are looked for among the clients of the same shard
+        with sharding.use_shard(sharding.shard_for_facility(facility)):
+            self.perform_create(serializer)
+            data = serializer.data
+            data["possible_duplicates"] = PossibleDuplicateSerializer(
+                find_duplicate_candidates(serializer.instance), many=True
+            ).data
+        headers = self.get_success_headers(data)
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def perform_create(self, serializer):
+        # The client row and its sync journal entry are written together
+        with transaction.atomic(using=sharding.current_shard(), savepoint=False):
+            serializer.save()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        action = getattr(self, "action", None)
+        if action in self.audited_actions and response.status_code == 200:
+            audit_log.record(request, self.kwargs["pk"], action)
+        return super().finalize_response(request, response, *args, **kwargs)
 
     @action(detail=True, methods=["get"])
     def profile(self, request, pk=None):
         """
         Return the client profile including enrolled programs
         """
-        client = self.get_object()
-        serializer = self.get_serializer(client)
-        return Response(serializer.data)
+        # Stored profiles are only served for clients this request may see
+        if profiles_enabled():
+            client = self.check_client("date_of_birth", document=F("profile_document__document"))
+            return self.profile_document(request, client)
+
+        client = self.check_client()
+        data = profile_cache.get(client.pk)
+        if data is None:
+            data = self.get_serializer(self.get_object()).data
+            profile_cache.set(client.pk, data)
+        return Response(data)
+
+    def check_client(self, *fields, **annotations):
+        """
+        Look the client up as ``get_object()`` does, through the request's
+        filters and object permissions, without loading its enrollments or
+        any other field than ``fields``
+        """
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None).only("pk", "facility", *fields)
+        queryset = queryset.annotate(**annotations)
+        client = generics.get_object_or_404(queryset, pk=self.kwargs["pk"])
+        self.check_object_permissions(self.request, client)
+        return client
+
+    def profile_document(self, request, client):
+        """
+        Serve the materialized profile of ``client``, looked up with its
+        stored ``document``, building it on first read
+        """
+        document = client.document
+        if document is None:
+            rebuild_profiles([client.pk])
+            document = get_profile_document(client.pk)
+        if document is None:
+            # The client was deleted since it was looked up
+            raise Http404
+        document = with_age(document, client)
+        if request.accepted_renderer.format == "json":
+            return HttpResponse(document, content_type="application/json")
+        # Other renderers (browsable API, columnar formats) need the data itself
+        return Response(json.loads(document))
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="profile-cache",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def profile_cache_stats(self, request):
+        """
+        Return hit/miss counters of the profile cache in this process
+        """
+        return Response(profile_cache.stats())
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        """
+        Return up to ``limit`` (default 10) clients whose first name, last name
+        or phone number starts with ``q``, as ``id``, ``full_name`` and
+        ``phone_number``
+        """
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+        return Response(client_autocomplete.search(request.query_params.get("q", ""), limit))
 
     @action(detail=True, methods=["post"])
     def enroll(self, request, pk=None):
         """
         Enroll a client in a health program
+
+        Runs in one transaction on the client's shard so that, with the SQLite
+        profile's immediate transactions, the write lock is taken before the
+        reads instead of being upgraded after them.
         """
+        with transaction.atomic(using=sharding.current_shard(), savepoint=False):
+            return self.enroll_client(request)
+
+    def enroll_client(self, request):
         client = self.get_object()
         program_id = request.data.get("program_id")
 
@@ -55,9 +295,70 @@ class ClientViewSet(viewsets.ModelViewSet):
         if not created:
             # If enrollment exists but is not active, make it active
             if not enrollment.active:
+                # Guarded by the enrollment version, a concurrent change gets 412
                 enrollment.active = True
-                enrollment.save()
+                enrollment.save(update_fields=["active"])
                 return Response({"message": f"Client re-enrolled in {program.name}"})
             return Response({"message": f"Client already enrolled in {program.name}"})
 
         return Response({"message": f"Client successfully enrolled in {program.name}"})
+
+
+class ClientAccessLogView(generics.ListAPIView):
+    """
+    API endpoint for reading the client access audit trail,
+    filtered by ``?client=<id>`` and/or ``?user=<id>``
+    """
+
+    serializer_class = ClientAccessLogSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = EstimatedCountPagination
+
+    def get_queryset(self):
+        queryset = ClientAccessLog.objects.order_by("-accessed_at", "-id")
+        client_id = self.request.query_params.get("client")
+        user_id = self.request.query_params.get("user")
+        if client_id:
+            queryset = queryset.filter(client_id=client_id)
+        if user_id:
+            queryset = queryset.filter(user_id=user_id)
+        return queryset
+
+
+class EnrollmentAnalyticsView(APIView):
+    """
+    API endpoint reporting enrollment counts from the rollup table.
+
+    Counts (``enrollments`` and ``active``) are summed over the rows matching
+    the ``program``, ``gender``, ``age_band`` and ``month_from``/``month_to``
+    (``YYYY-MM``) filters and broken down by the ``group_by`` dimensions.
+    Reads only the rollups, a few rows per program and month, never the
+    enrollments themselves.
+    """
+
+    def get(self, request):
+        query = EnrollmentAnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        columns = list(dict.fromkeys(query.validated_data.get("group_by", [])))
+        if "program" in columns:
+            columns.append("program__name")
+
+        counts = defaultdict(lambda: [0, 0])
+        for alias in sharding.shard_aliases():
+            rows = query.filter(EnrollmentRollup.objects.using(alias))
+            sums = {"enrollments": Sum("enrollments"), "active": Sum("active")}
+            rows = rows.values(*columns).annotate(**sums) if columns else [rows.aggregate(**sums)]
+            for row in rows:
+                count = counts[tuple(row[column] for column in columns)]
+                count[0] += row["enrollments"] or 0
+                count[1] += row["active"] or 0
+
+        results = []
+        for key, (enrollments, active) in sorted(counts.items()):
+            result = dict(zip(columns, key))
+            if "program__name" in result:
+                result["program_name"] = result.pop("program__name")
+            if "month" in result:
+                result["month"] = result["month"].strftime("%Y-%m")
+            results.append({**result, "enrollments": enrollments, "active": active})
+        return Response({"results": results})
@@ -0,0 +1,255 @@
+"""
+Export and apply journaled changes between deployments.
+
+A batch of changes carries the current state of each changed object, keyed
+by its ``global_id``, never by the database id, which is only unique within
+one deployment. Conflicts are settled by last writer wins on
+``(changed_at, node)``. Every deployment compares the same pair, so all of
+them keep the same version of an object whatever order batches arrive in.
+"""
+
+import uuid
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.db.models import F, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+
+from core.health import sharding
+
+from . import journal
+from .models import JournalEntry
+
+
+@dataclass(frozen=True)
+class SyncedModel:
+    label: str
+    fields: tuple
+    # {field name: label of the synced model it points to}
+    foreign_keys: dict = field(default_factory=dict)
+    # Fields identifying the same row created independently on two deployments
+    natural_key: tuple = ()
+
+    @property
+    def model(self):
+        return apps.get_model(self.label)
+
+
+# In dependency order: a row is applied after the rows it points to.
+SYNCED_MODELS = {
+    spec.label: spec
+    for spec in [
+        SyncedModel("health.healthprogram", ("name", "description")),
+        SyncedModel(
+            "health.client",
+            (
+                "first_name",
+                "last_name",
+                "date_of_birth",
+                "gender",
+                "phone_number",
+                "email",
+                "address",
+                "facility",
+                "registration_date",
+            ),
+        ),
+        SyncedModel(
+            "health.enrollment",
+            ("active", "notes", "enrollment_date"),
+            foreign_keys={"client": "health.client", "program": "health.healthprogram"},
+            natural_key=("client", "program"),
+        ),
+    ]
+}
+APPLY_ORDER = list(SYNCED_MODELS)
+
+# Key of the PostgreSQL advisory lock held while numbering journal entries
+SEAL_LOCK = 0x7379_6E63
+
+
+def export_changes(since, *, origin=None, exclude_origin=None, limit=500, using="default"):
+    """
+    Return ``{"changes": [...], "next": seq}`` for up to ``limit`` journal
+    entries numbered after ``since``, optionally only those made on
+    ``origin`` or not made on ``exclude_origin``.
+
+    An object changed several times in the batch is sent once, with its
+    current state or as deleted if it no longer exists. Cost is one query for
+    the journal plus one per model, whatever the table sizes.
+    """
+    check_not_sharded()
+    seal(using)
+    entries = JournalEntry.objects.using(using).filter(seq__gt=since)
+    if origin is not None:
+        entries = entries.filter(node=origin)
+    if exclude_origin is not None:
+        entries = entries.exclude(node=exclude_origin)
+    entries = list(entries.order_by("seq")[:limit])
+    if not entries:
+        return {"changes": [], "next": since}
+
+    latest = {}
+    for entry in entries:
+        latest[(entry.model, entry.global_id)] = entry
+
+    changes = []
+    for label, spec in SYNCED_MODELS.items():
+        global_ids = [global_id for model, global_id in latest if model == label]
+        if not global_ids:
+            continue
+        rows = spec.model.objects.using(using).filter(global_id__in=global_ids)
+        if spec.foreign_keys:
+            rows = rows.select_related(*spec.foreign_keys)
+        rows = {row.global_id: row for row in rows}
+        for global_id in global_ids:
+            entry = latest[(label, global_id)]
+            row = rows.get(global_id)
+            changes.append(
+                {
+                    "model": label,
+                    "global_id": str(global_id),
+                    "node": entry.node,
+                    "changed_at": entry.changed_at.isoformat(),
+                    "deleted": row is None,
+                    "data": None if row is None else serialize(spec, row),
+                }
+            )
+    return {"changes": changes, "next": entries[-1].seq}
+
+
+def check_not_sharded():
+    # Each facility shard keeps its own journal, which a single cursor per
+    # peer cannot follow; refuse rather than sync part of the data.
+    if sharding.is_sharded():
+        raise ImproperlyConfigured("Offline sync does not support FACILITY_SHARDS")
+
+
+def seal(using="default"):
+    """
+    Number the journal entries committed since the last call, after every
+    entry numbered before.
+
+    Ids are handed out when entries are inserted but become visible when
+    their transaction commits, which on PostgreSQL need not be in id order,
+    so a cursor on the id could move past an entry still to be committed.
+    Entries are numbered only once they are visible, one caller at a time,
+    so an entry committed late is numbered after the cursors that have
+    moved on and is still exported.
+    """
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [SEAL_LOCK])
+        # One statement, so that SQLite runs it as a single write and
+        # PostgreSQL reads the journal as of after the lock is taken.
+        # Entries numbered together keep their id order.
+        journal = JournalEntry.objects.using(using)
+        unsealed = journal.filter(seq__isnull=True)
+        last = Coalesce(Subquery(journal.filter(seq__isnull=False).order_by("-seq").values("seq")[:1]), 0)
+        first = Subquery(unsealed.order_by("id").values("id")[:1])
+        unsealed.update(seq=F("id") + last - first + 1)
+
+
+def serialize(spec, row):
+    data = {}
+    for name in spec.fields:
+        value = getattr(row, name)
+        data[name] = value.isoformat() if hasattr(value, "isoformat") else value
+    for name in spec.foreign_keys:
+        data[name] = str(getattr(row, name).global_id)
+    return data
+
+
+def apply_changes(changes, using="default"):
+    """
+    Apply a batch from ``export_changes`` in one transaction and journal each
+    applied change with its original node and time, so it is passed on to
+    other peers but never echoed back as a local change.
+
+    Changes older than the latest local change to the same object are
+    skipped as conflicts; the newer local version reaches the sender on its
+    next pull. Changes already applied or whose related rows are missing are
+    skipped.
+    """
+    check_not_sharded()
+    changes = [
+        {**change, "global_id": uuid.UUID(change["global_id"]), "changed_at": parse_datetime(change["changed_at"])}
+        for change in changes
+        if change["model"] in SYNCED_MODELS
+    ]
+    result = {"applied": 0, "conflicts": 0, "skipped": 0}
+    if not changes:
+        return result
+
+    local = {}
+    for global_id, changed_at, node in JournalEntry.objects.using(using).filter(
+        global_id__in=[change["global_id"] for change in changes]
+    ).values_list("global_id", "changed_at", "node"):
+        local[global_id] = max(local.get(global_id, (changed_at, node)), (changed_at, node))
+
+    # Upserts parents first, deletes children first
+    changes.sort(
+        key=lambda change: (change["deleted"], APPLY_ORDER.index(change["model"]) * (-1 if change["deleted"] else 1))
+    )
+    applied = []
+    with transaction.atomic(using=using), journal.applying_remote_changes():
+        for change in changes:
+            version = (change["changed_at"], change["node"])
+            if version == local.get(change["global_id"]):
+                # Already applied, e.g. a batch sent again after a timeout
+                result["skipped"] += 1
+                continue
+            if change["global_id"] in local and version < local[change["global_id"]]:
+                result["conflicts"] += 1
+                continue
+            spec = SYNCED_MODELS[change["model"]]
+            if change["deleted"]:
+                spec.model.objects.using(using).filter(global_id=change["global_id"]).delete()
+            elif not upsert(spec, change, using):
+                result["skipped"] += 1
+                continue
+            applied.append(
+                JournalEntry(
+                    model=change["model"],
+                    global_id=change["global_id"],
+                    node=change["node"],
+                    changed_at=change["changed_at"],
+                )
+            )
+        JournalEntry.objects.using(using).bulk_create(applied)
+    result["applied"] = len(applied)
+    return result
+
+
+def upsert(spec, change, using):
+    model = spec.model
+    values = {}
+    for name in spec.fields:
+        values[name] = model._meta.get_field(name).to_python(change["data"][name])
+    for name, label in spec.foreign_keys.items():
+        related = apps.get_model(label).objects.using(using).filter(global_id=change["data"][name]).first()
+        if related is None:
+            return False
+        values[name] = related
+
+    instance = model.objects.using(using).filter(global_id=change["global_id"]).first()
+    if instance is None and spec.natural_key:
+        instance = model.objects.using(using).filter(**{name: values[name] for name in spec.natural_key}).first()
+    if instance is None:
+        instance = model(global_id=change["global_id"])
+    adding = instance._state.adding
+    for name, value in values.items():
+        setattr(instance, name, value)
+    instance.save(using=using)
+    # auto_now_add fields are set to now on insert, whatever they hold
+    creation_dates = [name for name in spec.fields if getattr(model._meta.get_field(name), "auto_now_add", False)]
+    if adding and creation_dates:
+        for name in creation_dates:
+            setattr(instance, name, values[name])
+        instance.save(using=using, update_fields=creation_dates)
+    return True
@@ -0,0 +1,93 @@
+"""
+Change journal of the synchronized models.
+
+Every save or delete of a ``HealthProgram``, ``Client`` or ``Enrollment``
+appends a ``JournalEntry`` in the same database, so a peer only has to read
+the entries after its cursor to find what changed. Set-based writes that skip
+model signals (bulk updates, bulk imports) call ``record_many`` or
+``record_selected`` themselves.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import JournalEntry
+
+_applying = ContextVar("sync_applying", default=False)
+
+
+def node_id():
+    return settings.SYNC_NODE_ID
+
+
+def is_applying():
+    return _applying.get()
+
+
+@contextmanager
+def applying_remote_changes():
+    """
+    Suppress journaling of writes made while applying a peer's changes;
+    those are journaled with the peer's own metadata instead
+    """
+    token = _applying.set(True)
+    try:
+        yield
+    finally:
+        _applying.reset(token)
+
+
+def record(instance, using="default"):
+    JournalEntry.objects.using(using).create(
+        model=instance._meta.label_lower,
+        global_id=instance.global_id,
+        node=node_id(),
+        changed_at=timezone.now(),
+    )
+
+
+def record_many(model, global_ids, using="default"):
+    if is_applying():
+        return
+    node, changed_at = node_id(), timezone.now()
+    JournalEntry.objects.using(using).bulk_create(
+        [
+            JournalEntry(model=model._meta.label_lower, global_id=global_id, node=node, changed_at=changed_at)
+            for global_id in global_ids
+        ],
+        batch_size=1000,
+    )
+
+
+def record_selected(queryset):
+    """
+    Journal the rows of ``queryset`` with one ``INSERT ... SELECT``, however
+    many there are, and lock them for the rest of the transaction where the
+    database supports it. Return a queryset of exactly the rows journaled,
+    for the set-based write that follows.
+    """
+    model, using = queryset.model, queryset.db
+    connection = connections[using]
+    label, node, changed_at = model._meta.label_lower, node_id(), timezone.now()
+    entries = JournalEntry.objects.using(using)
+    last_id = entries.aggregate(last=Max("id"))["last"] or 0
+
+    selected = queryset.select_for_update(of=("self",)).values_list("global_id")
+    sql, params = selected.query.get_compiler(using).as_sql()
+    table, quote = JournalEntry._meta.db_table, connection.ops.quote_name
+    columns = ", ".join(quote(column) for column in ("model", "global_id", "node", "changed_at"))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(table)} ({columns}) SELECT %s, selected.global_id, %s, %s FROM ({sql}) selected",
+            [label, node, connection.ops.adapt_datetimefield_value(changed_at), *params],
+        )
+
+    # Ids are handed out in insertion order, so this transaction's entries
+    # are the only ones after last_id with its timestamp
+    journaled = entries.filter(node=node, id__gt=last_id, model=label, changed_at=changed_at)
+    return model._default_manager.using(using).filter(global_id__in=journaled.values("global_id"))
@@ -0,0 +1,44 @@
+import json
+import os
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sync.transport import HttpTransport, synchronize
+
+
+class Command(BaseCommand):
+    help = (
+        "Push local changes to the central deployment and pull its changes. "
+        "Authenticates as a staff user given by --email or SYNC_EMAIL and the "
+        "SYNC_PASSWORD environment variable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default=settings.SYNC_CENTRAL_URL, help="Base URL of the central deployment")
+        parser.add_argument("--email", default=os.getenv("SYNC_EMAIL", ""))
+        parser.add_argument("--batch-size", type=int, default=settings.SYNC_BATCH_SIZE)
+
+    def handle(self, *args, url, email, batch_size, **options):
+        if not url:
+            raise CommandError("Set --url or SYNC_CENTRAL_URL")
+        if settings.SYNC_NODE_ID == "central":
+            raise CommandError("Set SYNC_NODE_ID to this deployment's own name before syncing")
+        token = self.login(url, email, os.getenv("SYNC_PASSWORD", ""))
+        stats = synchronize(HttpTransport(url, token), url, batch_size=batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Pushed {pushed} and pulled {pulled} changes: {applied} applied, "
+                "{conflicts} conflicts, {skipped} skipped".format(**stats)
+            )
+        )
+
+    def login(self, url, email, password):
+        request = Request(
+            url.rstrip("/") + "/api/user/login/",
+            data=json.dumps({"email": email, "password": password}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urlopen(request, timeout=30) as response:
+            return json.loads(response.read())["access"]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-19 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Peer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('pushed_seq', models.BigIntegerField(default=0)),
+                ('pulled_seq', models.BigIntegerField(default=0)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('global_id', models.UUIDField()),
+                ('node', models.CharField(max_length=50)),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'journal entries',
+                'indexes': [models.Index(fields=['global_id', 'changed_at'], name='sync_journa_global__7def7b_idx'), models.Index(fields=['node', 'id'], name='sync_journa_node_a52992_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+MODELS = ("healthprogram", "client", "enrollment")
+
+
+def journal_existing_rows(apps, schema_editor):
+    # Rows created before the journal existed would otherwise never sync.
+    JournalEntry = apps.get_model("sync", "JournalEntry")
+    using = schema_editor.connection.alias
+    now = timezone.now()
+    for model_name in MODELS:
+        model = apps.get_model("health", model_name)
+        JournalEntry.objects.using(using).bulk_create(
+            [
+                JournalEntry(
+                    model=f"health.{model_name}", global_id=global_id, node=settings.SYNC_NODE_ID, changed_at=now
+                )
+                for global_id in model.objects.using(using).values_list("global_id", flat=True).iterator()
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0008_global_ids'),
+        ('sync', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(journal_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-19 01:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_journal_existing_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentry',
+            name='recorded_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-19 01:51
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def number_existing_entries(apps, schema_editor):
+    # Peers' cursors hold journal ids so far, which stay valid as numbers
+    JournalEntry = apps.get_model("sync", "JournalEntry")
+    JournalEntry.objects.using(schema_editor.connection.alias).update(seq=F("id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0003_journalentry_recorded_at'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='journalentry',
+            name='recorded_at',
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing_entries, migrations.RunPython.noop),
+    ]
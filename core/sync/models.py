@@ -0,0 +1,45 @@
+from django.db import models
+
+
+class JournalEntry(models.Model):
+    """
+    Model recording that a synchronized object changed
+
+    ``seq`` is the journal sequence number that peers use as their sync
+    cursor, given in commit order once the entry is committed (see
+    ``core.sync.engine.seal``). ``node`` is the deployment where the change
+    was made and ``changed_at`` when, which together decide conflicts.
+    """
+
+    model = models.CharField(max_length=50)
+    global_id = models.UUIDField()
+    node = models.CharField(max_length=50)
+    changed_at = models.DateTimeField()
+    seq = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["global_id", "changed_at"]),
+            models.Index(fields=["node", "id"]),
+        ]
+        verbose_name_plural = "journal entries"
+
+    def __str__(self):
+        return f"{self.model} {self.global_id} changed on {self.node}"
+
+
+class Peer(models.Model):
+    """
+    Model holding the sync cursors for a remote deployment
+
+    ``pushed_seq`` is the last local journal entry sent to the peer and
+    ``pulled_seq`` the last entry of the peer's journal applied here.
+    """
+
+    name = models.CharField(max_length=200, unique=True)
+    pushed_seq = models.BigIntegerField(default=0)
+    pulled_seq = models.BigIntegerField(default=0)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
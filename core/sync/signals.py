@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.health.models import Client, Enrollment, HealthProgram
+
+from . import journal
+
+
+@receiver(post_save, sender=HealthProgram)
+@receiver(post_save, sender=Client)
+@receiver(post_save, sender=Enrollment)
+def journal_save(sender, instance, using, raw=False, **kwargs):
+    if not raw and not journal.is_applying():
+        journal.record(instance, using)
+
+
+@receiver(post_delete, sender=HealthProgram)
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Enrollment)
+def journal_delete(sender, instance, using, **kwargs):
+    if not journal.is_applying():
+        journal.record(instance, using)
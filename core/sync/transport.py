@@ -0,0 +1,99 @@
+import gzip
+import json
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from . import journal
+from .engine import apply_changes, export_changes
+from .models import Peer
+
+
+class HttpTransport:
+    """
+    Talks to the push/pull endpoints of a remote deployment. Request bodies
+    are gzipped; responses are compressed by the server's middleware.
+    """
+
+    def __init__(self, base_url, token, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def _send(self, path, body=None):
+        headers = {"Authorization": f"Bearer {self.token}", "Accept": "application/json", "Accept-Encoding": "gzip"}
+        data = None
+        if body is not None:
+            data = gzip.compress(json.dumps(body, cls=DjangoJSONEncoder).encode())
+            headers.update({"Content-Type": "application/json", "Content-Encoding": "gzip"})
+        request = Request(self.base_url + path, data=data, headers=headers, method="GET" if data is None else "POST")
+        with urlopen(request, timeout=self.timeout) as response:
+            content = response.read()
+            if response.headers.get("Content-Encoding") == "gzip":
+                content = gzip.decompress(content)
+        return json.loads(content)
+
+    def push(self, changes):
+        return self._send("/api/sync/push/", {"node": journal.node_id(), "changes": changes})
+
+    def pull(self, since, limit):
+        query = urlencode({"since": since, "node": journal.node_id(), "limit": limit})
+        return self._send(f"/api/sync/pull/?{query}")
+
+
+class LocalTransport:
+    """
+    Syncs with another database of this project, e.g. for tests or for
+    seeding a clinic node from a copy of the central database
+    """
+
+    def __init__(self, using):
+        self.using = using
+
+    def push(self, changes):
+        # Round-trip through JSON so both transports see the same payloads
+        changes = json.loads(json.dumps(changes, cls=DjangoJSONEncoder))
+        return apply_changes(changes, using=self.using)
+
+    def pull(self, since, limit):
+        batch = export_changes(since, exclude_origin=journal.node_id(), limit=limit, using=self.using)
+        return json.loads(json.dumps(batch, cls=DjangoJSONEncoder))
+
+
+def synchronize(transport, peer_name, batch_size=500, using="default"):
+    """
+    Push the changes made on this deployment since the last sync, then pull
+    and apply everything the peer has that did not come from here.
+
+    Cursors advance after every batch, so an interrupted sync resumes where
+    it stopped. Return counters of what was sent and applied.
+    """
+    peer, _ = Peer.objects.using(using).get_or_create(name=peer_name)
+    stats = {"pushed": 0, "pulled": 0, "applied": 0, "conflicts": 0, "skipped": 0}
+
+    while True:
+        batch = export_changes(peer.pushed_seq, origin=journal.node_id(), limit=batch_size, using=using)
+        if batch["next"] == peer.pushed_seq:
+            break
+        result = transport.push(batch["changes"])
+        stats["pushed"] += len(batch["changes"])
+        stats["conflicts"] += result["conflicts"]
+        peer.pushed_seq = batch["next"]
+        peer.save(using=using, update_fields=["pushed_seq"])
+
+    while True:
+        batch = transport.pull(peer.pulled_seq, batch_size)
+        if batch["next"] == peer.pulled_seq:
+            break
+        result = apply_changes(batch["changes"], using=using)
+        stats["pulled"] += len(batch["changes"])
+        for key in ("applied", "conflicts", "skipped"):
+            stats[key] += result[key]
+        peer.pulled_seq = batch["next"]
+        peer.save(using=using, update_fields=["pulled_seq"])
+
+    peer.last_synced_at = timezone.now()
+    peer.save(using=using, update_fields=["last_synced_at"])
+    return stats
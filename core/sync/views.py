@@ -0,0 +1,51 @@
+import gzip
+import json
+
+from rest_framework import permissions, serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .engine import apply_changes, export_changes
+
+
+class PullQuerySerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, default=0)
+    node = serializers.CharField(max_length=50)
+    limit = serializers.IntegerField(min_value=1, max_value=5000, default=500)
+
+
+class SyncPushView(APIView):
+    """
+    API endpoint receiving a batch of changes from another deployment,
+    optionally gzipped (``Content-Encoding: gzip``)
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        if request.headers.get("Content-Encoding") == "gzip":
+            try:
+                payload = json.loads(gzip.decompress(request.body))
+            except (OSError, ValueError):
+                raise ParseError("Malformed gzipped JSON body")
+        else:
+            payload = request.data
+        if not isinstance(payload, dict) or not isinstance(payload.get("changes"), list):
+            raise ParseError("Expected {\"node\": ..., \"changes\": [...]}")
+        return Response(apply_changes(payload["changes"]))
+
+
+class SyncPullView(APIView):
+    """
+    API endpoint returning the journaled changes after ``since`` that were
+    not made on the requesting ``node``
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        query = PullQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        return Response(export_changes(params["since"], exclude_origin=params["node"], limit=params["limit"]))
@@ -0,0 +1,155 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from core.common.admin import chunked_pks
+from core.common.models import StaleObjectError
+from core.health.admin import EnrollmentAdmin
+from core.health.models import Client, Enrollment, EnrollmentRollup, HealthProgram
+from core.sync.models import JournalEntry
+
+
+class AdminTest(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_superuser(email="admin@example.com", password="pass")
+        self.client.force_login(self.admin)
+        self.tb = HealthProgram.objects.create(name="TB")
+        self.hiv = HealthProgram.objects.create(name="HIV")
+
+    def make_clients(self, count, start=0):
+        clients = []
+        for i in range(start, start + count):
+            client = Client.objects.create(
+                first_name=f"Amina{chr(ord('a') + i)}",
+                last_name="Otieno",
+                date_of_birth=date(1990, 1, 15),
+                gender="F",
+                phone_number=f"+2547{i:08d}",
+            )
+            Enrollment.objects.create(client=client, program=self.tb)
+            Enrollment.objects.create(client=client, program=self.hiv)
+            clients.append(client)
+        return clients
+
+    def changelist_queries(self, url):
+        # Counted once the unfiltered row count is cached
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Test that changelists run as many queries for one client as for eleven, and no full COUNT(*)"""
+        self.make_clients(1)
+        urls = [reverse(f"admin:health_{name}_changelist") for name in ("client", "enrollment", "healthprogram")]
+        urls.append(reverse("admin:user_user_changelist"))
+        few = [self.changelist_queries(url) for url in urls]
+        self.make_clients(10, start=1)
+        many = [self.changelist_queries(url) for url in urls]
+        self.assertEqual(few, many)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("admin:health_enrollment_changelist"), {"active__exact": "1"})
+        counts = [query["sql"] for query in queries if "COUNT(*)" in query["sql"] and "health_enrollment" in query["sql"]]
+        self.assertEqual(len(counts), 1)
+        self.assertIn("LIMIT", counts[0])
+
+    def test_client_search(self):
+        """Test that the client changelist searches name and phone prefixes"""
+        self.make_clients(3)
+        url = reverse("admin:health_client_changelist")
+        response = self.client.get(url, {"q": "aminab"})
+        self.assertEqual([client.first_name for client in response.context["cl"].result_list], ["Aminab"])
+        response = self.client.get(url, {"q": "0700000002"})
+        self.assertEqual([client.first_name for client in response.context["cl"].result_list], ["Aminac"])
+
+        response = self.client.get(reverse("admin:health_enrollment_changelist"), {"q": "Aminac otieno"})
+        self.assertEqual(len(response.context["cl"].result_list), 2)
+
+    def test_deactivate_in_chunks(self):
+        """Test that the bulk actions update in chunks and keep rollups and the sync journal in step"""
+        self.make_clients(5)
+        url = reverse("admin:health_enrollment_changelist")
+        self.assertNotIn("delete_selected", self.client.get(url).context["action_form"].fields["action"].choices[1])
+
+        tb_enrollments = Enrollment.objects.filter(program=self.tb)
+        journaled = JournalEntry.objects.count()
+        with mock.patch.object(EnrollmentAdmin, "action_chunk_size", 2):
+            response = self.client.post(
+                url,
+                {"action": "deactivate", "_selected_action": list(tb_enrollments.values_list("pk", flat=True))},
+                follow=True,
+            )
+        self.assertContains(response, "Deactivated 5 enrollments.")
+        self.assertFalse(tb_enrollments.filter(active=True).exists())
+        self.assertEqual(set(tb_enrollments.values_list("version", flat=True)), {2})
+        self.assertEqual(JournalEntry.objects.count() - journaled, 5)
+        rollup = EnrollmentRollup.objects.get(program=self.tb)
+        self.assertEqual((rollup.enrollments, rollup.active), (5, 0))
+
+    def test_concurrent_change_is_reported(self):
+        """Test that a save or delete losing to a concurrent write shows an error and changes nothing"""
+        client = self.make_clients(1)[0]
+        enrollment = client.enrollments.get(program=self.tb)
+        url = reverse("admin:health_client_change", args=[client.pk])
+        data = {
+            "first_name": "Amina",
+            "last_name": "Wanjiru",
+            "date_of_birth": "1990-01-15",
+            "gender": "F",
+            "enrollments-TOTAL_FORMS": "1",
+            "enrollments-INITIAL_FORMS": "1",
+            "enrollments-0-id": str(enrollment.pk),
+            "enrollments-0-client": str(client.pk),
+            "enrollments-0-program": str(self.tb.pk),
+            "enrollments-0-notes": "Moved",
+        }
+        with mock.patch.object(Client, "save", side_effect=StaleObjectError):
+            response = self.client.post(url, data, follow=True)
+        self.assertRedirects(response, url)
+        self.assertContains(response, "This client was changed by someone else in the meantime.")
+        client.refresh_from_db()
+        self.assertEqual(client.last_name, "Otieno")
+
+        # Inlines are saved after the client; their changes are rolled back too
+        with mock.patch.object(Enrollment, "save", side_effect=StaleObjectError):
+            response = self.client.post(url, data, follow=True)
+        self.assertContains(response, "This client was changed by someone else in the meantime.")
+        client.refresh_from_db()
+        enrollment.refresh_from_db()
+        self.assertEqual((client.last_name, enrollment.notes), ("Otieno", ""))
+
+        delete_url = reverse("admin:health_enrollment_delete", args=[enrollment.pk])
+        with mock.patch.object(Enrollment, "delete", side_effect=StaleObjectError):
+            response = self.client.post(delete_url, {"post": "yes"}, follow=True)
+        self.assertContains(response, "This enrollment was changed by someone else in the meantime.")
+        self.assertTrue(Enrollment.objects.filter(pk=enrollment.pk).exists())
+
+    def test_chunked_pks(self):
+        """Test that primary keys are walked in ascending chunks"""
+        self.make_clients(5)
+        pks = list(Client.objects.order_by("pk").values_list("pk", flat=True))
+        self.assertEqual(list(chunked_pks(Client.objects.all(), 2)), [pks[:2], pks[2:4], pks[4:]])
+
+    def test_user_admin(self):
+        """Test that users are created by email and case-insensitive duplicates rejected"""
+        url = reverse("admin:user_user_add")
+        data = {"email": "nurse@example.com", "usable_password": "true", "password1": "Xk3!pq9z", "password2": "Xk3!pq9z"}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        user = get_user_model().objects.get(email="nurse@example.com")
+        self.assertTrue(user.check_password("Xk3!pq9z"))
+
+        response = self.client.post(url, {**data, "email": "Nurse@example.com"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("email", response.context["adminform"].form.errors)
+
+        response = self.client.get(reverse("admin:user_user_change", args=[user.pk]))
+        self.assertEqual(response.status_code, 200)
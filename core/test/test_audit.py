@@ -0,0 +1,92 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from core.health.audit import AccessAuditLog, audit_log
+from core.health.models import Client, ClientAccessLog
+
+
+class AccessAuditLogTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        audit_log.flush()
+        self.user = get_user_model().objects.create_user(
+            email="nurse@example.com", password="pass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.client_instance = Client.objects.create(
+            first_name="Wanjiku",
+            last_name="Kamau",
+            date_of_birth=date(1992, 4, 3),
+            gender="F",
+        )
+
+    def test_reads_are_logged_after_response(self):
+        """Test that retrieve and profile reads are written to the audit log"""
+        self.client.get(reverse("client-detail", kwargs={"pk": self.client_instance.id}))
+        self.client.get(reverse("client-profile", kwargs={"pk": self.client_instance.id}))
+        self.client.get(reverse("client-list"))
+
+        events = ClientAccessLog.objects.order_by("id")
+        self.assertEqual([e.action for e in events], ["retrieve", "profile"])
+        self.assertEqual(events[0].client_id, self.client_instance.id)
+        self.assertEqual(events[0].user_id, self.user.id)
+
+    def test_missing_client_is_not_logged(self):
+        """Test that failed reads are not logged"""
+        self.client.get(reverse("client-detail", kwargs={"pk": 9999}))
+        self.assertEqual(ClientAccessLog.objects.count(), 0)
+
+    def test_query_history_by_client_and_user(self):
+        """Test reading the audit history filtered by client and user"""
+        url = reverse("client-profile", kwargs={"pk": self.client_instance.id})
+        self.client.get(url)
+        self.client.get(url)
+
+        response = self.client.get(
+            reverse("access-log-list"), {"client": self.client_instance.id}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+        response = self.client.get(reverse("access-log-list"), {"user": 9999})
+        self.assertEqual(len(response.data), 0)
+
+    def test_history_requires_staff(self):
+        """Test that the audit history is only visible to staff users"""
+        self.client.force_authenticate(None)
+        response = self.client.get(reverse("access-log-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AccessAuditLogBufferTest(APITestCase):
+    def make_request(self):
+        return mock.Mock(user=None, META={"REMOTE_ADDR": "10.0.0.1"})
+
+    def test_buffer_is_bounded(self):
+        """Test that the oldest events are dropped once the buffer is full"""
+        log = AccessAuditLog()
+        log.max_buffer = 3
+        for client_id in range(5):
+            log.record(self.make_request(), client_id, "profile")
+        self.assertEqual(log.pending(), 3)
+        self.assertEqual(log.dropped, 2)
+        self.assertEqual(log.flush(), 3)
+        self.assertEqual(
+            list(ClientAccessLog.objects.values_list("client_id", flat=True)), [2, 3, 4]
+        )
+
+    def test_failed_flush_keeps_events(self):
+        """Test that events survive a failed write for the next flush"""
+        log = AccessAuditLog()
+        log.record(self.make_request(), 1, "retrieve")
+        with mock.patch.object(
+            ClientAccessLog.objects, "bulk_create", side_effect=RuntimeError
+        ), self.assertLogs("core.health.audit", "ERROR"):
+            self.assertEqual(log.flush(), 0)
+        self.assertEqual(log.pending(), 1)
+        self.assertEqual(log.flush(), 1)
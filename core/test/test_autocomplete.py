@@ -0,0 +1,95 @@
+from datetime import date
+
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+
+from core.health.autocomplete import client_autocomplete
+from core.health.matching import normalize_phone_prefix
+from core.health.models import Client
+
+
+def make_client(first_name, last_name, phone_number=""):
+    return Client.objects.create(
+        first_name=first_name,
+        last_name=last_name,
+        date_of_birth=date(1990, 1, 15),
+        gender="F",
+        phone_number=phone_number,
+    )
+
+
+class AutocompleteTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        client_autocomplete.cache.clear()
+        self.url = reverse("client-autocomplete")
+        self.amina = make_client("Amina", "Otieno", "0712345678")
+        self.otieno = make_client("Otieno", "Amani", "0733000111")
+        self.baraka = make_client("Baraka", "Mwangi", "0712999000")
+
+    def ids(self, **params):
+        return [result["id"] for result in self.client.get(self.url, params).data]
+
+    def test_normalize_phone_prefix(self):
+        """Test that local and international phone prefixes normalize alike"""
+        self.assertEqual(normalize_phone_prefix("0712"), "712")
+        self.assertEqual(normalize_phone_prefix("+254 712"), "712")
+        self.assertEqual(normalize_phone_prefix("254"), "254")
+
+    def test_name_prefix_matches_first_and_last_names(self):
+        """Test that a prefix matches either name, case and accent insensitively"""
+        self.assertEqual(self.ids(q="am"), [self.otieno.id, self.amina.id])
+        self.assertEqual(self.ids(q="OTI"), [self.amina.id, self.otieno.id])
+        self.assertEqual(self.ids(q="bára"), [self.baraka.id])
+        self.assertEqual(self.ids(q="zz"), [])
+
+    def test_result_shape(self):
+        """Test that results only carry what a typeahead needs"""
+        response = self.client.get(self.url, {"q": "baraka"})
+        self.assertEqual(
+            response.data,
+            [{"id": self.baraka.id, "full_name": "Baraka Mwangi", "phone_number": "0712999000"}],
+        )
+
+    def test_phone_prefix(self):
+        """Test that phone prefixes match in local and international form"""
+        self.assertEqual(self.ids(q="0712"), [self.amina.id, self.baraka.id])
+        self.assertEqual(self.ids(q="+254712"), [self.amina.id, self.baraka.id])
+        self.assertEqual(self.ids(q="07123"), [self.amina.id])
+
+    def test_multiple_terms(self):
+        """Test that every term must prefix one of the client's names"""
+        self.assertEqual(self.ids(q="am oti"), [self.otieno.id, self.amina.id])
+        self.assertEqual(self.ids(q="amina oti"), [self.amina.id])
+        self.assertEqual(self.ids(q="ami mwa"), [])
+
+    def test_limit(self):
+        """Test that the limit is honoured and validated"""
+        self.assertEqual(len(self.ids(q="ami", limit=1)), 1)
+        response = self.client.get(self.url, {"q": "ami", "limit": "many"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_short_prefixes_are_cached(self):
+        """Test that short prefixes are served from the cache"""
+        self.ids(q="am")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.ids(q="Am", limit=1), [self.otieno.id])
+
+    def test_cache_refreshed_on_save(self):
+        """Test that saving a client drops cached prefixes of its names"""
+        self.assertEqual(self.ids(q="ami"), [self.amina.id])
+        aminata = make_client("Aminata", "Kiprop")
+        self.assertEqual(self.ids(q="ami"), [self.amina.id, aminata.id])
+        aminata.delete()
+        self.assertEqual(self.ids(q="ami"), [self.amina.id])
+
+    def test_cache_refreshed_on_rename(self):
+        """Test that renaming a client drops cached prefixes of its old name and phone"""
+        self.assertEqual(self.ids(q="bar"), [self.baraka.id])
+        self.assertEqual(self.ids(q="071"), [self.amina.id, self.baraka.id])
+        client = Client.objects.get(pk=self.baraka.pk)
+        client.first_name = "Zawadi"
+        client.phone_number = "0799000111"
+        client.save()
+        self.assertEqual(self.ids(q="bar"), [])
+        self.assertEqual(self.ids(q="071"), [self.amina.id])
@@ -0,0 +1,127 @@
+import base64
+import tempfile
+from datetime import date
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.health.cache import profile_cache
+from core.health.models import Client, HealthProgram
+
+
+class BatchViewTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        profile_cache.clear()
+        self.user = get_user_model().objects.create_user(email="nurse@example.com", password="pass")
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.program = HealthProgram.objects.create(name="TB")
+        self.client_instance = Client.objects.create(
+            first_name="Amina", last_name="Otieno", date_of_birth=date(1990, 1, 15), gender="F"
+        )
+        self.url = reverse("batch")
+
+    def batch(self, *requests, **options):
+        return self.client.post(self.url, {"requests": list(requests), **options}, format="json")
+
+    def test_responses_in_order(self):
+        """Test that sub-requests run against the URLconf and answer in order"""
+        response = self.batch(
+            {"path": "/api/user/me/"},
+            {"path": "/api/healthprograms/"},
+            {"path": f"/api/clients/{self.client_instance.id}/profile/"},
+            {"path": "/api/clients/?search=Otieno"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["responses"]
+        self.assertEqual([result["status"] for result in results], [200, 200, 200, 200])
+        self.assertEqual(results[0]["body"]["email"], "nurse@example.com")
+        self.assertEqual(results[1]["body"][0]["name"], "TB")
+        self.assertEqual(results[2]["body"]["full_name"], "Amina Otieno")
+        self.assertEqual(len(results[3]["body"]), 1)
+
+    def test_authenticates_once(self):
+        """Test that the token is verified for the batch only"""
+        with mock.patch.object(
+            JWTAuthentication, "authenticate", autospec=True, side_effect=JWTAuthentication.authenticate
+        ) as authenticate:
+            self.batch({"path": "/api/user/me/"}, {"path": "/api/healthprograms/"})
+        self.assertEqual(authenticate.call_count, 1)
+
+    def test_writes_and_errors(self):
+        """Test writes, per-request headers and error statuses"""
+        detail = f"/api/clients/{self.client_instance.id}/"
+        response = self.batch(
+            {"method": "POST", "path": "/api/healthprograms/", "body": {"name": "HIV"}},
+            {"method": "PATCH", "path": detail, "body": {"address": "Kisumu"}, "headers": {"If-Match": '"1"'}},
+            {"method": "PATCH", "path": detail, "body": {"address": "Nairobi"}, "headers": {"If-Match": '"1"'}},
+            {"path": "/api/clients/999/"},
+            {"path": "/api/nowhere/"},
+        )
+        results = response.data["responses"]
+        self.assertEqual([result["status"] for result in results], [201, 200, 412, 404, 404])
+        self.assertEqual(results[1]["headers"]["ETag"], '"2"')
+        self.assertTrue(HealthProgram.objects.filter(name="HIV").exists())
+
+    def test_invalid_batches(self):
+        """Test that malformed batches are rejected before running anything"""
+        for requests in [
+            [],
+            [{"path": "/admin/"}],
+            [{"path": "/api/batch/"}],
+            [{"path": "/api/user/me/", "headers": {"Authorization": "Bearer x"}}],
+            [{"path": "/api/healthprograms/"}] * 21,
+        ]:
+            response = self.batch(*requests)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_streaming_and_binary_responses(self):
+        """Test that streamed and binary sub-responses fail or encode per item"""
+        self.user.is_staff = True
+        self.user.save()
+        with tempfile.TemporaryDirectory() as directory, override_settings(PROFILING_DIR=directory):
+            (Path(directory) / "20260101T000000-0123abcd.pstats").write_bytes(b"\x80\xff")
+            with mock.patch("core.health.views.ClientViewSet.list", return_value=HttpResponse(b"\x80\xff")):
+                response = self.batch(
+                    {"path": "/api/profiles/20260101T000000-0123abcd/"},
+                    {"path": "/api/clients/"},
+                    {"path": "/api/healthprograms/"},
+                )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["responses"]
+        self.assertEqual([result["status"] for result in results], [406, 200, 200])
+        self.assertEqual(results[1]["body_encoding"], "base64")
+        self.assertEqual(base64.b64decode(results[1]["body"]), b"\x80\xff")
+
+    def test_anonymous_batch(self):
+        """Test that sub-requests of an anonymous batch stay anonymous"""
+        self.client.credentials()
+        response = self.batch({"path": "/api/user/me/"}, {"path": "/api/healthprograms/"})
+        self.assertEqual([result["status"] for result in response.data["responses"]], [401, 200])
+
+
+class ParallelBatchTest(APITransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        for name in ["TB", "HIV", "Malaria"]:
+            HealthProgram.objects.create(name=name)
+
+    def test_parallel_reads(self):
+        """Test that parallel reads return the same results in order"""
+        programs = HealthProgram.objects.order_by("id")
+        requests = [{"path": f"/api/healthprograms/{program.id}/"} for program in programs]
+        response = self.client.post(reverse("batch"), {"requests": requests, "parallel": True}, format="json")
+        names = [result["body"]["name"] for result in response.data["responses"]]
+        self.assertEqual(names, ["TB", "HIV", "Malaria"])
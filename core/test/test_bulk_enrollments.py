@@ -0,0 +1,107 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from core.health import rollups
+from core.health.cache import profile_cache
+from core.health.models import Client, Enrollment, HealthProgram
+
+
+class BulkEnrollmentTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        profile_cache.clear()
+        self.program = HealthProgram.objects.create(name="TB")
+        other_program = HealthProgram.objects.create(name="HIV")
+        self.clients = [
+            Client.objects.create(
+                first_name=f"Client{i}", last_name="Otieno", date_of_birth=date(1990, 1, 15), gender="F"
+            )
+            for i in range(4)
+        ]
+        for i, client in enumerate(self.clients):
+            Enrollment.objects.create(client=client, program=self.program)
+            Enrollment.objects.filter(client=client).update(enrollment_date=date(2024, i + 1, 1))
+        Enrollment.objects.create(client=self.clients[0], program=other_program)
+        # The enrollment dates were moved behind the models' back
+        rollups.reconcile()
+
+    def url(self, transition):
+        return reverse(f"healthprogram-{transition}-enrollments", kwargs={"pk": self.program.id})
+
+    def test_deactivate_all(self):
+        """Test that deactivation is one UPDATE over the program's enrollments"""
+        # SELECT program, last journal id, journal INSERT ... SELECT, rollup
+        # counts, one rollup UPDATE per enrollment month, UPDATE, client ids
+        # of the changed profiles, COUNT of active enrollments
+        with self.assertNumQueries(11):
+            response = self.client.post(self.url("deactivate"), {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"updated": 4, "active_enrollments": 0})
+        self.assertEqual(Enrollment.objects.filter(active=True).count(), 1)
+        self.assertEqual(set(self.program.enrollments.values_list("version", flat=True)), {2})
+
+    def test_deactivate_by_date_range_and_clients(self):
+        """Test that only enrollments matching every filter change"""
+        response = self.client.post(
+            self.url("deactivate"),
+            {"enrolled_from": "2024-02-01", "enrolled_to": "2024-03-31"},
+            format="json",
+        )
+        self.assertEqual(response.data, {"updated": 2, "active_enrollments": 2})
+
+        response = self.client.post(
+            self.url("deactivate"),
+            {"client_ids": [self.clients[0].id, self.clients[1].id]},
+            format="json",
+        )
+        # clients[1] was already inactive
+        self.assertEqual(response.data, {"updated": 1, "active_enrollments": 1})
+
+    def test_reactivate(self):
+        """Test that reactivation only touches inactive enrollments"""
+        self.client.post(self.url("deactivate"), {"client_ids": [self.clients[0].id]}, format="json")
+        response = self.client.post(self.url("reactivate"), {}, format="json")
+        self.assertEqual(response.data, {"updated": 1, "active_enrollments": 4})
+
+    def test_annotate(self):
+        """Test that notes are set on every selected enrollment"""
+        response = self.client.post(
+            self.url("annotate"), {"notes": "Cohort closed", "enrolled_to": "2024-01-31"}, format="json"
+        )
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(Enrollment.objects.get(client=self.clients[0], program=self.program).notes, "Cohort closed")
+
+        response = self.client.post(self.url("annotate"), {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_filters(self):
+        """Test that inverted date ranges and empty id lists are rejected"""
+        for data in [{"enrolled_from": "2024-05-01", "enrolled_to": "2024-01-01"}, {"client_ids": []}]:
+            response = self.client.post(self.url("deactivate"), data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cached_profiles_are_refreshed(self):
+        """Test that cached profiles reflect the bulk change"""
+        profile_url = reverse("client-profile", kwargs={"pk": self.clients[2].id})
+        self.client.get(profile_url)
+        self.client.post(self.url("deactivate"), {}, format="json")
+        response = self.client.get(profile_url)
+        self.assertFalse(response.data["enrollments"][0]["active"])
+
+        self.client.post(self.url("reactivate"), {"client_ids": [self.clients[2].id]}, format="json")
+        response = self.client.get(profile_url)
+        self.assertTrue(response.data["enrollments"][0]["active"])
+
+    def test_unchanged_profiles_stay_cached(self):
+        """Test that only the profiles of clients whose enrollments changed are dropped"""
+        other = Client.objects.create(first_name="Baraka", last_name="Mwangi", date_of_birth=date(1980, 1, 1), gender="M")
+        profile_cache.set(other.id, {"id": other.id})
+        profile_cache.set(self.clients[2].id, {"id": self.clients[2].id})
+        self.client.post(self.url("deactivate"), {}, format="json")
+        self.assertIsNone(profile_cache.get(self.clients[2].id))
+        self.assertEqual(profile_cache.get(other.id), {"id": other.id})
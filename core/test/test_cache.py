@@ -0,0 +1,94 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from core.health.cache import profile_cache
+from core.health.models import HealthProgram, Client, Enrollment
+
+
+class ProfileCacheTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        profile_cache.clear()
+        self.client_instance = Client.objects.create(
+            first_name="Achieng",
+            last_name="Odhiambo",
+            date_of_birth=date(1988, 6, 2),
+            gender="F",
+        )
+        self.program = HealthProgram.objects.create(name="TB Program")
+        self.enrollment = Enrollment.objects.create(
+            client=self.client_instance, program=self.program
+        )
+        self.url = reverse("client-profile", kwargs={"pk": self.client_instance.id})
+
+    def test_second_read_is_served_from_cache(self):
+        """Test that a cached profile is returned without querying the database"""
+        self.client.get(self.url)
+        # Left are the client lookup, which applies the request's filters, and
+        # the access audit insert after the response
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["full_name"], "Achieng Odhiambo")
+        self.assertEqual(profile_cache.stats()["hits"], 1)
+        self.assertEqual(profile_cache.stats()["misses"], 1)
+
+    def test_client_update_invalidates(self):
+        """Test that saving the client invalidates its profile"""
+        self.client.get(self.url)
+        self.client_instance.last_name = "Otieno"
+        self.client_instance.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["last_name"], "Otieno")
+
+    def test_enrollment_change_invalidates(self):
+        """Test that enrollment changes invalidate the client's profile"""
+        self.client.get(self.url)
+        self.enrollment.active = False
+        self.enrollment.save()
+        response = self.client.get(self.url)
+        self.assertFalse(response.data["enrollments"][0]["active"])
+
+        self.enrollment.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["enrollments"], [])
+
+    def test_program_rename_invalidates(self):
+        """Test that renaming a program invalidates profiles that mention it"""
+        self.client.get(self.url)
+        self.program.name = "TB Care Program"
+        self.program.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["enrollments"][0]["program_name"], "TB Care Program")
+
+    def test_deleted_client_is_not_served(self):
+        """Test that a deleted client's profile is no longer served"""
+        self.client.get(self.url)
+        self.client_instance.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cached_profile_respects_filters(self):
+        """Test that a cached profile is not served to a request whose filters exclude the client"""
+        self.client.get(self.url)
+        response = self.client.get(self.url, {"facility": "kisumu"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stats_endpoint_requires_staff(self):
+        """Test that cache counters are only exposed to staff users"""
+        url = reverse("client-profile-cache")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        staff = get_user_model().objects.create_user(
+            email="admin@example.com", password="pass", is_staff=True
+        )
+        self.client.force_authenticate(staff)
+        self.client.get(self.url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["misses"], 1)
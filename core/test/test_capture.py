@@ -0,0 +1,222 @@
+import json
+import tempfile
+import time
+from datetime import date
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.test import LiveServerTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from core.common.capture import REDACTED, mask, sanitize, shift_date
+from core.health.audit import audit_log
+from core.health.models import Client, Enrollment, HealthProgram
+from core.health.signals import flush_audit_log
+
+
+class CaptureTest(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.capture = Path(directory.name) / "traffic.jsonl"
+        settings_override = override_settings(CAPTURE_FILE=str(self.capture), CAPTURE_SAMPLE_RATE=1.0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = get_user_model().objects.create_user(email="nurse@example.com", password="pass")
+        self.client = APIClient()
+
+    def records(self):
+        return [json.loads(line) for line in self.capture.read_text().splitlines()]
+
+    def test_masking(self):
+        """Test that masking keeps the shape of a value and masks equal values alike"""
+        phone = mask("+254712345678")
+        self.assertRegex(phone, r"^\+\d{12}$")
+        self.assertNotEqual(phone, "+254712345678")
+        self.assertRegex(mask("Amina.Otieno@example.com"), r"^[A-Z][a-z]{4}\.[A-Z][a-z]{5}@[a-z]{7}\.[a-z]{3}$")
+        self.assertEqual(mask("Amina"), mask("Amina"))
+        self.assertEqual(
+            sanitize([{"password": "secret", "client": {"last_name": "Otieno", "gender": "F"}}]),
+            [{"password": REDACTED, "client": {"last_name": mask("Otieno"), "gender": "F"}}],
+        )
+
+    def test_captures_sanitized_requests(self):
+        """Test that API requests are appended with personal details masked and credentials left out"""
+        self.client.post(reverse("token_obtain_pair"), {"email": "nurse@example.com", "password": "pass"})
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            reverse("client-list"),
+            {"first_name": "Amina", "last_name": "Otieno", "date_of_birth": "1990-01-15", "gender": "F"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.get(reverse("client-list"), {"search": "Amina", "page_size": 5})
+
+        created, listed = self.records()
+        self.assertEqual(
+            {key: created[key] for key in ("method", "path", "query", "route", "status")},
+            {"method": "POST", "path": "/api/clients/", "query": "", "route": "client-list", "status": 201},
+        )
+        self.assertEqual(
+            created["body"],
+            {
+                "first_name": mask("Amina"),
+                "last_name": mask("Otieno"),
+                "date_of_birth": shift_date("1990-01-15"),
+                "gender": "F",
+            },
+        )
+        self.assertEqual((listed["method"], listed["body"]), ("GET", None))
+        self.assertEqual(listed["query"], f"search={mask('Amina')}&page_size=5")
+        self.assertNotIn("Amina", self.capture.read_text())
+
+    def test_masks_batched_query_strings(self):
+        """Test that the query strings of batched sub-requests are masked"""
+        self.assertEqual(
+            sanitize(
+                {
+                    "requests": [
+                        {"method": "GET", "path": "/api/clients/?search=Achieng+Odhiambo&page_size=5"},
+                        {"method": "GET", "path": "/api/clients/autocomplete/?q=0712345678"},
+                        {"method": "GET", "path": "/api/clients/1/profile/"},
+                    ]
+                }
+            ),
+            {
+                "requests": [
+                    {"method": "GET", "path": f"/api/clients/?search={mask('Achieng Odhiambo').replace(' ', '+')}&page_size=5"},
+                    {"method": "GET", "path": f"/api/clients/autocomplete/?q={mask('0712345678')}"},
+                    {"method": "GET", "path": "/api/clients/1/profile/"},
+                ]
+            },
+        )
+
+    def test_date_shifting(self):
+        """Test that dates of birth are moved to another valid date, alike for equal dates"""
+        shifted = date.fromisoformat(shift_date("1990-01-15"))
+        self.assertNotEqual(shifted, date(1990, 1, 15))
+        self.assertLessEqual(abs((shifted - date(1990, 1, 15)).days), 183)
+        self.assertEqual(shift_date("1990-01-15"), shift_date("1990-01-15"))
+        self.assertEqual(shift_date("15/01/1990"), mask("15/01/1990"))
+
+    def test_leaves_out_birth_dates_and_notes(self):
+        """Test that dates of birth and free-text notes are not written to a capture"""
+        program = HealthProgram.objects.create(name="TB")
+        patient = Client.objects.create(
+            first_name="Amina", last_name="Otieno", date_of_birth=date(1990, 1, 15), gender="F"
+        )
+        Enrollment.objects.create(client=patient, program=program)
+        self.client.force_authenticate(self.user)
+        self.client.get(reverse("client-list"), {"date_of_birth": "1990-01-15"})
+        response = self.client.post(
+            reverse("healthprogram-annotate-enrollments", args=[program.id]),
+            {"notes": "Lives with her sister in Kibera"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(
+            reverse("batch"),
+            {
+                "requests": [
+                    {
+                        "method": "POST",
+                        "path": reverse("client-list"),
+                        "body": {"first_name": "Baraka", "last_name": "Mwangi", "date_of_birth": "1990-01-15"},
+                    },
+                    {
+                        "method": "POST",
+                        "path": reverse("healthprogram-annotate-enrollments", args=[program.id]),
+                        "body": {"notes": "Lives with her sister in Kibera"},
+                    },
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        captured = self.capture.read_text()
+        self.assertNotIn("1990-01-15", captured)
+        self.assertNotIn("Kibera", captured)
+        self.assertEqual(self.records()[1]["body"], {"notes": REDACTED})
+
+    @override_settings(CAPTURE_SAMPLE_RATE=0.0)
+    def test_sampling(self):
+        """Test that requests outside the sample are not captured"""
+        self.client.force_authenticate(self.user)
+        self.client.get(reverse("client-list"))
+        self.assertFalse(self.capture.exists())
+
+
+class ReplayTest(LiveServerTestCase):
+    def setUp(self):
+        # The live server shares one in-memory SQLite connection between its
+        # threads. Access events are written after each response is sent,
+        # which would overlap the next replayed request, so write them at
+        # the end instead.
+        request_finished.disconnect(flush_audit_log)
+        self.addCleanup(request_finished.connect, flush_audit_log)
+        self.addCleanup(audit_log.flush)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        get_user_model().objects.create_user(email="loadtest@example.com", password="pass")
+        program = HealthProgram.objects.create(name="TB")
+        client = Client.objects.create(first_name="Amina", last_name="Otieno", date_of_birth="1990-01-15", gender="F")
+        now = time.time()
+        requests = [
+            ("GET", "/api/clients/", "page_size=5", None, "client-list", 200),
+            ("GET", f"/api/clients/{client.id}/profile/", "", None, "client-profile", 200),
+            ("POST", f"/api/clients/{client.id}/enroll/", "", {"program_id": program.id}, "client-enroll", 200),
+            ("GET", "/api/clients/", "", None, "client-list", 200),
+        ]
+        self.capture = self.directory / "traffic.jsonl"
+        self.capture.write_text(
+            "".join(
+                json.dumps(
+                    {
+                        "time": now + offset * 0.01,
+                        "method": method,
+                        "path": path,
+                        "query": query,
+                        "body": body,
+                        "route": route,
+                        "status": captured_status,
+                        "duration_ms": 5.0,
+                    }
+                )
+                + "\n"
+                for offset, (method, path, query, body, route, captured_status) in enumerate(requests)
+            )
+        )
+
+    def test_replay_reports_percentiles_per_route(self):
+        """Test that replaying a capture against a server reports latency per route"""
+        out = StringIO()
+        report = self.directory / "report.json"
+        call_command(
+            "replay_traffic",
+            str(self.capture),
+            base_url=self.live_server_url,
+            email="loadtest@example.com",
+            password="pass",
+            speedup=10,
+            # Requests must not overlap on the shared connection either
+            concurrency=1,
+            report=str(report),
+            stdout=out,
+        )
+        self.assertIn("4 requests in", out.getvalue())
+        self.assertIn("GET client-list", out.getvalue())
+
+        results = json.loads(report.read_text())
+        self.assertEqual(set(results["routes"]), {"GET client-list", "GET client-profile", "POST client-enroll"})
+        self.assertEqual(results["routes"]["GET client-list"]["requests"], 2)
+        self.assertEqual(results["all"]["errors"], 0)
+        self.assertEqual(results["all"]["status_changed"], 0)
+        self.assertLessEqual(results["all"]["p50"], results["all"]["p99"])
+        self.assertLessEqual(results["all"]["p99"], results["all"]["max"])
@@ -0,0 +1,123 @@
+from datetime import date
+
+from django.db import transaction
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from core.common.models import StaleObjectError
+from core.health.cache import profile_cache
+from core.health.models import Client, Enrollment, HealthProgram
+
+
+class OptimisticConcurrencyTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        profile_cache.clear()
+        self.client_instance = Client.objects.create(
+            first_name="Amina",
+            last_name="Otieno",
+            date_of_birth=date(1990, 1, 15),
+            gender="F",
+        )
+        self.url = reverse("client-detail", kwargs={"pk": self.client_instance.id})
+
+    def test_save_bumps_version(self):
+        """Test that each save increments the row version"""
+        self.assertEqual(self.client_instance.version, 1)
+        self.client_instance.address = "Kisumu"
+        self.client_instance.save()
+        self.client_instance.refresh_from_db()
+        self.assertEqual(self.client_instance.version, 2)
+
+    def test_stale_instance_is_rejected(self):
+        """Test that saving a copy read before another write raises"""
+        stale = Client.objects.get(pk=self.client_instance.pk)
+        self.client_instance.address = "Kisumu"
+        self.client_instance.save()
+
+        stale.address = "Nairobi"
+        with self.assertRaises(StaleObjectError), transaction.atomic():
+            stale.save()
+        self.assertEqual(stale.version, 1)
+        self.client_instance.refresh_from_db()
+        self.assertEqual(self.client_instance.address, "Kisumu")
+
+    def test_retrieve_returns_version_etag(self):
+        """Test that detail responses carry the version as ETag"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["version"], 1)
+        self.assertEqual(response["ETag"], '"1"')
+
+    def test_update_with_current_etag(self):
+        """Test that an update with a matching If-Match succeeds in one UPDATE"""
+        # SELECT client, enrollments prefetch, guarded UPDATE, sync journal
+        # entry, enrollments for the response
+        with self.assertNumQueries(5):
+            response = self.client.patch(self.url, {"address": "Kisumu"}, format="json", HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["version"], 2)
+        self.assertEqual(response["ETag"], '"2"')
+
+    def test_update_with_stale_etag(self):
+        """Test that an update based on an old version gets 412"""
+        self.client.patch(self.url, {"address": "Kisumu"}, format="json", HTTP_IF_MATCH='"1"')
+        response = self.client.patch(self.url, {"address": "Nairobi"}, format="json", HTTP_IF_MATCH='W/"1"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.client_instance.refresh_from_db()
+        self.assertEqual(self.client_instance.address, "Kisumu")
+
+    def test_update_with_etag_list(self):
+        """Test that If-Match lists of tags, or a wildcard, match any current version"""
+        response = self.client.patch(self.url, {"address": "Kisumu"}, format="json", HTTP_IF_MATCH='"7", W/"1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(self.url, {"address": "Nairobi"}, format="json", HTTP_IF_MATCH='"1", "3"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.client.patch(self.url, {"address": "Nairobi"}, format="json", HTTP_IF_MATCH="*")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_delete_with_stale_etag(self):
+        """Test that a delete based on an old version gets 412 and keeps the row"""
+        self.client.patch(self.url, {"address": "Kisumu"}, format="json")
+        response = self.client.delete(self.url, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.client.delete(self.url, HTTP_IF_MATCH='"2"')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Client.objects.filter(pk=self.client_instance.pk).exists())
+
+    def test_stale_instance_is_not_deleted(self):
+        """Test that deleting an instance updated since it was read raises"""
+        stale = Client.objects.get(pk=self.client_instance.pk)
+        self.client_instance.address = "Kisumu"
+        self.client_instance.save()
+        with self.assertRaises(StaleObjectError):
+            stale.delete()
+        self.assertTrue(Client.objects.filter(pk=self.client_instance.pk).exists())
+        self.client_instance.delete()
+        self.assertFalse(Client.objects.filter(pk=self.client_instance.pk).exists())
+
+    def test_malformed_if_match(self):
+        """Test that an If-Match that is not a version is a bad request"""
+        response = self.client.patch(self.url, {"address": "Kisumu"}, format="json", HTTP_IF_MATCH='"abc"')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_without_if_match(self):
+        """Test that unconditional updates still work"""
+        response = self.client.put(
+            self.url,
+            {"first_name": "Amina", "last_name": "Otieno", "date_of_birth": "1990-01-15", "gender": "F"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["version"], 2)
+
+    def test_reenroll_bumps_enrollment_version(self):
+        """Test that reactivating an enrollment is a guarded update"""
+        program = HealthProgram.objects.create(name="TB")
+        enrollment = Enrollment.objects.create(client=self.client_instance, program=program, active=False)
+        url = reverse("client-enroll", kwargs={"pk": self.client_instance.id})
+        response = self.client.post(url, {"program_id": program.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        enrollment.refresh_from_db()
+        self.assertTrue(enrollment.active)
+        self.assertEqual(enrollment.version, 2)
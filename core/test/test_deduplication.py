@@ -0,0 +1,154 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from core.health.deduplication import find_duplicate_candidates
+from core.health.matching import dob_name_key, name_sound_key, normalize_phone, phonetic_key
+from core.health.models import Client
+
+
+def make_client(first_name, last_name, date_of_birth=date(1990, 1, 15), phone_number=""):
+    return Client.objects.create(
+        first_name=first_name,
+        last_name=last_name,
+        date_of_birth=date_of_birth,
+        gender="F",
+        phone_number=phone_number,
+    )
+
+
+class BlockingKeyTest(TestCase):
+    """Test cases for the blocking key functions"""
+
+    def test_normalize_phone(self):
+        """Test that local and international formats share a key"""
+        self.assertEqual(normalize_phone("0712 345 678"), "712345678")
+        self.assertEqual(normalize_phone("+254-712-345-678"), "712345678")
+        self.assertEqual(normalize_phone(""), "")
+
+    def test_phonetic_key(self):
+        """Test that common East African spelling variants share a key"""
+        for name_a, name_b in [
+            ("Wanjiru", "Wanjilu"),
+            ("Odhiambo", "Odiambo"),
+            ("Mbugua", "Bugua"),
+            ("Achieng", "Akinyi"),
+            ("Nyambura", "Niambura"),
+            ("Kiprotich", "Kiprotik"),
+        ]:
+            self.assertEqual(phonetic_key(name_a), phonetic_key(name_b))
+        self.assertNotEqual(phonetic_key("Kamau"), phonetic_key("Wanjiru"))
+        self.assertEqual(phonetic_key(""), "")
+
+    def test_name_sound_key_ignores_name_order(self):
+        """Test that swapped first and last names share a key"""
+        self.assertEqual(name_sound_key("Wanjiru", "Kamau"), name_sound_key("Kamau", "Wanjiru"))
+
+    def test_dob_name_key(self):
+        """Test the date of birth plus last name prefix key"""
+        self.assertEqual(dob_name_key(date(1990, 1, 15), "Otieno"), "19900115OTI")
+        self.assertEqual(dob_name_key("1990-01-15", "Otieno"), "19900115OTI")
+
+    def test_keys_are_maintained_on_save(self):
+        """Test that saving a client refreshes its blocking keys"""
+        client = make_client("Amina", "Otieno", phone_number="0712345678")
+        self.assertEqual(client.phone_key, "712345678")
+        client.phone_number = "0799000111"
+        client.save(update_fields=["phone_number"])
+        client.refresh_from_db()
+        self.assertEqual(client.phone_key, "799000111")
+
+
+class DuplicateCheckOnCreateTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.existing = make_client("Amina", "Otieno", phone_number="0712345678")
+        make_client("Baraka", "Mwangi", date_of_birth=date(1970, 5, 5))
+
+    def test_create_lists_possible_duplicates(self):
+        """Test that registering a likely duplicate returns the existing client"""
+        data = {
+            "first_name": "Aminah",
+            "last_name": "Otieno",
+            "date_of_birth": "1990-01-15",
+            "gender": "F",
+            "phone_number": "+254712345678",
+        }
+        # INSERT, sync journal entry, enrollments of the new client, one duplicate lookup
+        with self.assertNumQueries(4):
+            response = self.client.post(reverse("client-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        duplicates = response.data["possible_duplicates"]
+        self.assertEqual([d["id"] for d in duplicates], [self.existing.id])
+        self.assertEqual(
+            set(duplicates[0]["matched_on"]), {"phone_key", "dob_name_key", "name_sound_key"}
+        )
+
+    def test_create_without_duplicates(self):
+        """Test that a new person gets an empty duplicate list"""
+        data = {
+            "first_name": "Chebet",
+            "last_name": "Kiprop",
+            "date_of_birth": "1985-03-20",
+            "gender": "F",
+        }
+        response = self.client.post(reverse("client-list"), data, format="json")
+        self.assertEqual(response.data["possible_duplicates"], [])
+
+    def test_strong_older_match_ranks_first(self):
+        """Test that a client matching on every key outranks newer clients sharing one key"""
+        for index in range(5):
+            make_client("Zawadi", "Kamau", date_of_birth=date(2000, 1, index + 1), phone_number="0712345678")
+        new = Client(first_name="Aminah", last_name="Otieno", date_of_birth=date(1990, 1, 15), phone_number="0712345678")
+        new.update_match_keys()
+        [candidate] = find_duplicate_candidates(new, limit=1)
+        self.assertEqual(candidate.id, self.existing.id)
+        self.assertEqual(len(candidate.matched_on), 3)
+
+
+class DuplicateCommandsTest(TestCase):
+    def setUp(self):
+        self.a = make_client("Amina", "Otieno", phone_number="0712345678")
+        self.b = make_client("Otieno", "Amina", date_of_birth=date(1991, 2, 2), phone_number="254712345678")
+        self.c = make_client("Baraka", "Mwangi", date_of_birth=date(1970, 5, 5))
+
+    def test_find_duplicates(self):
+        """Test that the batch command lists pairs sharing blocking keys"""
+        out = StringIO()
+        call_command("find_duplicates", stdout=out, stderr=StringIO())
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "id_a,id_b,matched_on,score")
+        self.assertEqual(lines[1:], [f"{self.a.id},{self.b.id},phone_key|name_sound_key,2"])
+
+    def test_backfill_client_keys(self):
+        """Test that the backfill command recomputes stale keys"""
+        Client.objects.update(phone_key="", name_sound_key="")
+        call_command("backfill_client_keys", "--batch-size", "2", stdout=StringIO())
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.phone_key, "712345678")
+        self.assertEqual(self.a.name_sound_key, "V35:V55")
+
+
+class PhoneticSearchTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.wanjiru = make_client("Wanjiru", "Kamau")
+        self.odhiambo = make_client("Achieng", "Odhiambo")
+        make_client("Baraka", "Mwangi")
+
+    def test_phonetic_search_matches_misspellings(self):
+        """Test that misspelled names find the client through the phonetic keys"""
+        url = reverse("client-list")
+        response = self.client.get(url, {"phonetic": "Wanjilu"})
+        self.assertEqual([c["id"] for c in response.data], [self.wanjiru.id])
+
+        response = self.client.get(url, {"phonetic": "Akinyi Odiambo"})
+        self.assertEqual([c["id"] for c in response.data], [self.odhiambo.id])
+
+        response = self.client.get(url, {"phonetic": "Akinyi Kamau"})
+        self.assertEqual(response.data, [])
@@ -0,0 +1,104 @@
+import json
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+
+from core.health.models import Client, ClientProfileDocument, Enrollment, HealthProgram
+
+
+@override_settings(MATERIALIZED_PROFILES=True)
+class MaterializedProfileTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.program = HealthProgram.objects.create(name="TB")
+        self.client_instance = Client.objects.create(
+            first_name="Amina", last_name="Otieno", date_of_birth=date(1990, 1, 15), gender="F"
+        )
+        Enrollment.objects.create(client=self.client_instance, program=self.program)
+        self.url = reverse("client-profile", kwargs={"pk": self.client_instance.id})
+
+    def document(self):
+        return json.loads(ClientProfileDocument.objects.get(client=self.client_instance).document)
+
+    def test_profile_is_a_single_lookup(self):
+        """Test that the profile is served from the stored document"""
+        # Document lookup plus the audit log insert
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        data = json.loads(response.content)
+        self.assertEqual(data["full_name"], "Amina Otieno")
+        self.assertEqual(data["enrollments"][0]["program_name"], "TB")
+
+    def test_document_rebuilt_on_write(self):
+        """Test that client and enrollment saves rebuild the document"""
+        self.client_instance.first_name = "Aminah"
+        self.client_instance.save()
+        self.assertEqual(self.document()["first_name"], "Aminah")
+
+        enrollment = self.client_instance.enrollments.get()
+        enrollment.active = False
+        enrollment.save()
+        self.assertFalse(self.document()["enrollments"][0]["active"])
+
+    def test_program_rename_refreshes_profile(self):
+        """Test that renaming a program is reflected in stored profiles"""
+        self.program.name = "Tuberculosis"
+        self.program.save()
+        self.assertFalse(ClientProfileDocument.objects.exists())
+        response = self.client.get(self.url)
+        self.assertEqual(json.loads(response.content)["enrollments"][0]["program_name"], "Tuberculosis")
+        self.assertTrue(ClientProfileDocument.objects.exists())
+
+    def test_program_saved_without_rename_keeps_documents(self):
+        """Test that saving a program under the same name leaves stored profiles alone"""
+        self.program.description = "Tuberculosis"
+        self.program.save()
+        self.assertTrue(ClientProfileDocument.objects.exists())
+
+    def test_age_is_current(self):
+        """Test that the age is left out of the stored document and computed when served"""
+        self.assertNotIn("age", self.document())
+        with mock.patch.object(Client, "age", 99):
+            data = json.loads(self.client.get(self.url).content)
+        self.assertEqual(data["age"], 99)
+        self.assertEqual(list(data)[4:7], ["date_of_birth", "age", "gender"])
+
+    def test_bulk_transition_refreshes_profile(self):
+        """Test that bulk enrollment changes are reflected in stored profiles"""
+        url = reverse("healthprogram-deactivate-enrollments", kwargs={"pk": self.program.id})
+        self.client.post(url, {}, format="json")
+        response = self.client.get(self.url)
+        self.assertFalse(json.loads(response.content)["enrollments"][0]["active"])
+
+    def test_deleting_client_deletes_document(self):
+        """Test that documents go away with their client"""
+        self.client_instance.delete()
+        self.assertFalse(ClientProfileDocument.objects.exists())
+
+    def test_missing_document_is_not_found(self):
+        """Test that a profile whose document cannot be rebuilt is a 404, not a server error"""
+        ClientProfileDocument.objects.all().delete()
+        with mock.patch("core.health.views.rebuild_profiles"):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_filtered_out_client_is_not_found(self):
+        """Test that a stored document is not served to a request whose filters exclude the client"""
+        self.assertEqual(self.client.get(self.url, {"facility": "kisumu"}).status_code, 404)
+
+    def test_rebuild_command(self):
+        """Test that the command rebuilds every document"""
+        ClientProfileDocument.objects.all().delete()
+        Client.objects.create(first_name="Baraka", last_name="Mwangi", date_of_birth=date(1970, 5, 5), gender="M")
+        ClientProfileDocument.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_profiles", "--batch-size", "1", stdout=out)
+        self.assertIn("Rebuilt 2 profile documents", out.getvalue())
+        self.assertEqual(self.document()["enrollments"][0]["program_name"], "TB")
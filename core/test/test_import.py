@@ -0,0 +1,80 @@
+import csv
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from core.health.importer import ClientImporter, read_rows
+from core.health.models import Client
+
+FIELDS = ["first_name", "last_name", "date_of_birth", "gender", "phone_number", "email"]
+
+
+class ClientImportTest(TransactionTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = Path(self.tmpdir.name) / "clients.csv"
+        rows = [
+            ["Amina", "Wanjiru", "1990-01-15", "F", "0712345678", "amina@example.com"],
+            ["Baraka", "Otieno", "not-a-date", "M", "", ""],
+            ["Chebet", "Kiprop", "1985-03-20", "F", "", "chebet@example.com"],
+            ["Daudi", "Mwangi", "1979-07-01", "X", "", "daudi@example"],
+        ] * 5
+        with open(self.path, "w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(FIELDS)
+            writer.writerows(rows)
+
+    def test_errors_are_reported_by_line_number(self):
+        """Test that invalid rows are reported in input order by line number"""
+        result = ClientImporter(workers=1, chunk_size=3).run(read_rows(self.path))
+        self.assertEqual(result.read, 20)
+        self.assertEqual(result.created, 10)
+        self.assertEqual(Client.objects.count(), 10)
+        lines = [line for line, _ in result.errors]
+        self.assertEqual(lines, [3, 5, 7, 9, 11, 13, 15, 17, 19, 21])
+        self.assertIn("date_of_birth", result.errors[0][1])
+        self.assertEqual(set(result.errors[1][1]), {"gender", "email"})
+
+    def test_parallel_matches_serial(self):
+        """Test that a process pool gives the same result as serial validation"""
+        serial = ClientImporter(workers=1, chunk_size=3, dry_run=True).run(read_rows(self.path))
+        parallel = ClientImporter(workers=2, chunk_size=3, max_pending=2).run(read_rows(self.path))
+        self.assertEqual(parallel.created, serial.created)
+        self.assertEqual(parallel.errors, serial.errors)
+        self.assertEqual(
+            list(Client.objects.order_by("id").values_list("first_name", flat=True)[:2]),
+            ["Amina", "Chebet"],
+        )
+
+    def test_command_writes_error_file(self):
+        """Test the import command with an error report file"""
+        errors_path = Path(self.tmpdir.name) / "errors.jsonl"
+        out = StringIO()
+        call_command(
+            "import_clients", str(self.path), "--workers", "1", "--errors", str(errors_path),
+            stdout=out,
+        )
+        self.assertIn("Imported 10 of 20 rows", out.getvalue())
+        first_error = json.loads(errors_path.read_text().splitlines()[0])
+        self.assertEqual(first_error["line"], 3)
+
+    def test_malformed_json_lines_are_reported(self):
+        """Test that a line that is not JSON is reported by line number without stopping the import"""
+        path = Path(self.tmpdir.name) / "clients.jsonl"
+        rows = [
+            {"first_name": "Amina", "last_name": "Wanjiru", "date_of_birth": "1990-01-15", "gender": "F"},
+            '{"first_name": "Baraka", "last_name": ',
+            {"first_name": "Chebet", "last_name": "Kiprop", "date_of_birth": "1985-03-20", "gender": "F"},
+        ]
+        path.write_text("".join((row if isinstance(row, str) else json.dumps(row)) + "\n" for row in rows))
+        result = ClientImporter(workers=1).run(read_rows(path))
+        self.assertEqual(result.read, 3)
+        self.assertEqual(result.created, 2)
+        [(line, errors)] = result.errors
+        self.assertEqual(line, 2)
+        self.assertIn("Invalid JSON", errors["non_field_errors"][0])
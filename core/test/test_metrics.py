@@ -0,0 +1,103 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from core.health.cache import profile_cache
+from core.health.models import Client
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTest(APITestCase):
+    def setUp(self):
+        profile_cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email="nurse@example.com", password="pass")
+        self.patient = Client.objects.create(
+            first_name="Amina", last_name="Otieno", date_of_birth=date(1990, 1, 15), gender="F"
+        )
+
+    def test_request_metrics(self):
+        """Test that latency, status, size and query count are recorded under the URL name"""
+        self.client.force_authenticate(self.user)
+        labels = {"route": "client-profile", "method": "GET"}
+        before = (
+            sample("tibanode_http_request_duration_seconds_count", **labels),
+            sample("tibanode_http_responses_total", status="200", **labels),
+            sample("tibanode_http_response_size_bytes_count", route="client-profile"),
+            sample("tibanode_http_request_db_queries_sum", route="client-profile"),
+            sample("tibanode_db_queries_total", database="default"),
+        )
+
+        response = self.client.get(reverse("client-profile", args=[self.patient.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(sample("tibanode_http_request_duration_seconds_count", **labels), before[0] + 1)
+        self.assertEqual(sample("tibanode_http_responses_total", status="200", **labels), before[1] + 1)
+        self.assertEqual(sample("tibanode_http_response_size_bytes_count", route="client-profile"), before[2] + 1)
+        queries = sample("tibanode_http_request_db_queries_sum", route="client-profile") - before[3]
+        self.assertGreater(queries, 0)
+        self.assertGreaterEqual(sample("tibanode_db_queries_total", database="default") - before[4], queries)
+
+    def test_unmatched_paths_share_a_label(self):
+        """Test that requests matching no URL are recorded under one label"""
+        before = sample("tibanode_http_responses_total", route="unmatched", method="GET", status="404")
+        self.client.get("/no-such-page/1/")
+        self.client.get("/no-such-page/2/")
+        self.assertEqual(
+            sample("tibanode_http_responses_total", route="unmatched", method="GET", status="404"), before + 2
+        )
+
+    def test_auth_failures(self):
+        """Test that requests refused for bad credentials are counted"""
+        before = sample("tibanode_auth_failures_total", route="client-list")
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer not-a-token")
+        self.assertEqual(self.client.get(reverse("client-list")).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(sample("tibanode_auth_failures_total", route="client-list"), before + 1)
+
+    def test_cache_lookups(self):
+        """Test that profile cache hits and misses are counted"""
+        self.client.force_authenticate(self.user)
+        before = (
+            sample("tibanode_cache_lookups_total", cache="profiles", result="hit"),
+            sample("tibanode_cache_lookups_total", cache="profiles", result="miss"),
+        )
+        url = reverse("client-profile", args=[self.patient.id])
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(sample("tibanode_cache_lookups_total", cache="profiles", result="hit"), before[0] + 1)
+        self.assertEqual(sample("tibanode_cache_lookups_total", cache="profiles", result="miss"), before[1] + 1)
+
+    def test_endpoint(self):
+        """Test that the metrics are served in the Prometheus text format"""
+        self.client.force_authenticate(self.user)
+        self.client.get(reverse("client-list"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn("# TYPE tibanode_http_request_duration_seconds histogram", body)
+        self.assertIn('tibanode_http_request_duration_seconds_bucket{le="0.1",method="GET",route="client-list"}', body)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_endpoint_token(self):
+        """Test that a configured token is required to scrape"""
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer scrape-wrong")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer scrape-secret")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_TOKEN="", METRICS_REQUIRE_TOKEN=True)
+    def test_endpoint_hidden_without_token(self):
+        """Test that the endpoint is not served when a token is required but none is set"""
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer ")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
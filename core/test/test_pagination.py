@@ -0,0 +1,80 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from core.common.pagination import EstimatedCountPaginator
+from core.health.models import Client
+
+
+def make_clients(count):
+    Client.objects.bulk_create(
+        Client(
+            first_name=f"Client{i}",
+            last_name="Otieno" if i % 2 else "Wanjiru",
+            date_of_birth=date(1990, 1, 1),
+            gender="F",
+        )
+        for i in range(count)
+    )
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    """Test cases for the EstimatedCountPaginator"""
+
+    def setUp(self):
+        cache.clear()
+        make_clients(5)
+
+    def test_unfiltered_count_is_cached(self):
+        """Test that an unfiltered count is served from the cache once warm"""
+        queryset = Client.objects.order_by("id")
+        paginator = EstimatedCountPaginator(queryset, 2)
+        self.assertEqual(paginator.count, 5)
+        self.assertFalse(paginator.count_estimated)
+
+        make_clients(1)
+        paginator = EstimatedCountPaginator(queryset, 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 5)
+        self.assertTrue(paginator.count_estimated)
+
+    def test_filtered_count_is_exact_under_threshold(self):
+        """Test that selective filters are counted exactly"""
+        queryset = Client.objects.filter(last_name="Otieno").order_by("id")
+        paginator = EstimatedCountPaginator(queryset, 2)
+        self.assertEqual(paginator.count, 2)
+        self.assertFalse(paginator.count_estimated)
+
+    def test_filtered_count_above_threshold_falls_back(self):
+        """Test that non-PostgreSQL backends fall back to an exact count"""
+        queryset = Client.objects.filter(gender="F").order_by("id")
+        paginator = EstimatedCountPaginator(queryset, 2)
+        paginator.exact_count_threshold = 3
+        self.assertEqual(paginator.count, 5)
+        self.assertFalse(paginator.count_estimated)
+
+
+class ClientPaginationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        make_clients(3)
+
+    def test_list_is_unpaginated_by_default(self):
+        """Test that lists stay plain arrays without a page size"""
+        response = self.client.get(reverse("client-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+
+    def test_paginated_list(self):
+        """Test that a page size returns a page with count metadata"""
+        response = self.client.get(reverse("client-list") + "?page_size=2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 3)
+        self.assertFalse(response.data["count_estimated"])
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
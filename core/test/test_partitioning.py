@@ -0,0 +1,66 @@
+import unittest
+from datetime import date
+
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase
+
+from core.common.partitioning import hash_partition_sql, is_partitioned, partition_table, with_partition_key
+from core.health.models import Client, Enrollment, HealthProgram
+
+
+class PartitioningHelpersTest(SimpleTestCase):
+    def test_partition_sql(self):
+        """Test that partition statements are idempotent and name partitions after the parent"""
+        self.assertEqual(
+            hash_partition_sql("health_enrollment", 8, 3),
+            'CREATE TABLE IF NOT EXISTS "health_enrollment_p3" PARTITION OF "health_enrollment" '
+            "FOR VALUES WITH (MODULUS 8, REMAINDER 3)",
+        )
+
+    def test_with_partition_key(self):
+        """Test that the partition key is added to primary keys and unique constraints once"""
+        self.assertEqual(with_partition_key("PRIMARY KEY (id)", "client_id"), 'PRIMARY KEY (id, "client_id")')
+        self.assertEqual(
+            with_partition_key("UNIQUE (client_id, program_id)", "client_id"), "UNIQUE (client_id, program_id)"
+        )
+
+
+# Run in CI against PostgreSQL (see .github/workflows/checks.yml)
+@unittest.skipUnless(connection.vendor == "postgresql", "partitioning needs PostgreSQL")
+class PostgreSQLPartitioningTest(TestCase):
+    def foreign_keys_to(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT conrelid::regclass::text FROM pg_constraint WHERE confrelid = %s::regclass AND contype = 'f'",
+                [table],
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_partitioned_enrollments_keep_constraints(self):
+        """Test that partitioned enrollments keep their foreign keys and unique (client, program)"""
+        self.assertTrue(is_partitioned("health_enrollment"))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_inherits WHERE inhparent = 'health_enrollment'::regclass")
+            self.assertEqual(cursor.fetchone()[0], 16)
+        self.assertFalse(is_partitioned("health_client"))
+        self.assertIn("health_enrollment", self.foreign_keys_to("health_client"))
+
+        program = HealthProgram.objects.create(name="TB")
+        client = Client.objects.create(
+            first_name="Amina", last_name="Otieno", date_of_birth=date(1990, 1, 15), gender="F"
+        )
+        Enrollment.objects.create(client=client, program=program)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Enrollment.objects.create(client=client, program=program)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Enrollment.objects.bulk_create([Enrollment(client_id=client.id + 1000, program=program)])
+            # Django's foreign keys are only checked at commit otherwise
+            connection.check_constraints()
+
+    def test_referenced_table_is_left_alone(self):
+        """Test that a table other tables point to is not partitioned by a key outside its primary key"""
+        referencing = self.foreign_keys_to("health_client")
+        with self.assertRaisesMessage(ValueError, "would drop the foreign keys"), connection.cursor() as cursor:
+            partition_table(cursor, "health_client", "HASH", "facility", [hash_partition_sql("health_client", 2, 0)])
+        self.assertFalse(is_partitioned("health_client"))
+        self.assertEqual(self.foreign_keys_to("health_client"), referencing)
@@ -0,0 +1,103 @@
+import importlib
+import os
+import pstats
+import re
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class ProfilingTest(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = override_settings(PROFILING_DIR=self.directory, PROFILING_SAMPLE_INTERVAL=0.001)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        User = get_user_model()
+        self.staff = User.objects.create_user(email="admin@example.com", password="pass", is_staff=True)
+        self.nurse = User.objects.create_user(email="nurse@example.com", password="pass")
+        self.client = self.client_for(self.staff)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        return client
+
+    def test_cprofile_by_header(self):
+        """Test that a staff request with X-Profile is profiled and its pstats file listed"""
+        response = self.client.get(reverse("healthprogram-list"), HTTP_X_PROFILE="cprofile")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile_id = response["X-Profile-Id"]
+
+        stats = pstats.Stats(str(self.directory / f"{profile_id}.pstats"))
+        self.assertTrue(any(function[2] == "list" for function in stats.stats))
+
+        profiles = self.client.get(reverse("profile-list")).data
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]["id"], profile_id)
+        self.assertEqual(profiles[0]["mode"], "cprofile")
+        self.assertEqual(profiles[0]["path"], "/api/healthprograms/")
+        self.assertEqual(profiles[0]["status"], 200)
+
+        response = self.client.get(reverse("profile-download", args=[profile_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(f"{profile_id}.pstats", response["Content-Disposition"])
+
+    def test_sampling_by_query_flag(self):
+        """Test that ?_profile=sample writes stacks in collapsed flamegraph format"""
+        response = self.client.get(reverse("healthprogram-list"), {"_profile": "sample"})
+        folded = (self.directory / f"{response['X-Profile-Id']}.folded").read_text()
+        for line in folded.splitlines():
+            self.assertRegex(line, r"^\S.* \d+$")
+
+    def test_ignored_for_others(self):
+        """Test that profiling flags from non-staff users or with unknown modes do nothing"""
+        response = self.client_for(self.nurse).get(reverse("healthprogram-list"), HTTP_X_PROFILE="cprofile")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-Profile-Id", response)
+        response = APIClient().get(reverse("healthprogram-list"), HTTP_X_PROFILE="cprofile")
+        self.assertNotIn("X-Profile-Id", response)
+        response = self.client.get(reverse("healthprogram-list"), HTTP_X_PROFILE="yappi")
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_admin_only(self):
+        """Test that only admins can list and download profiles"""
+        response = self.client_for(self.nurse).get(reverse("profile-list"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse("profile-download", args=["..%2Fdb"]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(PROFILING_MAX_FILES=2)
+    def test_keeps_newest(self):
+        """Test that only the newest PROFILING_MAX_FILES profiles are kept"""
+        ids = [
+            self.client.get(reverse("healthprogram-list"), HTTP_X_PROFILE="cprofile")["X-Profile-Id"]
+            for _ in range(3)
+        ]
+        kept = {re.sub(r"\.\w+$", "", path.name) for path in self.directory.iterdir()}
+        self.assertEqual(kept, set(ids[1:]))
+        self.assertEqual(len(list(self.directory.iterdir())), 4)
+
+    def test_enabled_in_deployment(self):
+        """Test that deployments load the middleware after authentication, which it needs"""
+        environ = {"RENDER_EXTERNAL_HOSTNAME": "tibanode.example.com", "DATABASE_URL": "postgres://db/tibanode"}
+        with mock.patch.dict(os.environ, environ):
+            deployment = importlib.import_module("config.deployment_settings")
+        self.addCleanup(sys.modules.pop, "config.deployment_settings")
+        middleware = deployment.MIDDLEWARE
+        self.assertGreater(
+            middleware.index("core.common.profiling.ProfilingMiddleware"),
+            middleware.index("django.contrib.auth.middleware.AuthenticationMiddleware"),
+        )
@@ -0,0 +1,129 @@
+import threading
+from datetime import date
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.test.runner import DiscoverRunner
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.common.querybudget import (
+    QueryBudgetExceeded,
+    QueryBudgetTestRunner,
+    QueryRecorder,
+    _recorder,
+    record_query,
+)
+from core.health.cache import profile_cache
+from core.health.models import Client, Enrollment, HealthProgram
+from core.health.views import ClientViewSet
+
+
+class QueryBudgetTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        profile_cache.clear()
+        self.user = get_user_model().objects.create_user(email="nurse@example.com", password="pass")
+        self.client = APIClient()
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.programs = [HealthProgram.objects.create(name=name) for name in ["TB", "HIV", "Malaria"]]
+        self.clients = [
+            Client.objects.create(first_name=f"Client{i}", last_name="Otieno", date_of_birth=date(1990, 1, 15), gender="F")
+            for i in range(3)
+        ]
+        for client in self.clients:
+            for program in self.programs[:2]:
+                Enrollment.objects.create(client=client, program=program)
+
+    def without_prefetch(self):
+        # The N+1 a nested serializer field gets without a matching prefetch
+        return mock.patch.object(ClientViewSet, "queryset", Client.objects.order_by("id"))
+
+    def test_within_budgets(self):
+        """Test that the budgeted actions fit their budgets with token authentication"""
+        client = self.clients[0]
+        self.assertEqual(self.client.get(reverse("client-list"), {"page_size": 2}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse("client-detail", args=[client.id])).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse("client-profile", args=[client.id])).status_code, status.HTTP_200_OK)
+        response = self.client.post(reverse("client-enroll", args=[client.id]), {"program_id": self.programs[2].id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_raises_with_repeated_sql_and_stack(self):
+        """Test that an overrun names the repeated statement and the code that ran it"""
+        with self.without_prefetch(), self.assertRaises(QueryBudgetExceeded) as raised:
+            self.client.get(reverse("client-list"))
+        message = str(raised.exception)
+        # User, clients, then enrollments per client and a program per enrollment
+        self.assertIn("ClientViewSet.list ran 11 queries, over its budget of 5, for GET /api/clients/", message)
+        self.assertIn('6x SELECT "health_healthprogram"', message)
+        self.assertIn('3x SELECT "health_enrollment"', message)
+        self.assertIn("in get_attribute", message)
+
+    def test_log_mode(self):
+        """Test that in log mode an overrun is logged and the response still served"""
+        with (
+            override_settings(QUERY_BUDGET_MODE="log"),
+            self.without_prefetch(),
+            self.assertLogs("core.common.querybudget", "WARNING") as logs,
+        ):
+            response = self.client.get(reverse("client-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ClientViewSet.list ran 11 queries", logs.output[0])
+
+    def test_raise_mode_serves_committed_writes(self):
+        """Test that in raise mode a write over its budget is logged as an error and still served"""
+        client = self.clients[0]
+        budgets = {**ClientViewSet.query_budgets, "enroll": 1}
+        with (
+            override_settings(QUERY_BUDGET_MODE="raise"),
+            mock.patch.object(ClientViewSet, "query_budgets", budgets),
+            self.assertLogs("core.common.querybudget", "ERROR") as logs,
+        ):
+            response = self.client.post(reverse("client-enroll", args=[client.id]), {"program_id": self.programs[2].id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(Enrollment.objects.filter(client=client, program=self.programs[2]).exists())
+        self.assertIn("ClientViewSet.enroll ran", logs.output[0])
+
+        with override_settings(QUERY_BUDGET_MODE="raise"), self.without_prefetch():
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse("client-list"))
+
+    def test_other_threads_are_not_charged(self):
+        """Test that queries run by another thread on a shared connection are not counted"""
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        try:
+            thread = threading.Thread(target=record_query, args=(mock.Mock(), "SELECT 1", None, False, {}))
+            thread.start()
+            thread.join()
+            record_query(mock.Mock(), "SELECT 2", None, False, {})
+        finally:
+            _recorder.reset(token)
+        self.assertEqual([sql for sql, _ in recorder.queries], ["SELECT 2"])
+
+    @override_settings(QUERY_BUDGET_MODE="off")
+    def test_off(self):
+        """Test that budgets are not checked when turned off"""
+        with self.without_prefetch():
+            response = self.client.get(reverse("client-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class QueryBudgetTestRunnerTest(SimpleTestCase):
+    @override_settings(QUERY_BUDGET_MODE="log")
+    def test_strict_while_testing(self):
+        """Test that the runner enforces budgets during the run and restores the setting after it"""
+        runner = QueryBudgetTestRunner()
+        with mock.patch.object(DiscoverRunner, "setup_test_environment"), mock.patch.object(
+            DiscoverRunner, "teardown_test_environment"
+        ):
+            runner.setup_test_environment()
+            self.assertEqual(settings.QUERY_BUDGET_MODE, "strict")
+            runner.teardown_test_environment()
+        self.assertEqual(settings.QUERY_BUDGET_MODE, "log")
@@ -0,0 +1,80 @@
+import gzip
+from datetime import date
+
+import brotli
+import msgpack
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from core.common.renderers import to_columnar
+from core.health.models import Client, HealthProgram
+
+
+class ColumnarRendererTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Client.objects.bulk_create(
+            Client(
+                first_name=f"Amina{i}",
+                last_name="Wanjiru",
+                date_of_birth=date(1990, 1, 1),
+                gender="F",
+                phone_number=f"07{i:08d}",
+                email=f"amina{i}@example.com",
+                address="Kisumu",
+            )
+            for i in range(50)
+        )
+        HealthProgram.objects.create(name="HIV Program")
+
+    def test_to_columnar(self):
+        """Test that objects are converted to columns and rows"""
+        data = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+        self.assertEqual(
+            to_columnar(data),
+            {"columns": ["id", "name"], "rows": [[1, "a"], [2, "b"]]},
+        )
+        self.assertEqual(to_columnar({"id": 1}), {"id": 1})
+
+    def test_columnar_json_list(self):
+        """Test content negotiation of the columnar JSON representation"""
+        response = self.client.get(
+            reverse("client-list"),
+            HTTP_ACCEPT="application/vnd.tibanode.columnar+json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        payload = response.json()
+        self.assertIn("first_name", payload["columns"])
+        self.assertEqual(len(payload["rows"]), 50)
+
+        plain = self.client.get(reverse("client-list"))
+        self.assertLess(len(response.content), len(plain.content))
+
+    def test_msgpack_list(self):
+        """Test the MessagePack variant of the columnar representation"""
+        response = self.client.get(
+            reverse("healthprogram-list"), HTTP_ACCEPT="application/msgpack"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        payload = msgpack.unpackb(response.content)
+        self.assertEqual(payload["rows"][0][payload["columns"].index("name")], "HIV Program")
+
+    def test_brotli_compression(self):
+        """Test that large responses are brotli-compressed when accepted"""
+        response = self.client.get(reverse("client-list"), HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertIn(b"Amina0", brotli.decompress(response.content))
+
+    def test_gzip_compression(self):
+        """Test that gzip is used when brotli is not accepted"""
+        response = self.client.get(reverse("client-list"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn(b"Amina0", gzip.decompress(response.content))
+
+    def test_small_responses_are_not_compressed(self):
+        """Test that small responses are sent uncompressed"""
+        response = self.client.get(
+            reverse("healthprogram-list"), HTTP_ACCEPT_ENCODING="gzip, br"
+        )
+        self.assertFalse(response.has_header("Content-Encoding"))
@@ -0,0 +1,174 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from core.health.models import Client, Enrollment, EnrollmentRollup, HealthProgram
+from core.health.rollups import age_band, bucket_counts, compute_rollups
+
+
+class RollupTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email="manager@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.tb = HealthProgram.objects.create(name="TB")
+        self.hiv = HealthProgram.objects.create(name="HIV")
+        self.month = date.today().replace(day=1)
+        self.amina = self.make_client("Amina", "F", 20)
+        self.baraka = self.make_client("Baraka", "M", 40)
+
+    def make_client(self, name, gender, age):
+        today = date.today()
+        return Client.objects.create(
+            first_name=name, last_name="Otieno", date_of_birth=date(today.year - age, 1, 1), gender=gender
+        )
+
+    def rollups(self):
+        return {
+            (row.program_id, row.gender, row.age_band): (row.enrollments, row.active)
+            for row in EnrollmentRollup.objects.exclude(enrollments=0)
+        }
+
+    def assertMatchesRawRows(self):
+        expected = {key: tuple(counts) for key, counts in compute_rollups().items() if counts[0]}
+        actual = {
+            (row.program_id, row.gender, row.age_band, row.month): (row.enrollments, row.active)
+            for row in EnrollmentRollup.objects.exclude(enrollments=0)
+        }
+        self.assertEqual(actual, expected)
+
+    def test_age_bands(self):
+        """Test that the age band is the age on the enrollment date"""
+        on = date(2026, 6, 15)
+        self.assertEqual(age_band(date(2022, 6, 16), on), "0-4")
+        self.assertEqual(age_band(date(2021, 6, 15), on), "5-14")
+        self.assertEqual(age_band(date(2001, 6, 16), on), "15-24")
+        self.assertEqual(age_band(date(1976, 6, 15), on), "50+")
+
+    def test_bucket_counts(self):
+        """Test that the database counts enrollments into the same buckets as the models do"""
+        on = date(2026, 6, 15)
+        for name, date_of_birth in [("Day", date(2011, 6, 16)), ("After", date(2011, 6, 15)), ("Leap", date(2008, 2, 29))]:
+            client = Client.objects.create(first_name=name, last_name="Otieno", date_of_birth=date_of_birth, gender="F")
+            Enrollment.objects.create(client=client, program=self.tb)
+        Enrollment.objects.update(enrollment_date=on)
+        month = on.replace(day=1)
+        # Turning 15 the day after, on the day, and born on 29 February
+        self.assertEqual(
+            dict(bucket_counts(Enrollment.objects.all())),
+            {(self.tb.id, "F", "5-14", month): 1, (self.tb.id, "F", "15-24", month): 2},
+        )
+
+    def test_enroll_and_reactivate(self):
+        """Test that enrolling and re-enrolling adjust the rollups"""
+        self.client.post(reverse("client-enroll", args=[self.amina.id]), {"program_id": self.tb.id})
+        self.client.post(reverse("client-enroll", args=[self.baraka.id]), {"program_id": self.tb.id})
+        self.assertEqual(self.rollups(), {(self.tb.id, "F", "15-24"): (1, 1), (self.tb.id, "M", "25-49"): (1, 1)})
+        self.assertEqual(EnrollmentRollup.objects.get(gender="F").month, self.month)
+
+        enrollment = Enrollment.objects.get(client=self.amina)
+        enrollment.active = False
+        enrollment.save()
+        self.assertEqual(self.rollups()[(self.tb.id, "F", "15-24")], (1, 0))
+
+        self.client.post(reverse("client-enroll", args=[self.amina.id]), {"program_id": self.tb.id})
+        self.assertEqual(self.rollups()[(self.tb.id, "F", "15-24")], (1, 1))
+        self.assertMatchesRawRows()
+
+    def test_enrollment_moves_between_buckets(self):
+        """Test that moving an enrollment to another program or client moves its counts"""
+        Enrollment.objects.create(client=self.amina, program=self.tb)
+        enrollment = Enrollment.objects.get(client=self.amina)
+        enrollment.program = self.hiv
+        enrollment.save()
+        self.assertEqual(self.rollups(), {(self.hiv.id, "F", "15-24"): (1, 1)})
+
+        enrollment.client = self.baraka
+        enrollment.active = False
+        enrollment.save()
+        self.assertEqual(self.rollups(), {(self.hiv.id, "M", "25-49"): (1, 0)})
+        self.assertMatchesRawRows()
+
+    def test_bulk_transition(self):
+        """Test that bulk deactivation moves the active counts of every bucket"""
+        Enrollment.objects.create(client=self.amina, program=self.tb)
+        Enrollment.objects.create(client=self.baraka, program=self.tb)
+        Enrollment.objects.create(client=self.baraka, program=self.hiv)
+
+        response = self.client.post(
+            reverse("healthprogram-deactivate-enrollments", kwargs={"pk": self.tb.id}), {}, format="json"
+        )
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(
+            self.rollups(),
+            {
+                (self.tb.id, "F", "15-24"): (1, 0),
+                (self.tb.id, "M", "25-49"): (1, 0),
+                (self.hiv.id, "M", "25-49"): (1, 1),
+            },
+        )
+        self.assertMatchesRawRows()
+
+    def test_client_changes_and_deletes(self):
+        """Test that correcting a client's details or deleting them moves their enrollments"""
+        Enrollment.objects.create(client=self.amina, program=self.tb)
+        Enrollment.objects.create(client=self.amina, program=self.hiv, active=False)
+
+        client = Client.objects.get(pk=self.amina.pk)
+        client.date_of_birth = date(date.today().year - 60, 1, 1)
+        client.save()
+        self.assertEqual(self.rollups(), {(self.tb.id, "F", "50+"): (1, 1), (self.hiv.id, "F", "50+"): (1, 0)})
+
+        client.delete()
+        self.assertEqual(self.rollups(), {})
+        self.assertMatchesRawRows()
+
+    def test_reconcile(self):
+        """Test that reconciling repairs rollups changed behind the models' back"""
+        Enrollment.objects.create(client=self.amina, program=self.tb)
+        Enrollment.objects.create(client=self.baraka, program=self.tb)
+        EnrollmentRollup.objects.filter(gender="F").update(enrollments=7)
+        EnrollmentRollup.objects.filter(gender="M").delete()
+        EnrollmentRollup.objects.create(program=self.hiv, gender="O", age_band="0-4", month=self.month, enrollments=3)
+
+        out = StringIO()
+        call_command("reconcile_rollups", stdout=out)
+        self.assertIn("default: fixed 3 rollup rows", out.getvalue())
+        self.assertMatchesRawRows()
+        self.assertEqual(EnrollmentRollup.objects.count(), 2)
+
+    def test_analytics_endpoint(self):
+        """Test that any slice is answered from the rollups in one query"""
+        Enrollment.objects.create(client=self.amina, program=self.tb)
+        Enrollment.objects.create(client=self.baraka, program=self.tb, active=False)
+        Enrollment.objects.create(client=self.baraka, program=self.hiv)
+        url = reverse("enrollment-analytics")
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"group_by": ["program", "month"]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        month = self.month.strftime("%Y-%m")
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"program": self.tb.id, "month": month, "program_name": "TB", "enrollments": 2, "active": 1},
+                {"program": self.hiv.id, "month": month, "program_name": "HIV", "enrollments": 1, "active": 1},
+            ],
+        )
+
+        response = self.client.get(url, {"gender": "M", "age_band": ["25-49", "50+"]})
+        self.assertEqual(response.data["results"], [{"enrollments": 2, "active": 1}])
+
+        response = self.client.get(url, {"group_by": "gender", "program": self.tb.id, "month_from": month})
+        self.assertEqual(
+            response.data["results"],
+            [{"gender": "F", "enrollments": 1, "active": 1}, {"gender": "M", "enrollments": 1, "active": 0}],
+        )
+
+        response = self.client.get(url, {"group_by": "ward"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,61 @@
+import gzip
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.common.schema import load_schema
+
+
+class SchemaViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.schema_file = Path(cls.tmpdir.name) / "openapi.json"
+        call_command("generate_schema", output=cls.schema_file, stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        load_schema.cache_clear()
+        settings_override = override_settings(OPENAPI_SCHEMA_FILE=self.schema_file)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_command_writes_plain_and_gzip_copies(self):
+        """Test that the command writes the schema and a gzip copy"""
+        content = self.schema_file.read_bytes()
+        self.assertIn("/clients/", json.loads(content)["paths"])
+        gz_file = self.schema_file.with_name("openapi.json.gz")
+        self.assertEqual(gzip.decompress(gz_file.read_bytes()), content)
+
+    def test_serves_precomputed_schema_with_etag(self):
+        """Test that the schema is served from file with an ETag"""
+        response = self.client.get(reverse("schema-json"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.schema_file.read_bytes())
+        etag = response["ETag"]
+
+        response = self.client.get(reverse("schema-json"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_serves_gzip_when_accepted(self):
+        """Test that the precompressed copy is served to gzip-capable clients"""
+        response = self.client.get(reverse("schema-json"), HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.schema_file.read_bytes())
+        self.assertTrue(response["ETag"].endswith('-gzip"'))
+
+    def test_redoc_points_at_precomputed_schema(self):
+        """Test that the ReDoc page loads the precomputed schema"""
+        response = self.client.get(reverse("schema-redoc"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse("schema-json"))
@@ -88,6 +88,7 @@ class EnrollmentSerializerTest(TestCase):
             "enrollment_date",
             "active",
             "notes",
+            "version",
         }
         self.assertEqual(set(data.keys()), expected_fields)
 
@@ -186,7 +187,9 @@ class ClientSerializerTest(TestCase):
             "email",
             "address",
             "registration_date",
+            "facility",
             "enrollments",
+            "version",
         }
         self.assertEqual(set(data.keys()), expected_fields)
 
@@ -232,6 +235,7 @@ class ClientSerializerTest(TestCase):
             "enrollment_date",
             "active",
             "notes",
+            "version",
         }
         for enrollment in enrollments:
             self.assertEqual(set(enrollment.keys()), enrollment_fields)
@@ -0,0 +1,194 @@
+import copy
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITransactionTestCase
+
+from core.health import sharding
+from core.health.cache import profile_cache
+from core.health.importer import ClientImporter
+from core.health.models import Client, Enrollment, EnrollmentRollup, HealthProgram
+from core.sync.engine import export_changes
+from core.sync.models import JournalEntry
+
+# Two more local SQLite databases acting as facility shards. Registered at
+# import time so that the test runner creates them with the default one.
+for alias in ("shard_east", "shard_west"):
+    connections.settings.setdefault(alias, {**copy.deepcopy(connections.settings["default"]), "NAME": alias})
+
+SHARDS = {"shard_east": ["kisumu"], "shard_west": ["nakuru", "eldoret"]}
+
+
+@override_settings(FACILITY_SHARDS=SHARDS)
+class FacilityShardingTest(APITransactionTestCase):
+    databases = {"default", "shard_east", "shard_west"}
+
+    def setUp(self):
+        cache.clear()
+        profile_cache.clear()
+        for alias in SHARDS:
+            sharding.prepare_shard(alias)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email="nurse@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.program = HealthProgram.objects.create(name="TB")
+
+    def register(self, first_name, facility=""):
+        response = self.client.post(
+            reverse("client-list"),
+            {
+                "first_name": first_name,
+                "last_name": "Otieno",
+                "date_of_birth": "1990-01-15",
+                "gender": "F",
+                "facility": facility,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def test_clients_stored_on_facility_shard(self):
+        """Test that clients land on their facility's shard with ids from its range"""
+        east_id = self.register("Amina", "kisumu")
+        west_id = self.register("Wanjiru", "eldoret")
+        default_id = self.register("Njeri")
+
+        self.assertEqual(sharding.shard_for_pk(east_id), "shard_east")
+        self.assertEqual(sharding.shard_for_pk(west_id), "shard_west")
+        self.assertEqual(sharding.shard_for_pk(default_id), "default")
+        self.assertTrue(Client.objects.using("shard_east").filter(pk=east_id).exists())
+        self.assertFalse(Client.objects.using("default").filter(pk=east_id).exists())
+        self.assertEqual(Client.objects.using("shard_west").get().first_name, "Wanjiru")
+
+    def test_program_copied_to_shards(self):
+        """Test that programs written to the default database reach every shard"""
+        self.program.name = "Tuberculosis"
+        self.program.save()
+        self.assertEqual(self.program._state.db, "default")
+        for alias in SHARDS:
+            self.assertEqual(HealthProgram.objects.using(alias).get(pk=self.program.pk).name, "Tuberculosis")
+
+        self.program.delete()
+        self.assertFalse(HealthProgram.objects.using("shard_east").exists())
+
+    def test_single_client_requests_route_to_shard(self):
+        """Test that detail, update and enroll requests find the client on its shard"""
+        client_id = self.register("Amina", "kisumu")
+
+        response = self.client.get(reverse("client-detail", args=[client_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["facility"], "kisumu")
+
+        response = self.client.patch(reverse("client-detail", args=[client_id]), {"address": "Kondele"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Client.objects.using("shard_east").get(pk=client_id).address, "Kondele")
+
+        response = self.client.post(reverse("client-enroll", args=[client_id]), {"program_id": self.program.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        enrollment = Enrollment.objects.using("shard_east").get()
+        self.assertEqual(enrollment.client_id, client_id)
+        self.assertGreater(enrollment.pk, sharding.ID_BLOCK)
+        self.assertFalse(Enrollment.objects.using("default").exists())
+
+        response = self.client.get(reverse("client-profile", args=[client_id]))
+        self.assertEqual(response.data["enrollments"][0]["program_name"], "TB")
+
+    def test_list_single_facility(self):
+        """Test that ?facility= lists only that facility's clients"""
+        self.register("Wanjiru", "eldoret")
+        self.register("Akinyi", "nakuru")
+        self.register("Amina", "kisumu")
+
+        response = self.client.get(reverse("client-list"), {"facility": "nakuru"})
+        self.assertEqual([client["first_name"] for client in response.data], ["Akinyi"])
+
+    def test_search_fans_out_across_shards(self):
+        """Test that listing without a facility merges every shard in id order"""
+        west_id = self.register("Wanjiru", "eldoret")
+        default_id = self.register("Amina")
+        east_id = self.register("Amani", "kisumu")
+        self.register("Baraka", "nakuru")
+
+        response = self.client.get(reverse("client-list"), {"search": "Am"})
+        self.assertEqual([client["id"] for client in response.data], [default_id, east_id])
+
+        response = self.client.get(reverse("client-list"), {"page_size": 2, "page": 2})
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual([client["id"] for client in response.data["results"]], [west_id, west_id + 1])
+
+    def test_cannot_move_client_across_shards(self):
+        """Test that changing the facility to one on another shard is rejected"""
+        client_id = self.register("Wanjiru", "eldoret")
+
+        response = self.client.patch(reverse("client-detail", args=[client_id]), {"facility": "kisumu"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.patch(reverse("client-detail", args=[client_id]), {"facility": "nakuru"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_router_uses_instance_facility(self):
+        """Test that saving a client outside a request routes by its facility"""
+        client = Client(first_name="Amina", last_name="Otieno", date_of_birth=date(1990, 1, 15), gender="F")
+        client.facility = "kisumu"
+        client.save()
+        self.assertEqual(client._state.db, "shard_east")
+
+    def test_bulk_transitions_reach_every_shard(self):
+        """Test that bulk deactivation and annotation change enrollments on every shard"""
+        client_ids = [self.register("Amina", "kisumu"), self.register("Wanjiru", "eldoret"), self.register("Njeri")]
+        for client_id in client_ids:
+            self.client.post(reverse("client-enroll", args=[client_id]), {"program_id": self.program.id})
+
+        url = reverse("healthprogram-deactivate-enrollments", kwargs={"pk": self.program.id})
+        response = self.client.post(url, {}, format="json")
+        self.assertEqual(response.data, {"updated": 3, "active_enrollments": 0})
+        for alias in ("default", *SHARDS):
+            self.assertFalse(Enrollment.objects.using(alias).get().active)
+            self.assertEqual(EnrollmentRollup.objects.using(alias).get().active, 0)
+
+        url = reverse("healthprogram-annotate-enrollments", kwargs={"pk": self.program.id})
+        response = self.client.post(url, {"notes": "Cohort closed", "client_ids": [client_ids[1]]}, format="json")
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(Enrollment.objects.using("shard_west").get().notes, "Cohort closed")
+
+    def test_import_writes_to_facility_shards(self):
+        """Test that imported clients land on their facility's shard"""
+        records = [
+            {"first_name": name, "last_name": "Otieno", "date_of_birth": date(1990, 1, 15), "gender": "F", "facility": facility}
+            for name, facility in [("Amina", "kisumu"), ("Wanjiru", "nakuru"), ("Njeri", "")]
+        ]
+        self.assertEqual(ClientImporter().write(records), 3)
+        for alias, name in [("shard_east", "Amina"), ("shard_west", "Wanjiru"), ("default", "Njeri")]:
+            client = Client.objects.using(alias).get()
+            self.assertEqual((client.first_name, sharding.shard_for_pk(client.pk)), (name, alias))
+            self.assertTrue(JournalEntry.objects.using(alias).filter(global_id=client.global_id).exists())
+
+    def test_autocomplete_searches_every_shard(self):
+        """Test that autocomplete merges the matches of every shard"""
+        east_id = self.register("Amani", "kisumu")
+        default_id = self.register("Amina")
+        self.register("Baraka", "nakuru")
+        response = self.client.get(reverse("client-autocomplete"), {"q": "am"})
+        self.assertEqual([result["id"] for result in response.data], [east_id, default_id])
+
+    def test_list_counts_are_estimated_per_shard(self):
+        """Test that paginating across shards reuses each shard's cached count instead of counting again"""
+        self.register("Amina", "kisumu")
+        self.register("Wanjiru", "eldoret")
+        self.client.get(reverse("client-list"), {"page_size": 1})
+        self.register("Njeri")
+
+        response = self.client.get(reverse("client-list"), {"page_size": 1})
+        self.assertEqual((response.data["count"], response.data["count_estimated"]), (2, True))
+
+    def test_sync_refuses_to_run(self):
+        """Test that sync is refused rather than run on the default database's journal alone"""
+        with self.assertRaises(ImproperlyConfigured):
+            export_changes(0)
@@ -0,0 +1,72 @@
+import copy
+import fcntl
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.db import connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+from core.common.sqlite import tuned_sqlite_options
+from core.common.sqlite_backend.base import DatabaseWrapper as QueuedDatabaseWrapper
+
+
+class TunedSQLiteTest(SimpleTestCase):
+    def test_options(self):
+        """Test that the profile sets pragmas, immediate transactions and a busy timeout"""
+        options = tuned_sqlite_options(timeout=5, cache_size=-1024)
+        self.assertIn("PRAGMA journal_mode=WAL", options["init_command"])
+        self.assertIn("PRAGMA synchronous=NORMAL", options["init_command"])
+        self.assertIn("PRAGMA cache_size=-1024", options["init_command"])
+        self.assertEqual(options["transaction_mode"], "IMMEDIATE")
+        self.assertEqual(options["timeout"], 5)
+
+    def test_pragmas_applied_on_connect(self):
+        """Test that a new connection runs in WAL mode with the tuned pragmas"""
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = copy.deepcopy(connections.settings["default"])
+            settings_dict.update({"NAME": str(Path(directory) / "tuned.sqlite3"), "OPTIONS": tuned_sqlite_options()})
+            connection = DatabaseWrapper(settings_dict, alias="tuned")
+            try:
+                with connection.cursor() as cursor:
+                    pragmas = {}
+                    for name in ("journal_mode", "synchronous", "busy_timeout"):
+                        cursor.execute(f"PRAGMA {name}")
+                        pragmas[name] = cursor.fetchone()[0]
+            finally:
+                connection.close()
+        # synchronous=NORMAL is 1; the timeout is reported in milliseconds
+        self.assertEqual(pragmas, {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 20000})
+
+    def test_transactions_queue_for_the_write_lock(self):
+        """Test that a transaction waits its turn on the lock file and releases it when done"""
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = copy.deepcopy(connections.settings["default"])
+            settings_dict.update({"NAME": str(Path(directory) / "queued.sqlite3"), "OPTIONS": tuned_sqlite_options()})
+            started = threading.Event()
+
+            def write():
+                connections["queued"] = QueuedDatabaseWrapper(settings_dict, alias="queued")
+                try:
+                    with transaction.atomic(using="queued"):
+                        started.set()
+                        connections["queued"].cursor().execute("CREATE TABLE log (name TEXT)")
+                finally:
+                    connections["queued"].close()
+                    del connections["queued"]
+
+            lock = os.open(f"{settings_dict['NAME']}-writer.lock", os.O_RDWR | os.O_CREAT)
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                writer = threading.Thread(target=write)
+                writer.start()
+                self.assertFalse(started.wait(0.2))
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                writer.join(5)
+                self.assertTrue(started.is_set())
+                # Released after the commit
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            finally:
+                os.close(lock)
@@ -0,0 +1,76 @@
+import json
+import runpy
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+
+from core.common import startup
+from core.common.management.commands.startup_profile import parse_importtime
+from core.common.startup import warm_connections, warm_up
+
+
+class WarmUpTest(TestCase):
+    def test_runs_every_phase(self):
+        """Test that warm-up reports the duration of each phase"""
+        phases = dict(warm_up(force=True))
+        self.assertEqual(set(phases), {"api_settings", "urlconf", "serializers", "schema"})
+
+    def test_runs_once(self):
+        """Test that loading config.wsgi after warming up does not warm up again"""
+        with mock.patch.object(startup, "_warmed", False):
+            self.assertTrue(warm_up())
+            self.assertEqual(warm_up(), [])
+
+    def test_leaves_database_alone(self):
+        """Test that warm-up opens no connection that a fork could share"""
+        with mock.patch.object(connections["default"], "ensure_connection") as ensure_connection:
+            warm_up(force=True)
+        ensure_connection.assert_not_called()
+
+    def test_warm_connections(self):
+        """Test that each database connection is opened"""
+        with mock.patch("django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection") as ensure_connection:
+            warm_connections()
+        self.assertEqual(ensure_connection.call_count, len(settings.DATABASES))
+
+    def test_gunicorn_warms_sync_workers(self):
+        """Test that gunicorn opens connections in sync workers only"""
+        config = runpy.run_path(str(settings.BASE_DIR / "gunicorn.conf.py"))
+        for worker_class, calls in (("sync", 1), ("gthread", 0), ("gevent", 0)):
+            worker = SimpleNamespace(cfg=SimpleNamespace(worker_class_str=worker_class))
+            with mock.patch("core.common.startup.warm_connections") as warm:
+                config["post_worker_init"](worker)
+            self.assertEqual(warm.call_count, calls)
+
+    @override_settings(STARTUP_WARM_UP=False)
+    def test_can_be_disabled(self):
+        """Test that warm-up is skipped when disabled in settings"""
+        self.assertEqual(warm_up(), [])
+
+
+class StartupProfileCommandTest(TestCase):
+    def test_parse_importtime(self):
+        """Test parsing of python -X importtime output"""
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   _json\n"
+            "import time:       300 |        420 | json\n"
+        )
+        self.assertEqual(
+            parse_importtime(stderr), [("_json", 120, 120, 1), ("json", 300, 420, 0)]
+        )
+
+    def test_reports_phases_and_imports(self):
+        """Test that the command profiles a fresh interpreter"""
+        out = StringIO()
+        call_command("startup_profile", "--json", "--top", "5", stdout=out)
+        report = json.loads(out.getvalue())
+        phases = [phase["phase"] for phase in report["phases"]]
+        self.assertEqual(phases[0], "django.setup")
+        self.assertIn("wsgi_import", phases)
+        self.assertEqual(len(report["imports"]), 5)
@@ -0,0 +1,221 @@
+import copy
+import gzip
+import json
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from core.health.models import Client, Enrollment, EnrollmentRollup, HealthProgram
+from core.sync.engine import export_changes, seal
+from core.sync.models import JournalEntry
+from core.sync.transport import LocalTransport, synchronize
+
+# A second database standing in for the central deployment. Registered at
+# import time so that the test runner creates it alongside the default one.
+connections.settings.setdefault(
+    "central", {**copy.deepcopy(connections.settings["default"]), "NAME": "central.sqlite3"}
+)
+
+
+class TwoDatabaseSyncTest(TransactionTestCase):
+    """
+    A clinic node on the default database syncing with a central
+    deployment on a second SQLite database
+    """
+
+    databases = {"default", "central"}
+    reset_sequences = True
+
+    def as_clinic(self):
+        return self.settings(SYNC_NODE_ID="clinic")
+
+    def sync(self):
+        with self.as_clinic():
+            return synchronize(LocalTransport("central"), "central")
+
+    def make_client(self, using, first_name="Amina"):
+        return Client.objects.db_manager(using).create(
+            first_name=first_name, last_name="Otieno", date_of_birth=date(1990, 1, 15), gender="F"
+        )
+
+    def test_push_without_id_clashes(self):
+        """Test that rows created on both sides with the same id both survive"""
+        central_client = self.make_client("central", "Baraka")
+        with self.as_clinic():
+            program = HealthProgram.objects.create(name="TB")
+            local_client = self.make_client("default")
+            Enrollment.objects.create(client=local_client, program=program)
+        self.assertEqual(local_client.pk, central_client.pk)
+
+        stats = self.sync()
+        self.assertEqual(stats["pushed"], 3)
+        self.assertEqual(stats["applied"], 1)
+        pushed = Client.objects.using("central").get(global_id=local_client.global_id)
+        self.assertNotEqual(pushed.pk, local_client.pk)
+        self.assertEqual(pushed.enrollments.get().program.name, "TB")
+        self.assertTrue(Client.objects.filter(global_id=central_client.global_id).exists())
+
+    def test_creation_dates_survive(self):
+        """Test that registration and enrollment dates arrive as they were, not as the day of the sync"""
+        with self.as_clinic():
+            program = HealthProgram.objects.create(name="TB")
+            local_client = self.make_client("default")
+            enrollment = Enrollment.objects.create(client=local_client, program=program)
+        registered = timezone.now() - timedelta(days=2000)
+        Client.objects.filter(pk=local_client.pk).update(registration_date=registered)
+        Enrollment.objects.filter(pk=enrollment.pk).update(enrollment_date=date(2020, 3, 1))
+        self.sync()
+
+        pushed = Client.objects.using("central").get(global_id=local_client.global_id)
+        self.assertEqual(pushed.registration_date, registered)
+        self.assertEqual(pushed.enrollments.get().enrollment_date, date(2020, 3, 1))
+        self.assertEqual(
+            list(EnrollmentRollup.objects.using("central").filter(enrollments__gt=0).values_list("month", "enrollments")),
+            [(date(2020, 3, 1), 1)],
+        )
+
+        central_client = self.make_client("central", "Baraka")
+        Client.objects.using("central").filter(pk=central_client.pk).update(registration_date=registered)
+        self.sync()
+        self.assertEqual(Client.objects.get(global_id=central_client.global_id).registration_date, registered)
+
+    def test_sync_cost_follows_changes(self):
+        """Test that a second sync with no new changes transfers nothing"""
+        with self.as_clinic():
+            self.make_client("default")
+        self.sync()
+        self.assertEqual(self.sync(), {"pushed": 0, "pulled": 0, "applied": 0, "conflicts": 0, "skipped": 0})
+
+        HealthProgram.objects.using("central").create(name="Malaria")
+        stats = self.sync()
+        self.assertEqual((stats["pushed"], stats["pulled"]), (0, 1))
+
+    def test_last_writer_wins(self):
+        """Test that concurrent edits converge on the latest one everywhere"""
+        with self.as_clinic():
+            local_client = self.make_client("default")
+        self.sync()
+        central_client = Client.objects.using("central").get(global_id=local_client.global_id)
+
+        with self.as_clinic():
+            local_client.address = "Clinic edit"
+            local_client.save()
+        central_client.address = "Central edit"
+        central_client.save()
+
+        stats = self.sync()
+        self.assertEqual(stats["conflicts"], 1)
+        for using in ("default", "central"):
+            self.assertEqual(Client.objects.using(using).get(global_id=local_client.global_id).address, "Central edit")
+
+        central_client.refresh_from_db()
+        central_client.address = "Central again"
+        central_client.save()
+        with self.as_clinic():
+            local_client.refresh_from_db()
+            local_client.address = "Clinic wins"
+            local_client.save()
+        self.sync()
+        for using in ("default", "central"):
+            self.assertEqual(Client.objects.using(using).get(global_id=local_client.global_id).address, "Clinic wins")
+
+    def test_deletes_propagate(self):
+        """Test that deleting a client removes it and its enrollments remotely"""
+        program = HealthProgram.objects.using("central").create(name="TB")
+        central_client = self.make_client("central")
+        Enrollment.objects.using("central").create(client=central_client, program=program)
+        self.sync()
+        self.assertEqual(Enrollment.objects.count(), 1)
+
+        with self.as_clinic():
+            Client.objects.get(global_id=central_client.global_id).delete()
+        self.sync()
+        self.assertFalse(Client.objects.using("central").exists())
+        self.assertFalse(Enrollment.objects.using("central").exists())
+
+    def test_bulk_transitions_are_journaled(self):
+        """Test that set-based enrollment updates are synced"""
+        with self.as_clinic():
+            program = HealthProgram.objects.create(name="TB")
+            Enrollment.objects.create(client=self.make_client("default"), program=program)
+            self.sync()
+            user = get_user_model().objects.create_user(email="admin@example.com", password="pass")
+            api = APIClient()
+            api.force_authenticate(user)
+            api.post(reverse("healthprogram-deactivate-enrollments", kwargs={"pk": program.pk}), {}, format="json")
+        self.sync()
+        self.assertFalse(Enrollment.objects.using("central").get().active)
+
+
+class JournalCursorTest(TestCase):
+    def entry(self, journal_id):
+        program = HealthProgram.objects.create(name=f"Program {journal_id}")
+        JournalEntry.objects.filter(global_id=program.global_id).update(id=journal_id)
+        return program
+
+    def test_late_commits_are_exported(self):
+        """Test that an entry committed after the cursor moved past its id is still exported"""
+        self.entry(101)
+        self.entry(103)
+        batch = export_changes(0)
+        self.assertEqual([change["data"]["name"] for change in batch["changes"]], ["Program 101", "Program 103"])
+
+        # The transaction holding 102 commits
+        late = self.entry(102)
+        batch = export_changes(batch["next"])
+        self.assertEqual([change["global_id"] for change in batch["changes"]], [str(late.global_id)])
+        self.assertEqual(export_changes(batch["next"])["changes"], [])
+
+    def test_numbers_follow_commit_order(self):
+        """Test that entries are numbered once, after every entry numbered before"""
+        self.entry(5)
+        export_changes(0)
+        self.entry(2)
+        self.entry(3)
+        seal()
+        seal()
+        numbers = dict(JournalEntry.objects.values_list("id", "seq"))
+        self.assertLess(numbers[5], numbers[2])
+        self.assertLess(numbers[2], numbers[3])
+
+
+class SyncEndpointTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        staff = get_user_model().objects.create_user(email="sync@example.com", password="pass", is_staff=True)
+        self.client.force_authenticate(staff)
+        self.program = HealthProgram.objects.create(name="TB")
+
+    def test_pull_excludes_requesting_node(self):
+        """Test that a node is not sent its own changes back"""
+        JournalEntry.objects.filter(global_id=self.program.global_id).update(node="clinic")
+        response = self.client.get(reverse("sync-pull"), {"since": 0, "node": "clinic"})
+        self.assertEqual(response.data["changes"], [])
+
+        response = self.client.get(reverse("sync-pull"), {"since": 0, "node": "other"})
+        self.assertEqual(response.data["changes"][0]["data"]["name"], "TB")
+
+    def test_gzipped_push(self):
+        """Test that a gzipped batch is applied"""
+        change = export_changes(0)["changes"][0]
+        change.update({"node": "clinic", "changed_at": "2999-01-01T00:00:00+00:00"})
+        change["data"]["name"] = "Tuberculosis"
+        body = gzip.compress(json.dumps({"node": "clinic", "changes": [change]}).encode())
+        response = self.client.generic(
+            "POST", reverse("sync-push"), body, content_type="application/json", HTTP_CONTENT_ENCODING="gzip"
+        )
+        self.assertEqual(response.data, {"applied": 1, "conflicts": 0, "skipped": 0})
+        self.program.refresh_from_db()
+        self.assertEqual(self.program.name, "Tuberculosis")
+
+    def test_requires_staff(self):
+        """Test that only staff can use the sync endpoints"""
+        self.client.force_authenticate(None)
+        response = self.client.get(reverse("sync-pull"), {"node": "clinic"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,121 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+
+from core.common.throttling import TAKE_TOKEN_SCRIPT, AuthRateThrottle, SearchRateThrottle, TokenBucketThrottle
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketThrottleTest(TestCase):
+    """Test cases for the TokenBucketThrottle"""
+
+    def setUp(self):
+        cache.clear()
+        self.timer = FakeTimer()
+        self.factory = APIRequestFactory()
+
+    def make_throttle(self, cls=TokenBucketThrottle, rate="3/min"):
+        throttle_cls = type("TestThrottle", (cls,), {"rate": rate, "scope": "test"})
+        throttle = throttle_cls()
+        throttle.timer = self.timer
+        return throttle
+
+    def make_request(self, path="/"):
+        request = Request(self.factory.get(path))
+        request.user = None
+        return request
+
+    def test_burst_then_refill(self):
+        """Test that a full bucket allows a burst and then refills over time"""
+        throttle = self.make_throttle()
+        request = self.make_request()
+        for _ in range(3):
+            self.assertTrue(throttle.allow_request(request, None))
+        self.assertFalse(throttle.allow_request(request, None))
+        self.assertAlmostEqual(throttle.wait(), 20.0)
+
+        self.timer.now += 20
+        self.assertTrue(throttle.allow_request(request, None))
+        self.assertFalse(throttle.allow_request(request, None))
+
+    def test_concurrent_requests_spend_each_token_once(self):
+        """Test that requests arriving together cannot take the same token"""
+        throttle = self.make_throttle(rate="10/min")
+        request = self.make_request()
+        get = LocMemCache.get
+
+        def slow_get(*args, **kwargs):
+            # Widen the gap between reading and writing the bucket
+            value = get(*args, **kwargs)
+            time.sleep(0.001)
+            return value
+
+        # Each thread has a cache instance of its own, over shared storage
+        with mock.patch.object(LocMemCache, "get", slow_get), ThreadPoolExecutor(max_workers=8) as executor:
+            allowed = list(executor.map(lambda _: throttle.allow_request(request, None), range(40)))
+        self.assertEqual(allowed.count(True), 10)
+
+    def test_takes_token_on_redis(self):
+        """Test that with Redis the bucket is updated by one server-side script"""
+        redis_cache = RedisCache("redis://localhost:6379/0", {"KEY_PREFIX": "default"})
+        client = mock.Mock()
+        client.register_script.return_value.return_value = [0, b"0.25"]
+        throttle = self.make_throttle()
+        throttle.cache = redis_cache
+        with mock.patch.object(redis_cache._cache, "get_client", return_value=client):
+            self.assertFalse(throttle.allow_request(self.make_request(), None))
+
+        client.register_script.assert_called_once_with(TAKE_TOKEN_SCRIPT)
+        key = redis_cache.make_and_validate_key(throttle.key)
+        client.register_script.return_value.assert_called_once_with(keys=[key], args=[3, 0.05, 1000.0, 60])
+        self.assertAlmostEqual(throttle.wait(), 15.0)
+
+    def test_search_throttle_ignores_plain_requests(self):
+        """Test that the search budget only applies to search queries"""
+        throttle = self.make_throttle(SearchRateThrottle, rate="1/min")
+        plain = self.make_request("/api/clients/")
+        search = self.make_request("/api/clients/?search=Wanjiru")
+        self.assertIsNone(throttle.get_cache_key(plain, None))
+        self.assertTrue(throttle.allow_request(search, None))
+        self.assertFalse(throttle.allow_request(search, None))
+        self.assertTrue(throttle.allow_request(plain, None))
+
+
+class AuthThrottleViewTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.rate = AuthRateThrottle.THROTTLE_RATES["auth"]
+        AuthRateThrottle.THROTTLE_RATES["auth"] = "2/min"
+
+    def tearDown(self):
+        AuthRateThrottle.THROTTLE_RATES["auth"] = self.rate
+        cache.clear()
+
+    def test_login_is_throttled_with_retry_after(self):
+        """Test that repeated logins from one IP get 429 with Retry-After"""
+        url = reverse("token_obtain_pair")
+        data = {"email": "nobody@example.com", "password": "wrong"}
+        for _ in range(2):
+            response = self.client.post(url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Password hashing on the failed logins refills part of a token
+        self.assertTrue(0 < int(response["Retry-After"]) <= 30)
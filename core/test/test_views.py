@@ -1,6 +1,7 @@
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
+from core.health.cache import profile_cache
 from core.health.models import HealthProgram, Client, Enrollment
 from datetime import date
 
@@ -77,6 +78,7 @@ class ClientViewSetTest(APITestCase):
     def setUp(self):
         """Set up test data for Client tests"""
         self.client = APIClient()
+        profile_cache.clear()
 
         # Create test client
         self.client_instance = Client.objects.create(
@@ -1,10 +1,19 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from core.common.throttling import AuthRateThrottle
 from .views import RegisterView, UserView
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
-    path("login/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path("login/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path(
+        "login/",
+        TokenObtainPairView.as_view(throttle_classes=[AuthRateThrottle]),
+        name="token_obtain_pair",
+    ),
+    path(
+        "login/refresh/",
+        TokenRefreshView.as_view(throttle_classes=[AuthRateThrottle]),
+        name="token_refresh",
+    ),
     path("me/", UserView.as_view(), name="user_info"),
 ]
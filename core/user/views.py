@@ -1,5 +1,6 @@
 from rest_framework import generics, permissions
 from django.contrib.auth import get_user_model
+from core.common.throttling import AuthRateThrottle
 from .serializers import RegisterSerializer, UserSerializer
 
 User = get_user_model()
@@ -8,6 +9,7 @@ User = get_user_model()
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (AuthRateThrottle,)
     serializer_class = RegisterSerializer
 
 
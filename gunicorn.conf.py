@@ -0,0 +1,36 @@
+"""
+Gunicorn settings, read from the working directory on start.
+
+With ``PROMETHEUS_MULTIPROC_DIR`` set, workers keep their metrics in that
+directory (see core.common.metrics); start from an empty one and forget the
+live values of workers that exit.
+
+Each sync worker opens its database connections once it has loaded the
+application, also when the application is preloaded in the master.
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+
+def on_starting(server):
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        Path(directory).mkdir(parents=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # Threaded workers serve requests on threads with connections of their own.
+    if worker.cfg.worker_class_str == "sync":
+        from core.common.startup import warm_connections
+
+        warm_connections()